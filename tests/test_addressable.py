@@ -1,6 +1,14 @@
+import gc
+import json
+import sys
+import threading
+from datetime import datetime, timedelta, timezone
+
 import pytest
 
 from weconnect import addressable
+from weconnect.history import AttributeHistory
+from weconnect.util import ExtendedWithNullEncoder
 
 
 def test_AddressableLeafGetObservers():
@@ -205,3 +213,379 @@ def test_AdressableObjectLeafChildren():
     assert children[0] == addressableObject
     assert children[1] == childAddressableLeaf1
     assert children[2] == childAddressableLeaf2
+
+
+def test_AddressableAddressIndex():
+    root = addressable.AddressableObject(localAddress='', parent=None)
+    vehicles = addressable.AddressableDict(localAddress='vehicles', parent=root)
+    vehicle = addressable.AddressableObject(localAddress='VIN1', parent=vehicles)
+    attribute = addressable.AddressableAttribute(localAddress='soc', parent=vehicle, value=None, valueType=int)
+    vehicles['VIN1'] = vehicle
+    attribute.setValueWithCarTime(newValue=42)
+
+    assert attribute.getGlobalAddress() == '/vehicles/VIN1/soc'
+    assert root.getByAddressString('/vehicles/VIN1/soc') == attribute
+    assert vehicles.getByAddressString('vehicles/VIN1/soc') == attribute
+    assert vehicle.getByAddressString('VIN1/soc') == attribute
+    assert vehicle.getByAddressString('VIN1/../VIN1/soc') == attribute
+    assert vehicle.getByAddressString('VIN2/soc') is False
+    assert root.getByAddressString('/vehicles/VIN1/unknown') is False
+
+    # Renaming moves the whole subtree in the index
+    vehicle.localAddress = 'VIN2'
+    assert attribute.getGlobalAddress() == '/vehicles/VIN2/soc'
+    assert root.getByAddressString('/vehicles/VIN2/soc') == attribute
+    assert root.getByAddressString('/vehicles/VIN1/soc') is False
+
+    # Re-parenting moves the subtree to the new parent
+    otherVehicles = addressable.AddressableDict(localAddress='otherVehicles', parent=root)
+    vehicle.parent = otherVehicles
+    assert attribute.getGlobalAddress() == '/otherVehicles/VIN2/soc'
+    assert root.getByAddressString('/otherVehicles/VIN2/soc') == attribute
+    assert root.getByAddressString('/vehicles/VIN2/soc') is False
+
+    # Changes in one tree keep the cached addresses of other trees
+    otherRoot = addressable.AddressableObject(localAddress='other', parent=None)
+    otherAttribute = addressable.AddressableAttribute(localAddress='soc', parent=otherRoot, value=None, valueType=int)
+    assert otherAttribute.getGlobalAddress() == 'other/soc'
+    cachedToken = otherAttribute._AddressableLeaf__addressToken
+    vehicle.localAddress = 'VIN3'
+    vehicle.localAddress = 'VIN2'
+    assert otherAttribute.getGlobalAddress() == 'other/soc'
+    assert otherAttribute._AddressableLeaf__addressToken is cachedToken and cachedToken.valid
+
+    # Moving a whole tree below another one and detaching it again
+    otherRoot.parent = vehicle
+    assert otherAttribute.getGlobalAddress() == '/otherVehicles/VIN2/other/soc'
+    otherRoot.parent = None
+    assert otherAttribute.getGlobalAddress() == 'other/soc'
+
+    # Removing disables the subtree and removes it from the index
+    otherVehicles['VIN2'] = vehicle
+    del otherVehicles['VIN2']
+    assert root.getByAddressString('/otherVehicles/VIN2/soc') is False
+    assert vehicle.enabled is False
+    assert attribute.enabled is False
+
+
+def test_AddressableAttributeSlots():
+    root = addressable.AddressableObject(localAddress='root', parent=None)
+    attribute = addressable.AddressableAttribute(localAddress='attribute', parent=root, value=None, valueType=int)
+    assert not hasattr(attribute, '__dict__')
+
+    leaf = addressable.AddressableLeaf(localAddress='leaf', parent=root)
+    assert isinstance(leaf, addressable.AddressableLeaf)
+    assert type(leaf) is addressable.PlainAddressableLeaf
+    assert leaf.getGlobalAddress() == 'root/leaf'
+    leaf.enabled = True
+    assert root.children == [leaf]
+
+    attribute.setValueWithCarTime(1, fromServer=True)
+    otherAttribute = addressable.AddressableAttribute(localAddress='other', parent=root, value=None, valueType=int)
+    otherAttribute.setValueWithCarTime(2, fromServer=True)
+    assert attribute.lastUpdateFromServer == otherAttribute.lastUpdateFromServer or \
+        attribute.lastUpdateFromServer < otherAttribute.lastUpdateFromServer
+
+
+def test_PartiallyConstructedLeafDeletion(monkeypatch):
+    unraisable = []
+    monkeypatch.setattr(sys, 'unraisablehook', unraisable.append)
+    attribute = addressable.AddressableAttribute.__new__(addressable.AddressableAttribute)
+    del attribute
+    gc.collect()
+    assert unraisable == []
+
+
+def test_AddressableSelect():
+    root = addressable.AddressableObject(localAddress='', parent=None)
+    vehicles = addressable.AddressableDict(localAddress='vehicles', parent=root)
+    for vin in ['VIN1', 'VIN2']:
+        vehicle = addressable.AddressableObject(localAddress=vin, parent=vehicles)
+        vehicles[vin] = vehicle
+        battery = addressable.AddressableObject(localAddress='batteryStatus', parent=vehicle)
+        for name, value in [('currentSOC_pct', 50), ('cruisingRangeElectric_km', 200)]:
+            attribute = addressable.AddressableAttribute(localAddress=name, parent=battery, value=None, valueType=int)
+            attribute.setValueWithCarTime(value, fromServer=True)
+    addressable.AddressableAttribute(localAddress='disabled', parent=battery, value=None, valueType=int)
+
+    assert [element.getGlobalAddress() for element in root.select('vehicles/*/batteryStatus/currentSOC_pct')] \
+        == ['/vehicles/VIN1/batteryStatus/currentSOC_pct', '/vehicles/VIN2/batteryStatus/currentSOC_pct']
+    assert len(list(root.select('**/currentSOC_pct'))) == 2
+    assert len(list(root.select('vehicles/VIN2/batteryStatus/**'))) == 3
+    assert len(list(root.select('vehicles/VIN?/*/cruising*'))) == 2
+    assert list(root.select('vehicles/VIN3/**')) == []
+    assert [element.getLocalAddress() for element in vehicles.select('VIN1')] == ['VIN1']
+
+    pattern = addressable.AddressPattern.compile('vehicles/**/currentSOC_pct')
+    assert pattern is addressable.AddressPattern.compile('vehicles/**/currentSOC_pct')
+    assert pattern.match('vehicles/VIN1/batteryStatus/currentSOC_pct')
+    assert pattern.match('vehicles/currentSOC_pct')
+    assert not pattern.match('vehicles/VIN1/batteryStatus')
+
+
+def test_AddressableChangeSet():
+    root = addressable.AddressableObject(localAddress='root', parent=None)
+    child = addressable.AddressableObject(localAddress='child', parent=root)
+    attribute = addressable.AddressableAttribute(localAddress='attribute', parent=child, value=None, valueType=int)
+    otherAttribute = addressable.AddressableAttribute(localAddress='other', parent=child, value=None, valueType=int)
+
+    changeSets = []
+
+    def observer(element, changeSet):
+        changeSets.append((element, changeSet))
+
+    root.addChangeSetObserver(observer)
+    attribute.setValueWithCarTime(1, fromServer=True)
+    attribute.setValueWithCarTime(2, fromServer=True)
+    otherAttribute.setValueWithCarTime(3, fromServer=True)
+    assert changeSets == []
+
+    root.updateComplete()
+    assert len(changeSets) == 1
+    element, changeSet = changeSets[0]
+    assert element is root
+    assert [change.address for change in changeSet] == ['root', 'root/child', 'root/child/attribute', 'root/child/other']
+    change = changeSet.get('root/child/attribute')
+    assert change.oldValue is None
+    assert change.newValue == 2
+    assert change.flags & addressable.AddressableLeaf.ObserverEvent.ENABLED
+    assert change.flags & addressable.AddressableLeaf.ObserverEvent.VALUE_CHANGED
+    assert change.lastChange == attribute.lastChange
+
+    root.updateComplete()
+    assert len(changeSets) == 1
+
+    attribute.setValueWithCarTime(4, fromServer=True)
+    attribute.enabled = False
+    root.updateComplete()
+    change = changeSets[1][1].get('root/child/attribute')
+    assert len(changeSets[1][1]) == 1
+    assert change.oldValue == 2
+    assert change.newValue is None
+
+    root.removeChangeSetObserver(observer)
+    otherAttribute.setValueWithCarTime(5, fromServer=True)
+    root.updateComplete()
+    assert len(changeSets) == 2
+
+
+def test_AddressableSerializationCache():
+    root = addressable.AddressableObject(localAddress='root', parent=None)
+    child = addressable.AddressableObject(localAddress='child', parent=root)
+    attribute = addressable.AddressableAttribute(localAddress='attribute', parent=child, value=None, valueType=int)
+    other = addressable.AddressableObject(localAddress='other', parent=root)
+    otherAttribute = addressable.AddressableAttribute(localAddress='otherAttribute', parent=other, value=None, valueType=dict)
+    attribute.setValueWithCarTime(1, fromServer=True)
+    otherAttribute.setValueWithCarTime({'a': [1, 2]}, fromServer=True)
+
+    def expected():
+        return json.dumps(root.asDict(filterCallable=addressable.filterImages), cls=ExtendedWithNullEncoder, skipkeys=True, indent=4)
+
+    assert root.toJSON() == expected()
+    asDict = root.asDict()
+    assert root.asDict() is asDict
+    assert other.asDict() is asDict['other']
+
+    attribute.setValueWithCarTime(2, fromServer=True)
+    assert root.asDict() is not asDict
+    assert root.asDict()['child']['attribute'] == 2
+    assert root.asDict()['other'] is asDict['other']
+    assert root.toJSON() == expected()
+
+    attribute.enabled = False
+    assert root.asDict() == {'child': {}, 'other': {'otherAttribute': {'a': [1, 2]}}}
+    assert root.toJSON() == expected()
+
+    getterValue = [3]
+    getterAttribute = addressable.AddressableAttribute(localAddress='getter', parent=child, value=None, valueType=int,
+                                                       valueGetter=lambda: getterValue[0])
+    getterAttribute.enabled = True
+    assert root.asDict()['child']['getter'] == 3
+    getterValue[0] = 4
+    assert root.asDict()['child']['getter'] == 4
+    assert '"getter": 4' in root.toJSON()
+
+
+def test_AddressableChangesSince():
+    root = addressable.AddressableObject(localAddress='', parent=None)
+    vehicles = addressable.AddressableDict(localAddress='vehicles', parent=root)
+    vehicle = addressable.AddressableObject(localAddress='VIN1', parent=vehicles)
+    vehicles['VIN1'] = vehicle
+    soc = addressable.AddressableAttribute(localAddress='soc', parent=vehicle, value=None, valueType=int)
+    soc.setValueWithCarTime(50, fromServer=True)
+    nickname = addressable.AddressableAttribute(localAddress='nick/name', parent=vehicle, value=None, valueType=str)
+    nickname.setValueWithCarTime('ID.3', fromServer=True)
+
+    version = root.version
+    assert root.changesSince(version) == [{'op': 'replace', 'path': '', 'value': root.asDict()}]
+
+    version = root.version
+    assert root.changesSince(version) == []
+
+    soc.setValueWithCarTime(51, fromServer=True)
+    soc.setValueWithCarTime(51, fromServer=True)
+    assert root.changesSince(version) == [{'op': 'add', 'path': '/vehicles/VIN1/soc', 'value': 51}]
+    assert vehicle.changesSince(version) == [{'op': 'add', 'path': '/soc', 'value': 51}]
+
+    version = root.version
+    other = addressable.AddressableObject(localAddress='VIN2', parent=vehicles)
+    vehicles['VIN2'] = other
+    otherSoc = addressable.AddressableAttribute(localAddress='soc', parent=other, value=None, valueType=int)
+    otherSoc.setValueWithCarTime(10, fromServer=True)
+    nickname.enabled = False
+    assert root.changesSince(version) == [{'op': 'remove', 'path': '/vehicles/VIN1/nick~1name'},
+                                          {'op': 'add', 'path': '/vehicles/VIN2', 'value': {'soc': 10}}]
+
+    version = root.version
+    del vehicles['VIN1']
+    otherSoc.setValueWithCarTime(11, fromServer=True)
+    assert root.changesSince(version) == [{'op': 'remove', 'path': '/vehicles/VIN1'},
+                                          {'op': 'add', 'path': '/vehicles/VIN2/soc', 'value': 11}]
+
+    version = root.version
+    other.localAddress = 'VIN3'
+    assert root.changesSince(version) == [{'op': 'remove', 'path': '/vehicles/VIN2'},
+                                          {'op': 'add', 'path': '/vehicles/VIN3', 'value': {'soc': 11}}]
+
+
+def test_AddressableTransaction():
+    root = addressable.AddressableObject(localAddress='root', parent=None)
+    attribute = addressable.AddressableAttribute(localAddress='attribute', parent=root, value=None, valueType=int)
+    otherAttribute = addressable.AddressableAttribute(localAddress='other', parent=root, value=None, valueType=int)
+    attribute.setValueWithCarTime(1, fromServer=True)
+
+    notifications = []
+
+    def observer(element, flags):
+        notifications.append((element.getGlobalAddress(), flags))
+
+    root.addObserver(observer, addressable.AddressableLeaf.ObserverEvent.ALL)
+
+    with root.transaction() as transaction:
+        attribute.setValueWithCarTime(2, fromServer=True)
+        attribute.setValueWithCarTime(3, fromServer=True)
+        otherAttribute.setValueWithCarTime(4, fromServer=True)
+        assert notifications == []
+    assert attribute.value == 3
+    assert attribute.lastChange == otherAttribute.lastChange == transaction.timestamp
+    # One notification per element with the flags of all changes
+    assert [address for address, _ in notifications] == ['root/attribute', 'root/other']
+    assert notifications[1][1] & addressable.AddressableLeaf.ObserverEvent.ENABLED
+
+    notifications.clear()
+    lastChange = attribute.lastChange
+    with pytest.raises(KeyError):
+        with root.transaction():
+            attribute.setValueWithCarTime(5, fromServer=True)
+            otherAttribute.enabled = False
+            raise KeyError('payload incomplete')
+    assert notifications == []
+    assert attribute.value == 3
+    assert attribute.lastChange == lastChange
+    assert otherAttribute.enabled
+
+    # A failing nested transaction only rolls back its own changes
+    with root.transaction():
+        attribute.setValueWithCarTime(6, fromServer=True)
+        with pytest.raises(ValueError):
+            with root.transaction():
+                otherAttribute.setValueWithCarTime(7, fromServer=True)
+                raise ValueError()
+    assert attribute.value == 6
+    assert otherAttribute.value == 4
+    assert [address for address, _ in notifications] == ['root/attribute']
+
+
+def test_AddressableTransactionDeliversWithoutLock():
+    root = addressable.AddressableObject(localAddress='root', parent=None)
+    attribute = addressable.AddressableAttribute(localAddress='attribute', parent=root, value=None, valueType=int)
+
+    lockFree = []
+
+    def tryLock():
+        acquired = root.getTransactionLock().acquire(blocking=False)
+        if acquired:
+            root.getTransactionLock().release()
+        lockFree.append(acquired)
+
+    def observer(element, flags):
+        thread = threading.Thread(target=tryLock)
+        thread.start()
+        thread.join()
+
+    attribute.addObserver(observer, addressable.AddressableLeaf.ObserverEvent.VALUE_CHANGED)
+    with root.transaction():
+        attribute.setValueWithCarTime(1, fromServer=True)
+    assert lockFree == [True]
+
+
+def test_AddressableObserverRemoval():
+    root = addressable.AddressableObject(localAddress='root', parent=None)
+    attribute = addressable.AddressableAttribute(localAddress='attribute', parent=root, value=None, valueType=int)
+
+    calls = []
+
+    def observe1(element, flags):
+        calls.append('observe1')
+
+    def observe2(element, flags):
+        calls.append('observe2')
+
+    class Integration():
+        def observe(self, element, flags):
+            calls.append('integration')
+
+    handle = root.addObserver(observe1, addressable.AddressableLeaf.ObserverEvent.VALUE_CHANGED)
+    root.addObserver(observe2, addressable.AddressableLeaf.ObserverEvent.VALUE_CHANGED)
+    integration = Integration()
+    root.addObserver(integration.observe, addressable.AddressableLeaf.ObserverEvent.VALUE_CHANGED, weak=True)
+    assert len(root.getObservers(addressable.AddressableLeaf.ObserverEvent.ALL)) == 3
+
+    # Removing one observer keeps the others
+    root.removeObserver(observe2)
+    assert root.getObservers(addressable.AddressableLeaf.ObserverEvent.ALL) == [observe1, integration.observe]
+
+    assert handle.active
+    assert handle.remove()
+    assert not handle.active
+    assert not handle.remove()
+
+    # Weak observers do not keep their object alive and are removed with it
+    del integration
+    gc.collect()
+    assert root.getObservers(addressable.AddressableLeaf.ObserverEvent.ALL) == []
+    attribute.setValueWithCarTime(1, fromServer=True)
+    assert calls == []
+
+
+def test_AddressableAttributeHistory():
+    root = addressable.AddressableObject(localAddress='root', parent=None)
+    attribute = addressable.AddressableAttribute(localAddress='soc', parent=root, value=None, valueType=int)
+    history = attribute.enableHistory(capacity=3)
+    assert attribute.history is history
+
+    carTime = datetime(2023, 1, 1, tzinfo=timezone.utc)
+    for value in range(5):
+        attribute.setValueWithCarTime(value, lastUpdateFromCar=carTime + timedelta(minutes=value), fromServer=True)
+    # Unchanged values are not recorded again
+    attribute.setValueWithCarTime(4, fromServer=True)
+
+    assert len(history) == 3
+    assert list(history.values()) == [2.0, 3.0, 4.0]
+    assert [timestamp for timestamp, _ in history] == [carTime + timedelta(minutes=minutes) for minutes in (2, 3, 4)]
+
+    with pytest.raises(KeyError):
+        with root.transaction():
+            attribute.setValueWithCarTime(5, fromServer=True)
+            raise KeyError()
+    assert history.last() == (carTime + timedelta(minutes=4), 4.0)
+    # The sample evicted by the rolled back one is restored
+    assert list(history.values()) == [2.0, 3.0, 4.0]
+    assert [timestamp for timestamp, _ in history] == [carTime + timedelta(minutes=minutes) for minutes in (2, 3, 4)]
+
+    naiveHistory = AttributeHistory(capacity=2)
+    naiveHistory.append(datetime(2023, 1, 1), 1)
+    assert naiveHistory.last() == (datetime(2023, 1, 1, tzinfo=timezone.utc), 1.0)
+
+    with pytest.raises(ValueError):
+        addressable.AddressableAttribute(localAddress='name', parent=root, value=None, valueType=str).enableHistory()
@@ -1,17 +1,26 @@
 """Unit tests for Cupra service"""
 
+import copy
+import logging
+import tracemalloc
+
+import pytest
+
 from weconnect import weconnect
 from weconnect.api.cupra.elements.climatization_settings import ClimatizationSettings
 from weconnect.api.cupra.elements.climatization_status import ClimatizationStatus
 from weconnect.api.cupra.elements.enums import ClimatizationState
 from weconnect.api.cupra.elements.odometer_measurement import OdometerMeasurement
 from weconnect.service import Service
-from weconnect.addressable import AddressableAttribute, AddressableDict, ChangeableAttribute
+from weconnect.addressable import AddressableAttribute, AddressableDict, ChangeableAttribute, Transaction
 from weconnect.api.cupra.elements.battery_status import BatteryStatus
 from weconnect.api.cupra.elements.charging_settings import ChargingSettings
 from weconnect.api.cupra.elements.charging_status import ChargingStatus
-from weconnect.api.cupra.elements.vehicle import Vehicle
+from weconnect.api.cupra.elements.vehicle import Vehicle, DomainDict
 from weconnect.api.cupra.domain import Domain
+from weconnect.api.cupra.elements.access_status import AccessStatus
+from weconnect.elements.access_control_state import AccessControlState
+from weconnect.errors import APICompatibilityError
 
 
 def test_vehicles_element_minimal_construction_not_charging():
@@ -343,4 +352,201 @@ def test_odometer_measurement():
     vehicle = MockVehicle()
     od = OdometerMeasurement(vehicle=vehicle, parent=None, statusId='odometer')
     od.update(999)
-    assert od.odometer.value == 999
\ No newline at end of file
+    assert od.odometer.value == 999
+
+
+def test_status_skips_unchanged_payload():
+    class MockVehicle:
+        fetcher = None
+    battery = BatteryStatus(vehicle=MockVehicle(), parent=None, statusId='batteryStatus')
+
+    notifications = []
+    battery.currentSOC_pct.addObserver(lambda element, flags: notifications.append(flags),
+                                       AddressableAttribute.ObserverEvent.VALUE_CHANGED | AddressableAttribute.ObserverEvent.UPDATED_FROM_SERVER)
+
+    assert battery.updateIfChanged({'currentSOC_pct': 50, 'cruisingRangeElectric_km': 200})
+    assert battery.currentSOC_pct.value == 50
+    assert len(notifications) == 1
+
+    assert not battery.updateIfChanged({'currentSOC_pct': 50, 'cruisingRangeElectric_km': 200})
+    assert notifications[-1] == AddressableAttribute.ObserverEvent.UPDATED_FROM_SERVER
+
+    assert battery.updateIfChanged({'currentSOC_pct': 60, 'cruisingRangeElectric_km': 200})
+    assert battery.currentSOC_pct.value == 60
+    assert notifications[-1] & AddressableAttribute.ObserverEvent.VALUE_CHANGED
+
+    payload = {'currentSOC_pct': 70, 'cruisingRangeElectric_km': 200}
+    assert battery.updateIfChanged(payload)
+    payload['currentSOC_pct'] = 80
+    assert battery.updateIfChanged(payload)
+    assert battery.currentSOC_pct.value == 80
+
+
+def test_domain_dict_builds_deferred_status_on_access():
+    class MockVehicle:
+        fetcher = None
+    built = []
+
+    def materializer(domain, key, klass, payload):
+        built.append(key)
+        domain[key] = klass(vehicle=MockVehicle(), parent=domain, statusId=key, fromDict=payload)
+
+    domains = AddressableDict(localAddress='domains', parent=None)
+    domain = DomainDict(localAddress='charging', parent=domains, materializer=materializer)
+    domains['charging'] = domain
+    domain.defer('batteryStatus', BatteryStatus, {'currentSOC_pct': 50, 'cruisingRangeElectric_km': 200})
+
+    assert 'batteryStatus' in domain
+    assert domain.isPending('batteryStatus')
+    assert domain.getStatusClass('batteryStatus') is BatteryStatus
+    assert list(domain.keys()) == ['batteryStatus']
+    assert not built
+
+    assert domain['batteryStatus'].currentSOC_pct.value == 50
+    assert built == ['batteryStatus']
+    assert not domain.isPending('batteryStatus')
+
+    domain.defer('other', BatteryStatus, {'currentSOC_pct': 70})
+    assert domains.getByAddressString('domains/charging/other/currentSOC_pct').value == 70
+    assert built == ['batteryStatus', 'other']
+
+
+def test_domain_dict_builds_deferred_status_for_observers():
+    class MockVehicle:
+        fetcher = None
+
+    def materializer(domain, key, klass, payload):
+        domain[key] = klass(vehicle=MockVehicle(), parent=domain, statusId=key, fromDict=payload)
+
+    domain = DomainDict(localAddress='charging', parent=None, materializer=materializer)
+    domain.defer('batteryStatus', BatteryStatus, {'currentSOC_pct': 50, 'cruisingRangeElectric_km': 200})
+    notifications = []
+    domain.addObserver(lambda element, flags: notifications.append(element.value), AddressableAttribute.ObserverEvent.VALUE_CHANGED)
+    assert not domain.isPending('batteryStatus')
+    domain['batteryStatus'].update({'currentSOC_pct': 60, 'cruisingRangeElectric_km': 200})
+    assert notifications == [60]
+
+    def changeSetObserver(element, changeSet):
+        pass
+
+    domain.defer('other', BatteryStatus, {'currentSOC_pct': 70})
+    domain.addChangeSetObserver(changeSetObserver)
+    assert not domain.isPending('other')
+    domain.removeChangeSetObserver(changeSetObserver)
+
+
+def test_charging_status_schema():
+    class MockVehicle:
+        fetcher = None
+    status = ChargingStatus(vehicle=MockVehicle(), parent=None, statusId='chargingStatus')
+    status.update({'chargingState': 'readyForCharging', 'chargeMode': 'somethingNew', 'chargePower_kW': 7.2, 'chargeRate_kmph': '',
+                   'chargeType': 'ac'})
+
+    assert status.chargingState.value == ChargingStatus.ChargingState.READY_FOR_CHARGING
+    assert status.chargeMode.value == ChargingStatus.ChargeMode.UNKNOWN
+    # Power is reported while not charging, fixAPI sets it to 0
+    assert status.chargePower_kW.value == 0.0
+    assert status.chargeRate_kmph.value == 0.0
+    assert status.chargeType.value == ChargingStatus.ChargeType.AC
+    assert not status.remainingChargingTimeToComplete_min.enabled
+    assert not status.chargingSettings.enabled
+
+    # A null charge rate is reported as 0, a missing one disables the attribute
+    status.update({'chargingState': 'charging', 'chargeRate_kmph': None})
+    assert status.chargeRate_kmph.enabled
+    assert status.chargeRate_kmph.value == 0.0
+    status.update({'chargingState': 'charging'})
+    assert not status.chargeRate_kmph.enabled
+
+
+def test_update_does_not_modify_payload():
+    class MockVehicle:
+        fetcher = None
+    payload = {'doors': {'frontLeft': {'locked': 'true', 'open': 'false'}, 'frontRight': {'locked': 'false', 'open': 'false'}},
+               'trunk': {'locked': 'true', 'open': 'false'}, 'hood': {'locked': 'true', 'open': 'false'},
+               'windows': {'frontLeft': 'closed'}, 'engine': 'off', 'lights': 'off'}
+    original = copy.deepcopy(payload)
+    status = AccessStatus(vehicle=MockVehicle(), parent=None, statusId='accessStatus', fromDict=payload)
+    battery = BatteryStatus(vehicle=MockVehicle(), parent=None, statusId='batteryStatus', fromDict=payload)
+
+    assert payload == original
+    assert set(status.doors.keys()) == {'frontLeft', 'frontRight', 'trunk', 'hood'}
+    assert status.doorLockStatus.value == AccessControlState.LockState.UNLOCKED
+    assert status.overallStatus.value == AccessControlState.OverallState.UNSAFE
+    assert not battery.currentSOC_pct.enabled
+
+
+def test_status_update_allocations():
+    class MockVehicle:
+        fetcher = None
+    status = ChargingStatus(vehicle=MockVehicle(), parent=None, statusId='chargingStatus')
+    payloads = [{'chargingState': 'charging', 'chargeMode': 'manual', 'chargePower_kW': 7.2, 'chargeRate_kmph': 30,
+                 'remainingChargingTimeToComplete_min': 120, 'chargeType': 'ac'},
+                {'chargingState': 'charging', 'chargeMode': 'manual', 'chargePower_kW': 7.4, 'chargeRate_kmph': 31,
+                 'remainingChargingTimeToComplete_min': 119, 'chargeType': 'ac'}]
+    for payload in payloads:
+        status.update(payload)
+
+    def medianPeak():
+        tracemalloc.start()
+        try:
+            peaks = []
+            for i in range(100):
+                current, _ = tracemalloc.get_traced_memory()
+                tracemalloc.reset_peak()
+                status.update(payloads[i % 2])
+                _, peak = tracemalloc.get_traced_memory()
+                peaks.append(peak - current)
+        finally:
+            tracemalloc.stop()
+        return sorted(peaks)[len(peaks) // 2]
+
+    # With debug logging off an update only allocates the new values, not containers or log messages
+    logger = logging.getLogger('weconnect_cupra')
+    level = logger.level
+    logger.setLevel(logging.DEBUG)
+    try:
+        withLogging = medianPeak()
+    finally:
+        logger.setLevel(level)
+    assert medianPeak() * 4 < withLogging
+
+
+def test_update_fetches_outside_transaction():
+    class MockFetcher:
+        user_id = 'USERID'
+
+        def __init__(self):
+            self.soc = 50
+            self.transactions = []
+
+        def fetchData(self, url, force=None):
+            self.transactions.append(Transaction.current())
+            if url.endswith('/capabilities'):
+                return {'capabilities': []}
+            if url.endswith('/charging/settings'):
+                return {'settings': {}}
+            if url.endswith('/charging/status'):
+                return {'status': {'charging': {}, 'battery': {'currentSOC_pct': self.soc}, 'plug': {}}}
+            if url.endswith('/climatisation/status'):
+                return {'climatisationStatus': {}, 'windowHeatingStatus': {}}
+            if url.endswith('/climatisation/settings'):
+                return {}
+            raise ValueError(f'Unexpected url {url}')
+
+    fetcher = MockFetcher()
+    parent = AddressableDict(localAddress='vehicles', parent=None)
+    vehicle = Vehicle(fetcher=fetcher, vin='VIN', parent=parent, fromDict={'vin': 'VIN'}, updatePictures=False)
+    battery = vehicle.domains[Domain.CHARGING.value]['batteryStatus']
+    assert battery.currentSOC_pct.value == 50
+
+    fetcher.soc = 60
+    vehicle.updateStatus()
+    assert battery.currentSOC_pct.value == 60
+    assert fetcher.transactions and all(transaction is None for transaction in fetcher.transactions)
+
+    # A vehicle payload that cannot be applied leaves the vehicle unchanged
+    nickname = vehicle.nickname.value
+    with pytest.raises(APICompatibilityError):
+        vehicle.update(fromDict={'vin': 'VIN', 'vehicleNickname': 'Renamed', 'coUsers': [{}]})
+    assert vehicle.nickname.value == nickname
@@ -0,0 +1,77 @@
+import asyncio
+import threading
+
+from weconnect import addressable
+from weconnect.event_stream import EventStream
+
+
+def buildTree():
+    root = addressable.AddressableObject(localAddress='root', parent=None)
+    charging = addressable.AddressableObject(localAddress='charging', parent=root)
+    soc = addressable.AddressableAttribute(localAddress='soc', parent=charging, value=None, valueType=int)
+    odometer = addressable.AddressableAttribute(localAddress='odometer', parent=root, value=None, valueType=int)
+    return root, soc, odometer
+
+
+def test_EventStreamOverflow():
+    root, soc, odometer = buildTree()
+
+    stream = EventStream(root, pattern='charging/*', flags=addressable.AddressableLeaf.ObserverEvent.VALUE_CHANGED, maxSize=2)
+    for value in range(4):
+        soc.setValueWithCarTime(value, fromServer=True)
+        odometer.setValueWithCarTime(value, fromServer=True)
+    # Only the two newest events of the matching attribute are kept
+    assert [event.newValue for event in (stream.get(timeout=0), stream.get(timeout=0))] == [2, 3]
+    assert stream.get(timeout=0) is None
+    assert stream.stats()['dropped'] == 2
+    stream.close()
+
+    stream = EventStream(root, pattern='**', flags=addressable.AddressableLeaf.ObserverEvent.VALUE_CHANGED,
+                         overflow=EventStream.Overflow.COALESCE)
+    for value in range(10, 14):
+        soc.setValueWithCarTime(value, fromServer=True)
+        odometer.setValueWithCarTime(value, fromServer=True)
+    stream.close()
+    assert [(event.address, event.newValue) for event in stream] == [('root/charging/soc', 13), ('root/odometer', 13)]
+    assert stream.stats()['coalesced'] == 6
+
+    # Blocking streams hold the update back until the consumer caught up
+    stream = EventStream(root, pattern='odometer', maxSize=1, overflow=EventStream.Overflow.BLOCK,
+                         flags=addressable.AddressableLeaf.ObserverEvent.VALUE_CHANGED)
+    producer = threading.Thread(target=lambda: [odometer.setValueWithCarTime(value, fromServer=True) for value in range(20, 25)])
+    producer.start()
+    values = [stream.get(timeout=5).newValue for _ in range(5)]
+    producer.join()
+    assert values == [20, 21, 22, 23, 24]
+    stream.close()
+
+
+def test_EventStreamAsync():
+    root, soc, _ = buildTree()
+
+    async def consume():
+        stream = EventStream(root, pattern='charging/soc', flags=addressable.AddressableLeaf.ObserverEvent.VALUE_CHANGED)
+
+        def produce():
+            for value in range(3):
+                soc.setValueWithCarTime(value, fromServer=True)
+            stream.close()
+        asyncio.get_running_loop().call_later(0.01, threading.Thread(target=produce).start)
+        return [event.newValue async for event in stream]
+
+    assert asyncio.run(consume()) == [0, 1, 2]
+
+
+def test_EventStreamMatchCacheBounded(monkeypatch):
+    monkeypatch.setattr(EventStream, 'MATCH_CACHE_SIZE', 2)
+    root = addressable.AddressableObject(localAddress='root', parent=None)
+    vehicles = addressable.AddressableDict(localAddress='vehicles', parent=root)
+    stream = EventStream(root, pattern='vehicles/*/soc', flags=addressable.AddressableLeaf.ObserverEvent.VALUE_CHANGED)
+    for vin in ['VIN1', 'VIN2', 'VIN3']:
+        vehicle = addressable.AddressableObject(localAddress=vin, parent=vehicles)
+        soc = addressable.AddressableAttribute(localAddress='soc', parent=vehicle, value=None, valueType=int)
+        soc.setValueWithCarTime(50, fromServer=True)
+        soc.setValueWithCarTime(60, fromServer=True)
+    assert len(stream._EventStream__matches) == 2
+    assert len(stream) == 6
+    stream.close()
@@ -0,0 +1,273 @@
+from datetime import datetime, timezone
+from enum import Enum
+import math
+
+import pytest
+
+from weconnect import addressable
+from weconnect.fleet.columnar import Column, FleetColumns
+from weconnect.fleet.observer import FleetObserver
+from weconnect.fleet.sessions import ChargingSessionDetector
+from weconnect.fleet.aggregates import Aggregate, FleetAggregates
+from weconnect.fleet.index import FleetIndex, Range
+from weconnect.fleet.geo import GeoIndex
+from weconnect.fleet import trips as trip_module
+from weconnect.fleet.trips import TripBuilder
+from weconnect.api.cupra.elements.charging_status import ChargingStatus
+
+
+class State(Enum):
+    OFF = 'off'
+    ON = 'on'
+
+
+def buildVehicles(count):
+    root = addressable.AddressableObject(localAddress='', parent=None)
+    vehicles = addressable.AddressableDict(localAddress='vehicles', parent=root)
+    for number in range(count):
+        vin = f'VIN{number}'
+        vehicle = addressable.AddressableObject(localAddress=vin, parent=vehicles)
+        vehicles[vin] = vehicle
+        vehicle.status = addressable.AddressableObject(localAddress='status', parent=vehicle)
+        status = vehicle.status
+        status.soc = addressable.AddressableAttribute(localAddress='soc', parent=status, value=50 + number, valueType=int)
+        status.state = addressable.AddressableAttribute(localAddress='state', parent=status, value=State.ON if number % 2 else State.OFF,
+                                                        valueType=State)
+        addressable.AddressableAttribute(localAddress='captured', parent=status, value=datetime(2023, 1, 1, tzinfo=timezone.utc), valueType=datetime)
+        addressable.AddressableAttribute(localAddress='locked', parent=status, value=number == 0, valueType=bool)
+        if number == 0:
+            addressable.AddressableAttribute(localAddress='nickname', parent=vehicle, value='Born', valueType=str)
+    return vehicles
+
+
+def test_fleet_columns():
+    vehicles = buildVehicles(3)
+
+    columns = FleetColumns.fromVehicles(vehicles)
+    assert columns.vins == ['VIN0', 'VIN1', 'VIN2']
+    assert list(columns.columns) == ['status/soc', 'status/state', 'status/captured', 'status/locked', 'nickname']
+    assert list(columns.columns['status/soc'].data) == [50.0, 51.0, 52.0]
+    assert list(columns.columns['status/state'].data) == [0, 1, 0]
+    assert columns.columns['status/state'].categories == ('off', 'on')
+    assert list(columns.columns['status/captured'].data) == [1672531200000000] * 3
+    assert list(columns.columns['status/locked'].data) == [1, 0, 0]
+    assert columns.columns['nickname'].data == ['Born', None, None]
+
+    columns = FleetColumns.fromVehicles(vehicles, pattern='status/s*')
+    assert list(columns.columns) == ['status/soc', 'status/state']
+
+    numpy = pytest.importorskip('numpy')
+    arrays = columns.toNumpy()
+    assert arrays['status/soc'].dtype == numpy.float64
+    # Numeric columns are views on the exported data
+    assert numpy.shares_memory(arrays['status/state'], numpy.frombuffer(columns.columns['status/state'].data, dtype=numpy.int16))
+    assert Column.kindOf((State, float)) == (Column.CATEGORY, State)
+
+
+def test_fleet_observer_needs_on_value():
+    class Incomplete(FleetObserver):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete({})
+
+
+def test_charging_sessions():
+    detector = ChargingSessionDetector(maxSamples=4)
+    sessions = []
+    detector.addRecordObserver(sessions.append)
+
+    start = datetime(2023, 1, 1, tzinfo=timezone.utc).timestamp()
+    records = [('VIN0', 'soc', start, 20), ('VIN0', 'state', start, 'charging'), ('VIN0', 'power', start, 10.0)]
+    # 11 kW for one hour in 10 minute samples, more samples than the buffer holds
+    records += [('VIN0', 'power', start + 600 * step, 11.0) for step in range(1, 7)]
+    records += [('VIN0', 'soc', start + 3600 + 600, 40), ('VIN0', 'state', start + 3600 + 600, 'readyForCharging')]
+    detector.replay(records)
+
+    assert len(sessions) == 1
+    session = sessions[0]
+    assert session.energy_kWh == pytest.approx(10.0 / 6 + 11.0)
+    assert session.peakPower_kW == 11.0
+    assert session.socDelta_pct == 20
+    assert session.averagePower_kW == pytest.approx((10.0 / 6 + 11.0) / (70 / 60))
+    assert detector.runningSession('VIN0') is None
+
+    # Live values from the tree are processed the same way
+    root = addressable.AddressableObject(localAddress='', parent=None)
+    vehicles = addressable.AddressableDict(localAddress='vehicles', parent=root)
+    vehicle = addressable.AddressableObject(localAddress='VIN1', parent=vehicles)
+    vehicles['VIN1'] = vehicle
+    domains = addressable.AddressableObject(localAddress='domains', parent=vehicle)
+    charging = addressable.AddressableObject(localAddress='charging', parent=domains)
+    status = addressable.AddressableObject(localAddress='chargingStatus', parent=charging)
+    state = addressable.AddressableAttribute(localAddress='chargingState', parent=status, value=None,
+                                             valueType=ChargingStatus.ChargingState)
+    detector.attach(vehicles)
+    state.setValueWithCarTime(ChargingStatus.ChargingState.CHARGING, fromServer=True)
+    assert detector.runningSession('VIN1') is not None
+    state.setValueWithCarTime(ChargingStatus.ChargingState.READY_FOR_CHARGING, fromServer=True)
+    assert len(sessions) == 2 and sessions[1].vin == 'VIN1'
+    detector.detach()
+
+
+def test_charge_eta():
+    pytest.importorskip('numpy')
+    from weconnect.fleet.eta import ChargeEtaEstimator
+
+    estimator = ChargeEtaEstimator(window=3, capacity=1)
+    start = datetime(2023, 1, 1, tzinfo=timezone.utc).timestamp()
+    records = [('VIN0', 'target', start, 80), ('VIN0', 'soc', start, 20), ('VIN0', 'state', start, 'charging'),
+               ('VIN1', 'state', start, 'charging'), ('VIN1', 'remaining', start, 90), ('VIN2', 'soc', start, 50)]
+    # 10 percent per hour, the first samples leave the window
+    records += [('VIN0', 'soc', start + 1800 * step, 20 + 5 * step) for step in range(1, 6)]
+    estimator.replay(records)
+
+    assert estimator.vins == ['VIN0', 'VIN1', 'VIN2']
+    assert estimator.rates()[0] == pytest.approx(10.0)
+    eta = estimator.estimate()
+    # 45 percent reached after 2.5 hours, 35 percent missing to the target
+    assert eta[0] == pytest.approx(start + 2.5 * 3600 + 3.5 * 3600)
+    assert eta[1] == start + 90 * 60
+    assert estimator.eta('VIN2') is None
+
+    # Removing all fields of a vehicle drops it, the other vehicles keep their state
+    for field in ('target', 'soc', 'state'):
+        estimator.onRemoved('VIN0', field)
+    assert estimator.vins == ['VIN2', 'VIN1']
+    assert estimator.eta('VIN0') is None
+    assert estimator.estimate()[1] == start + 90 * 60
+    estimator.onRemoved('VIN1', 'state')
+    assert estimator.vins == ['VIN2', 'VIN1']
+    assert math.isnan(estimator.estimate()[1])
+
+    # Every session has its own time origin, a short session decades after the first sample is still fitted exactly
+    later = start + 20 * 365 * 86400
+    estimator.replay([('VIN2', 'state', start, 'charging'), ('VIN2', 'state', start + 1, 'off'), ('VIN2', 'state', later, 'charging')]
+                     + [('VIN2', 'soc', later + 36 * step, 50 + 0.01 * step) for step in range(40)])
+    assert estimator.rates()[0] == pytest.approx(1.0, rel=1e-6)
+
+
+def test_fleet_aggregates():
+    vehicles = buildVehicles(4)
+    aggregates = FleetAggregates()
+    aggregates.add('on', 'status/state', Aggregate.Kind.COUNT, predicate=lambda state: state == State.ON)
+    aggregates.add('soc', 'status/soc', Aggregate.Kind.AVERAGE)
+    aggregates.add('socTotal', 'status/soc', Aggregate.Kind.SUM)
+    aggregates.add('socMax', 'status/soc', Aggregate.Kind.MAX)
+    aggregates.attach(vehicles)
+    assert aggregates.asDict() == {'on': 2, 'soc': 51.5, 'socTotal': 206.0, 'socMax': 53.0}
+
+    vehicles['VIN3'].status.soc.setValueWithCarTime(20, fromServer=True)
+    vehicles['VIN1'].status.state.setValueWithCarTime(State.OFF, fromServer=True)
+    assert aggregates['on'] == 1
+    assert aggregates['socMax'] == 52.0
+    assert aggregates.aggregates['socMax'].argument() == 'VIN2'
+
+    # Removed vehicles do not count anymore
+    vehicles['VIN2'].enabled = False
+    assert aggregates['socMax'] == 51.0
+    assert aggregates['socTotal'] == 121.0
+    assert aggregates['soc'] == pytest.approx(121.0 / 3)
+    aggregates.detach()
+
+
+def test_fleet_index():
+    vehicles = buildVehicles(6)
+    index = FleetIndex()
+    index.addHashIndex('state', 'status/state')
+    index.addSortedIndex('soc', 'status/soc')
+    index.attach(vehicles)
+
+    assert index.query(state=State.ON) == {'VIN1', 'VIN3', 'VIN5'}
+    assert index.query(soc=Range(high=52, includeHigh=False)) == {'VIN0', 'VIN1'}
+    assert index.query(soc=Range(low=52, high=54), state=[State.OFF]) == {'VIN2', 'VIN4'}
+    assert index.query({'soc': Range(low=53, includeLow=False), 'state': State.ON}) == {'VIN5'}
+
+    vehicles['VIN5'].status.soc.setValueWithCarTime(10, fromServer=True)
+    vehicles['VIN0'].status.state.setValueWithCarTime(State.ON, fromServer=True)
+    assert index.query(soc=Range(high=20), state=State.ON) == {'VIN5'}
+    assert index.indexes['soc'].smallest(2) == [('VIN5', 10.0), ('VIN0', 50.0)]
+    assert index.query(state=State.ON) == {'VIN0', 'VIN1', 'VIN3', 'VIN5'}
+
+    vehicles['VIN5'].enabled = False
+    assert index.query(soc=Range(high=20)) == set()
+    assert index.query(state=State.ON) == {'VIN0', 'VIN1', 'VIN3'}
+    with pytest.raises(ValueError):
+        index.query(soc=20)
+    index.detach()
+
+
+def test_geo_index():
+    numpy = pytest.importorskip('numpy')
+    generator = numpy.random.default_rng(1)
+    positions = {f'VIN{number}': (float(generator.uniform(-80, 80)), float(generator.uniform(-180, 180))) for number in range(500)}
+    # A cluster around the antimeridian
+    positions.update({f'EDGE{number}': (10.0, 179.95 + number * 0.02) for number in range(5)})
+    positions = {vin: (latitude, (longitude + 180) % 360 - 180) for vin, (latitude, longitude) in positions.items()}
+    index = GeoIndex(cellSize=1.0)
+    index.replay((vin, field, 0.0, position[0] if field == 'latitude' else position[1])
+                 for vin, position in positions.items() for field in ('latitude', 'longitude'))
+    assert len(index) == len(positions)
+
+    def bruteForce(latitude, longitude):
+        vins = list(positions)
+        return vins, index.distances(latitude, longitude, numpy.array([index.vins.index(vin) for vin in vins]))
+
+    for latitude, longitude in ((48.1, 11.6), (10.0, -179.99), (-60.0, 20.0)):
+        vins, distances = bruteForce(latitude, longitude)
+        expected = [vins[position] for position in numpy.argsort(distances, kind='stable')[:7]]
+        assert [vin for vin, _ in index.nearest(latitude, longitude, 7)] == expected
+    edges = index.nearest(10.0, 180.0, 5, maxDistance_km=100)
+    assert sorted(vin for vin, _ in edges) == [f'EDGE{number}' for number in range(5)]
+    assert all(distance <= 100 for _, distance in edges)
+
+    assert sorted(index.boundingBox(9.0, 179.9, 11.0, -179.9)) == [f'EDGE{number}' for number in range(5)]
+    expected = sorted(vin for vin, (latitude, longitude) in positions.items() if 0 <= latitude <= 40 and -20 <= longitude <= 30)
+    assert sorted(index.boundingBox(0, -20, 40, 30)) == expected
+    assert sorted(index.withinPolygon([(0, -20), (40, -20), (40, 30), (0, 30)])) == expected
+    triangle = sorted(index.withinPolygon([(0, 0), (40, 0), (0, 40)]))
+    assert triangle == sorted(vin for vin, (latitude, longitude) in positions.items() if latitude >= 0 and longitude >= 0 and latitude + longitude <= 40)
+
+    # Moving and removing vehicles
+    index.onValue('VIN0', 'latitude', 0.0, 10.0)
+    index.onValue('VIN0', 'longitude', 0.0, 179.9)
+    assert 'VIN0' in index.boundingBox(9.0, 179.8, 11.0, -179.9)
+    index.replay([('EDGE0', 'latitude', 0.0, None), ('EDGE0', 'longitude', 0.0, None)])
+    assert len(index) == len(positions) - 1
+    assert 'EDGE0' not in index.boundingBox(9.0, 179.8, 11.0, -179.9)
+    assert index.position('EDGE0') is None
+
+
+def test_trips(monkeypatch):
+    builder = TripBuilder()
+    trips = []
+    builder.addRecordObserver(trips.append)
+    start = datetime(2023, 1, 1, 8, tzinfo=timezone.utc).timestamp()
+    builder.replay([('VIN1', 'latitude', start, 48.0), ('VIN1', 'longitude', start, 11.0), ('VIN1', 'odometer', start, 1000),
+                    ('VIN1', 'odometer', start + 600, 1000),
+                    # No position while driving, the odometer is reported before the new position
+                    ('VIN1', 'latitude', start + 900, None), ('VIN1', 'longitude', start + 900, None),
+                    ('VIN1', 'odometer', start + 3000, 1042),
+                    ('VIN1', 'latitude', start + 3600, 48.3), ('VIN1', 'longitude', start + 3600, 11.2),
+                    # GPS jitter is no trip
+                    ('VIN1', 'latitude', start + 4000, 48.3001)])
+    assert len(trips) == 1
+    assert trips[0].start == datetime(2023, 1, 1, 8, 10, tzinfo=timezone.utc)
+    assert trips[0].end == datetime(2023, 1, 1, 9, tzinfo=timezone.utc)
+    assert (trips[0].startLatitude, trips[0].endLongitude, trips[0].distance_km) == (48.0, 11.2, 42)
+    assert trips[0].straightDistance_km == pytest.approx(36.6, abs=0.1)
+
+    # Snapshots of two vehicles every five minutes, VIN2 drives twice and VIN3 only reports its position
+    rows = []
+    for step in range(100):
+        rows.append(('VIN2', start + step * 300, 50.0 if step < 30 else 50.2 if step < 70 else 50.0, 8.0, 500 + (step >= 30) * 25 + (step >= 70) * 25))
+        rows.append(('VIN3', start + step * 300, 40.0 + step, 2.0, math.nan))
+    columns = list(zip(*rows))
+    numpyTrips = TripBuilder()
+    numpyTrips.replaySnapshots(*columns)
+    monkeypatch.setattr(trip_module, 'SUPPORT_NUMPY', False)
+    pythonTrips = TripBuilder()
+    pythonTrips.replaySnapshots(*columns)
+    for builder in (numpyTrips, pythonTrips):
+        assert [(trip.vin, trip.start.timestamp() - start, trip.end.timestamp() - start, trip.endLatitude, trip.distance_km)
+                for trip in builder.trips] == [('VIN2', 29 * 300, 30 * 300, 50.2, 25), ('VIN2', 69 * 300, 70 * 300, 50.0, 25)]
@@ -0,0 +1,68 @@
+import threading
+
+from weconnect import addressable
+from weconnect.observer_executor import ObserverExecutor
+
+
+def test_ObserverExecutorOrdering():
+    executor = ObserverExecutor(workers=2, queueSize=10)
+    root = addressable.AddressableObject(localAddress='root', parent=None)
+    root.setObserverExecutor(executor)
+    attribute = addressable.AddressableAttribute(localAddress='attribute', parent=root, value=None, valueType=int)
+
+    values = []
+    attribute.addObserver(lambda element, flags: values.append(element.value), addressable.AddressableLeaf.ObserverEvent.VALUE_CHANGED)
+    for value in range(5):
+        attribute.setValueWithCarTime(value, fromServer=True, noNotify=True)
+        attribute.notify(addressable.AddressableLeaf.ObserverEvent.VALUE_CHANGED)
+    executor.join()
+    assert len(values) == 5
+    assert executor.getMetrics()['executed'] == 5
+    executor.shutdown()
+
+
+def test_ObserverExecutorDropPolicies():
+    release = threading.Event()
+    started = threading.Event()
+
+    def blockingObserver(value):
+        started.set()
+        release.wait()
+
+    for policy, expected in [(ObserverExecutor.Policy.DROP_NEWEST, [0, 1, 2]), (ObserverExecutor.Policy.DROP_OLDEST, [0, 3, 4])]:
+        release.clear()
+        started.clear()
+        executor = ObserverExecutor(workers=1, queueSize=2, policy=policy)
+        results = []
+
+        def observer(value):
+            results.append(value)
+            if value == 0:
+                blockingObserver(value)
+
+        executor.submit(observer, value=0)
+        started.wait()
+        for value in range(1, 5):
+            executor.submit(observer, value=value)
+        assert executor.queueDepth == 2
+        assert executor.dropped == 2
+        release.set()
+        executor.join()
+        assert results == expected
+        executor.shutdown()
+
+
+def test_ObserverExecutorAfterShutdown():
+    executor = ObserverExecutor(workers=1, queueSize=10)
+    root = addressable.AddressableObject(localAddress='root', parent=None)
+    root.setObserverExecutor(executor)
+    attribute = addressable.AddressableAttribute(localAddress='attribute', parent=root, value=None, valueType=int)
+
+    values = []
+    attribute.addObserver(lambda element, flags: values.append(element.value), addressable.AddressableLeaf.ObserverEvent.VALUE_CHANGED)
+    executor.shutdown()
+    attribute.setValueWithCarTime(1, fromServer=True)
+    assert attribute.value == 1
+    assert values == []
+    assert executor.submit(print) is False
+    assert executor.dropped == 2
@@ -0,0 +1,94 @@
+import threading
+
+import pytest
+
+from weconnect.observer_executor import ObserverExecutor
+from weconnect.scheduler import Scheduler, getDefaultScheduler
+from weconnect.api.cupra.domain import Domain
+from weconnect.api.cupra.elements.helpers.request_tracker import RequestTracker
+from weconnect.api.vw.domain import Domain as VWDomain
+from weconnect.api.vw.elements.helpers.request_tracker import RequestTracker as VWRequestTracker
+
+
+def test_SchedulerCoalescing():
+    scheduler = Scheduler(workers=1)
+    calls = []
+    done = threading.Event()
+
+    def callback(name):
+        calls.append(name)
+        if len(calls) == 2:
+            done.set()
+
+    assert scheduler.schedule('first', 0.2, lambda: callback('first'))
+    # Merged into the pending call, which keeps its callback but becomes due earlier
+    assert not scheduler.schedule('first', 0.05, lambda: callback('merged'))
+    assert not scheduler.schedule('first', 1.0, lambda: callback('merged'))
+    assert scheduler.schedule('second', 0.1, lambda: callback('second'))
+    assert scheduler.schedule('cancelled', 0.01, lambda: callback('cancelled'))
+    assert scheduler.cancel('cancelled')
+    assert not scheduler.cancel('cancelled')
+    assert done.wait(5)
+    assert calls == ['first', 'second']
+
+    metrics = scheduler.getMetrics()
+    assert (metrics['pending'], metrics['scheduled'], metrics['coalesced'], metrics['cancelled'], metrics['dispatched']) == (0, 3, 2, 1, 2)
+    scheduler.shutdown()
+
+
+def test_RequestTrackerScheduling():
+    scheduler = Scheduler(workers=1)
+    tracker = RequestTracker(vehicle=None, scheduler=scheduler)
+    # Clearing without pending requests must not fail
+    tracker.clear()
+    tracker.trackRequest('1', Domain.ALL, 20, 120)
+    tracker.trackRequest('2', Domain.ALL, 20, 120)
+    assert tracker.pendingRequests == 2
+    assert scheduler.pending == 1
+    tracker.clear()
+    assert tracker.pendingRequests == 0
+    assert scheduler.pending == 0
+    scheduler.shutdown()
+
+
+def test_SchedulerRequeuesDroppedCalls(monkeypatch):
+    monkeypatch.setattr(Scheduler, 'RETRY_DELAY', 0.02)
+    scheduler = Scheduler(workers=1, queueSize=1, policy=ObserverExecutor.Policy.DROP_NEWEST)
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+    done = threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    def callback(name):
+        calls.append(name)
+        if len(calls) == 2:
+            done.set()
+
+    scheduler.schedule('block', 0, block)
+    assert started.wait(5)
+    # The worker is busy and its queue holds one call, the second one is dropped by the executor and scheduled again
+    scheduler.schedule('first', 0.01, lambda: callback('first'))
+    scheduler.schedule('second', 0.01, lambda: callback('second'))
+    while scheduler.getMetrics()['requeued'] == 0:
+        assert not done.wait(0.01)
+    release.set()
+    assert done.wait(5)
+    assert sorted(calls) == ['first', 'second']
+    scheduler.shutdown()
+
+
+@pytest.mark.parametrize('trackerClass, domain', [(RequestTracker, Domain.ALL), (VWRequestTracker, VWDomain.ALL)])
+def test_DefaultSchedulerAfterShutdown(trackerClass, domain):
+    tracker = trackerClass(vehicle=None)
+    getDefaultScheduler().shutdown()
+    tracker.trackRequest('1', domain, 20, 120)
+    scheduler = getDefaultScheduler()
+    assert scheduler.running
+    assert tracker.scheduler is scheduler
+    assert scheduler.pending == 1
+    tracker.clear()
+    assert scheduler.pending == 0
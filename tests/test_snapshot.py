@@ -0,0 +1,137 @@
+from datetime import datetime, timezone
+from enum import Enum
+
+from weconnect import addressable
+from weconnect import snapshot
+from weconnect.api.cupra.elements.enums import ClimatizationState
+
+
+def buildTree():
+    root = addressable.AddressableObject(localAddress='', parent=None)
+    vehicles = addressable.AddressableDict(localAddress='vehicles', parent=root)
+    return root, vehicles
+
+
+def test_snapshot_roundtrip(tmp_path):
+    root, vehicles = buildTree()
+    vehicle = addressable.AddressableObject(localAddress='VIN1', parent=vehicles)
+    vehicles['VIN1'] = vehicle
+    captured = datetime(2022, 11, 6, 15, 25, 50, tzinfo=timezone.utc)
+    values = {'soc': 55, 'range': 250.5, 'name': 'ID.3', 'plugged': True, 'captured': captured,
+              'state': ClimatizationState.HEATING, 'raw': {'a': [1, 2]}, 'empty': None}
+    for name, value in values.items():
+        attribute = addressable.AddressableAttribute(localAddress=name, parent=vehicle, value=None, valueType=type(value))
+        attribute.setValueWithCarTime(value, lastUpdateFromCar=captured, fromServer=True)
+        attribute.enabled = True
+    addressable.AddressableAttribute(localAddress='disabled', parent=vehicle, value=None, valueType=int)
+
+    filename = str(tmp_path / 'snapshot.bin')
+    snapshot.saveSnapshot(root, filename)
+
+    restoredRoot, restoredVehicles = buildTree()
+    assert snapshot.loadSnapshot(restoredRoot, filename, knownChildren={'vehicles': restoredVehicles})
+    restored = restoredVehicles['VIN1']
+    assert isinstance(restored, snapshot.SnapshotObject)
+    for name, value in values.items():
+        attribute = restored.getByAddressString(f'VIN1/{name}')
+        assert attribute.value == value
+        assert attribute.lastUpdateFromCar == captured
+        assert attribute.lastChange == vehicle.getByAddressString(f'VIN1/{name}').lastChange
+    assert restored.getByAddressString('VIN1/disabled') is False
+    assert restoredRoot.toJSON() == root.toJSON()
+
+
+def test_snapshot_corrupted(tmp_path):
+    root, _ = buildTree()
+    filename = tmp_path / 'snapshot.bin'
+    assert not snapshot.loadSnapshot(root, str(filename))
+    filename.write_bytes(snapshot.MAGIC + b'\x01\x00\x00')
+    assert not snapshot.loadSnapshot(root, str(filename))
+    assert not filename.exists()
+
+
+def test_snapshot_corrupted_leaves_tree_unchanged(tmp_path):
+    root, vehicles = buildTree()
+    vehicle = addressable.AddressableObject(localAddress='VIN1', parent=vehicles)
+    vehicles['VIN1'] = vehicle
+    for name, value in {'first': 1, 'raw': {'a': 1}, 'last': 'x'}.items():
+        attribute = addressable.AddressableAttribute(localAddress=name, parent=vehicle, value=None, valueType=type(value))
+        attribute.setValueWithCarTime(value, fromServer=True)
+        attribute.enabled = True
+    filename = tmp_path / 'snapshot.bin'
+    snapshot.saveSnapshot(root, str(filename))
+    data = filename.read_bytes()
+
+    # Invalid JSON and invalid UTF-8 after the first attribute was decoded
+    for corrupted in (data.replace(b'{"a": 1}', b'{"a": 1]'), data.replace(b'last', b'l\xffst')):
+        filename.write_bytes(corrupted)
+        restoredRoot, restoredVehicles = buildTree()
+        assert not snapshot.loadSnapshot(restoredRoot, str(filename), knownChildren={'vehicles': restoredVehicles})
+        assert 'VIN1' not in restoredVehicles
+        assert not filename.exists()
+
+
+class Unknown(Enum):
+    VALUE = 'value'
+
+
+def test_snapshot_enum_outside_package(tmp_path):
+    root, vehicles = buildTree()
+    attribute = addressable.AddressableAttribute(localAddress='state', parent=vehicles, value=None, valueType=Unknown)
+    attribute.setValueWithCarTime(Unknown.VALUE, fromServer=True)
+    attribute.enabled = True
+    filename = str(tmp_path / 'snapshot.bin')
+    snapshot.saveSnapshot(root, filename)
+
+    restoredRoot, restoredVehicles = buildTree()
+    assert snapshot.loadSnapshot(restoredRoot, filename, knownChildren={'vehicles': restoredVehicles})
+    assert restoredVehicles.getByAddressString('vehicles/state').value == 'value'
+
+
+class Status(addressable.AddressableObject):
+    def __init__(self, localAddress, parent):
+        super().__init__(localAddress=localAddress, parent=parent)
+        self.soc = addressable.AddressableAttribute(localAddress='soc', parent=self, value=None, valueType=int)
+
+
+def test_snapshot_no_placeholders_in_existing_objects(tmp_path):
+    root, vehicles = buildTree()
+    vehicle = snapshot.SnapshotObject(localAddress='VIN1', parent=vehicles)
+    vehicles['VIN1'] = vehicle
+    status = addressable.AddressableObject(localAddress='status', parent=vehicle)
+    for name, value in {'soc': 42, 'range': 300}.items():
+        attribute = addressable.AddressableAttribute(localAddress=name, parent=status, value=None, valueType=int)
+        attribute.setValueWithCarTime(value, fromServer=True)
+        attribute.enabled = True
+    filename = str(tmp_path / 'snapshot.bin')
+    snapshot.saveSnapshot(root, filename)
+
+    restoredRoot, restoredVehicles = buildTree()
+    restoredVehicle = snapshot.SnapshotObject(localAddress='VIN1', parent=restoredVehicles)
+    restoredVehicles['VIN1'] = restoredVehicle
+    restoredStatus = Status(localAddress='status', parent=restoredVehicle)
+    restoredStatus.soc.setValueWithCarTime(10, fromServer=True)
+    assert snapshot.loadSnapshot(restoredRoot, filename, knownChildren={'vehicles': restoredVehicles})
+    assert restoredStatus.soc.value == 42
+    assert restoredVehicles.getByAddressString('VIN1/status/range') is False
+
+
+def test_snapshot_list_with_equal_items(tmp_path):
+    root, vehicles = buildTree()
+    vehicle = addressable.AddressableObject(localAddress='VIN1', parent=vehicles)
+    vehicles['VIN1'] = vehicle
+    chargers = addressable.AddressableList(localAddress='chargers', parent=vehicle)
+    # Empty dicts compare equal, the restored list still needs both of them
+    for index in range(2):
+        charger = addressable.AddressableDict(localAddress=str(index), parent=chargers)
+        charger.enabled = True
+        chargers.append(charger)
+    chargers.enabled = True
+    filename = str(tmp_path / 'snapshot.bin')
+    snapshot.saveSnapshot(root, filename)
+
+    restoredRoot, restoredVehicles = buildTree()
+    assert snapshot.loadSnapshot(restoredRoot, filename, knownChildren={'vehicles': restoredVehicles})
+    restoredChargers = restoredVehicles.getByAddressString('vehicles/VIN1/chargers')
+    assert len(restoredChargers) == 2
+    assert restoredChargers[0] is not restoredChargers[1]
@@ -1,13 +1,23 @@
 from __future__ import annotations
-from typing import Callable, NoReturn, Optional, Dict, List, Set, Any, Tuple, Union, Type, TypeVar, Generic
+from typing import Callable, NoReturn, Optional, Dict, List, Set, Any, Tuple, Union, Type, TypeVar, Generic, Iterator, FrozenSet, Deque
 
 import json
 import logging
+import re
+import fnmatch
+import functools
+import contextlib
+import threading
+import weakref
+from collections import deque
 import time as timemodule
 from datetime import datetime, timezone, time
 from enum import Enum, IntEnum, Flag, auto
 
 from weconnect_cupra.util import toBool, imgToASCIIArt, robustTimeParse, ExtendedWithNullEncoder
+from weconnect_cupra.observer_executor import ObserverExecutor
+from weconnect_cupra.observer_registry import ObserverHandle, ObserverRegistry
+from weconnect_cupra.history import AttributeHistory
 
 SUPPORT_IMAGES = False
 try:
@@ -25,8 +35,49 @@ except ImportError:
 
 LOG: logging.Logger = logging.getLogger("weconnect_cupra")
 
+_sharedTimestamp: Tuple[int, Optional[datetime]] = (-1, None)
+
+
+def sharedUtcNow() -> datetime:
+    """Returns the current UTC time truncated to seconds. Calls within the same second share one datetime object.
+    Within a transaction all calls return the time the transaction started"""
+    global _sharedTimestamp  # pylint: disable=global-statement
+    transaction: Optional[Transaction] = _transactionState.transaction
+    if transaction is not None:
+        return transaction.timestamp
+    second: int = int(timemodule.time())
+    if _sharedTimestamp[0] != second:
+        _sharedTimestamp = (second, datetime.fromtimestamp(second, tz=timezone.utc))
+    return _sharedTimestamp[1]
+
+
+class _AddressToken():
+    __slots__ = ('valid',)
+
+    def __init__(self) -> None:
+        self.valid: bool = True
+
 
 class AddressableLeaf():
+    # The state of a leaf is stored in slots by the numerous attribute classes (see AddressableAttribute) and in the
+    # instance dictionary by objects. The layout itself has to be empty to allow objects that are also dicts or lists
+    __slots__ = ()
+    _leafSlots: Tuple[str, ...] = ('_AddressableLeaf__enabled', '_AddressableLeaf__localAddress', '_AddressableLeaf__parent',
+                                   '_AddressableLeaf__globalAddress', '_AddressableLeaf__addressToken', '_AddressableLeaf__observers',
+                                   '_AddressableLeaf__modificationStamp', '_AddressableLeaf__enabledStamp',
+                                   'lastChange', 'lastUpdateFromServer', 'lastUpdateFromCar', 'onCompleteNotifyFlags', '__weakref__')
+
+    # Number of registered change set observers in all trees, changes are only recorded if there is at least one
+    _changeSetObserverCount: int = 0
+    # Incremented on every change that affects serialization, objects remember the stamp of their latest change
+    __modificationCounter: int = 0
+
+    def __new__(cls, *args, **kwargs):  # pylint: disable=unused-argument
+        # AddressableLeaf has no storage of its own, direct construction creates a leaf keeping its state in a dictionary
+        if cls is AddressableLeaf:
+            cls = PlainAddressableLeaf
+        return super().__new__(cls)
+
     def __init__(
         self,
         localAddress: str,
@@ -35,47 +86,76 @@ class AddressableLeaf():
         self.__enabled: bool = False
         self.__localAddress: str = localAddress
         self.__parent: Optional[AddressableObject] = parent
-        self.__observers: Set[Tuple[Callable[[Optional[Any], AddressableLeaf.ObserverEvent], None],
-                                    AddressableLeaf.ObserverEvent, AddressableLeaf.ObserverPriority, bool]] = set()
+        self.__globalAddress: Optional[str] = None
+        self.__addressToken: Optional[_AddressToken] = None
+        self.__modificationStamp: int = 0
+        self.__enabledStamp: int = 0
+        self.__observers: Optional[ObserverRegistry] = None
         self.lastChange: Optional[datetime] = None
         self.lastUpdateFromServer: Optional[datetime] = None
         self.lastUpdateFromCar: Optional[datetime] = None
         self.onCompleteNotifyFlags: Optional[AddressableLeaf.ObserverEvent] = None
 
     def __del__(self) -> None:
-        if self.enabled:
+        # A partially constructed leaf may not have its slots set yet
+        if getattr(self, '_AddressableLeaf__enabled', False):
             self.enabled = False
 
     def addObserver(self, observer: Callable, flag: AddressableLeaf.ObserverEvent, priority: Optional[AddressableLeaf.ObserverPriority] = None,
-                    onUpdateComplete: bool = False) -> None:
+                    onUpdateComplete: bool = False, weak: bool = False) -> ObserverHandle:
+        """Adds an observer for this element and all elements below it. With weak the observer is removed when its
+        object is garbage collected instead of being kept alive. The returned handle removes the observer again"""
         if priority is None:
             priority = AddressableLeaf.ObserverPriority.USER_MID
-        self.__observers.add((observer, flag, priority, onUpdateComplete))
+        if self.__observers is None:
+            self.__observers = ObserverRegistry()
+        handle: ObserverHandle = self.__observers.add(observer, flag, priority, onUpdateComplete, weak=weak)
         LOG.debug('%s: Observer added with flags: %s', self.getGlobalAddress(), flag)
+        return handle
 
     def removeObserver(self, observer: Callable, flag: Optional[AddressableLeaf.ObserverEvent] = None) -> None:
-        self.__observers = filter(lambda observerEntry: observerEntry[0] == observer
-                                  or (flag is not None and observerEntry[1] == flag), self.__observers)
+        """Removes observer, only the registration with exactly these flags if flag is given"""
+        if self.__observers is None:
+            return
+        self.__observers.remove(observer, flag)
 
     def getObservers(self, flags, onUpdateComplete: bool = False) -> List[Any]:
         return [observerEntry[0] for observerEntry in self.getObserverEntries(flags, onUpdateComplete)]
 
     def getObserverEntries(self, flags: AddressableLeaf.ObserverEvent, onUpdateComplete: bool = False) -> List[Any]:
-        observers: Set[Tuple[Callable, AddressableLeaf.ObserverEvent, AddressableLeaf.ObserverPriority, bool]] = set()
-        for observerEntry in self.__observers:
-            observer, observerflags, priority, observerOnUpdateComplete = observerEntry
-            del observer
-            del priority
-            if (flags & observerflags) and observerOnUpdateComplete == onUpdateComplete:
-                observers.add(observerEntry)
-        if self.__parent is not None:
-            observers.update(self.__parent.getObserverEntries(flags, onUpdateComplete))
-        return sorted(observers, key=lambda entry: int(entry[2]))
-
-    def notify(self, flags: AddressableLeaf.ObserverEvent) -> None:
-        observers: List[Callable] = self.getObservers(flags, onUpdateComplete=False)
-        for observer in observers:
-            observer(element=self, flags=flags)
+        observerEntries: Optional[List[Any]] = self.__matchingObserverEntries(flags, onUpdateComplete)
+        return observerEntries if observerEntries is not None else []
+
+    def __matchingObserverEntries(self, flags: AddressableLeaf.ObserverEvent, onUpdateComplete: bool) -> Optional[List[Any]]:
+        # Returns None instead of an empty list, this runs for every notification and usually nobody is observing.
+        # Observers with the same priority are called in the order they were added, closest element first
+        observers: Optional[List[Tuple[Callable, AddressableLeaf.ObserverEvent, AddressableLeaf.ObserverPriority, bool]]] = None
+        element: Optional[AddressableLeaf] = self
+        while element is not None:
+            if element.__observers:
+                for observerEntry in element.__observers.entries():
+                    if observerEntry[3] == onUpdateComplete and (flags & observerEntry[1]):
+                        if observers is None:
+                            observers = [observerEntry]
+                        elif observerEntry not in observers:
+                            observers.append(observerEntry)
+            element = element.__parent
+        if observers is None:
+            return None
+        if len(observers) > 1:
+            observers.sort(key=lambda entry: int(entry[2]))
+        return observers
+
+    def notify(self, flags: AddressableLeaf.ObserverEvent, previousValue: Optional[Any] = None) -> None:
+        transaction: Optional[Transaction] = _transactionState.transaction
+        if transaction is not None:
+            transaction.deferNotification(self, flags, previousValue)
+            return
+        observerEntries: Optional[List[Any]] = self.__matchingObserverEntries(flags, onUpdateComplete=False)
+        if observerEntries is not None:
+            self.__callObservers(observerEntries, flags)
+        if AddressableLeaf._changeSetObserverCount > 0:
+            self.__recordChangeUpwards(flags, previousValue)
         if self.onCompleteNotifyFlags is not None:
             # Remove disabled if was enabled and not yet notified
             if (flags & AddressableLeaf.ObserverEvent.ENABLED) and (self.onCompleteNotifyFlags & AddressableLeaf.ObserverEvent.DISABLED):
@@ -87,17 +167,34 @@ class AddressableLeaf():
                 self.onCompleteNotifyFlags |= flags
         else:
             self.onCompleteNotifyFlags = flags
-        LOG.debug('%s: Notify called with flags: %s for %d observers', self.getGlobalAddress(), flags, len(observers))
+        if LOG.isEnabledFor(logging.DEBUG):
+            LOG.debug('%s: Notify called with flags: %s for %d observers', self.getGlobalAddress(), flags,
+                      len(observerEntries) if observerEntries is not None else 0)
 
     def updateComplete(self) -> None:
         if self.onCompleteNotifyFlags is not None:
-            observers = self.getObservers(self.onCompleteNotifyFlags, onUpdateComplete=True)
-            for observer in observers:
-                observer(element=self, flags=self.onCompleteNotifyFlags)
-            if len(observers) > 0:
-                LOG.debug('%s: Notify called on update complete with flags: %s for %d observers', self.getGlobalAddress(),
-                          self.onCompleteNotifyFlags, len(observers))
+            flags: AddressableLeaf.ObserverEvent = self.onCompleteNotifyFlags
             self.onCompleteNotifyFlags = None
+            observerEntries: Optional[List[Any]] = self.__matchingObserverEntries(flags, onUpdateComplete=True)
+            if observerEntries is None:
+                return
+            self.__callObservers(observerEntries, flags)
+            LOG.debug('%s: Notify called on update complete with flags: %s for %d observers', self.getGlobalAddress(),
+                      flags, len(observerEntries))
+
+    def __callObservers(self, observerEntries: List[Any], flags: AddressableLeaf.ObserverEvent) -> None:
+        executor: Optional[ObserverExecutor] = self.getObserverExecutor()
+        for observer, _, _, _ in observerEntries:
+            if executor is None:
+                observer(element=self, flags=flags)
+            else:
+                executor.submit(observer, element=self, flags=flags)
+
+    def __recordChangeUpwards(self, flags: AddressableLeaf.ObserverEvent, previousValue: Optional[Any]) -> None:
+        element: Optional[AddressableLeaf] = self
+        while element is not None:
+            element._recordChange(self, flags, previousValue)
+            element = element.parent
 
     @property
     def enabled(self) -> bool:
@@ -110,8 +207,20 @@ class AddressableLeaf():
                 self.parent.addChild(self)
             self.notify(AddressableLeaf.ObserverEvent.ENABLED)
         elif not setEnabled and self.__enabled:
-            self.notify(AddressableLeaf.ObserverEvent.DISABLED)
-        self.__enabled = setEnabled
+            self.notify(AddressableLeaf.ObserverEvent.DISABLED, previousValue=self._changeValue())
+        if setEnabled != self.__enabled:
+            transaction: Optional[Transaction] = _transactionState.transaction
+            if transaction is not None:
+                transaction.recordUndo(AddressableLeaf.__restoreEnabled, self, self.__enabled)
+            if not setEnabled:
+                self._recordRemoval()
+            self.__enabled = setEnabled
+            self._markModified()
+            if setEnabled:
+                self.__enabledStamp = self.__modificationStamp
+
+    def __restoreEnabled(self, enabled: bool) -> None:
+        self.enabled = enabled
 
     @property
     def localAddress(self) -> str:
@@ -119,7 +228,19 @@ class AddressableLeaf():
 
     @localAddress.setter
     def localAddress(self, newAdress: str) -> None:
+        if newAdress == self.__localAddress:
+            return
+        index: Optional[Dict[str, AddressableLeaf]] = self._getAddressIndex(create=False)
+        if index is not None:
+            self._unregisterAddresses(index)
+        attached: bool = self.__parent is not None and self.__parent.removeChild(self)
         self.__localAddress = newAdress
+        self.__invalidateAddresses()
+        self._markModified()
+        if self.__parent is None:
+            self._dropAddressIndex()
+        elif attached:
+            self.__parent._attachChild(self)
 
     @property
     def parent(self) -> Optional[AddressableObject]:
@@ -127,17 +248,124 @@ class AddressableLeaf():
 
     @parent.setter
     def parent(self, newParent: AddressableObject):
+        if newParent is self.__parent:
+            return
+        oldParent: Optional[AddressableObject] = self.__parent
+        attached: bool = oldParent is not None and oldParent.removeChild(self)
+        if oldParent is None:
+            self._dropAddressIndex()
         self.__parent = newParent
+        self.__invalidateAddresses()
+        if newParent is not None:
+            if self.__enabled:
+                newParent.addChild(self)
+            elif attached:
+                newParent._attachChild(self)
 
     def getLocalAddress(self) -> str:
         return self.__localAddress
 
     def getGlobalAddress(self) -> str:
-        address = ''
+        # All cached addresses of a tree share one token, renaming or moving an element invalidates the token of its tree
+        # only. Recomputed addresses take the valid token of their parent
+        token: Optional[_AddressToken] = self.__addressToken
+        if token is not None and token.valid:
+            return self.__globalAddress  # type: ignore
+        parent: Optional[AddressableLeaf] = self.__parent
+        if parent is None:
+            self.__globalAddress = self.__localAddress
+            self.__addressToken = _AddressToken()
+        else:
+            self.__globalAddress = f'{parent.getGlobalAddress()}/{self.__localAddress}'
+            self.__addressToken = parent.__addressToken
+        return self.__globalAddress
+
+    def __invalidateAddresses(self) -> None:
+        token: Optional[_AddressToken] = self.__addressToken
+        if token is not None:
+            token.valid = False
+
+    def _getAddressIndex(self, create: bool = True) -> Optional[Dict[str, AddressableLeaf]]:
+        # The index of the root is only returned if this element is reachable from the root. Maintenance does not need
+        # to create the index, it is built from the complete tree on first use
+        if self.__parent is None:
+            return None
+        index: Optional[Dict[str, AddressableLeaf]] = self.getRoot()._getAddressIndex(create=create)
+        if index is not None and index.get(self.getGlobalAddress()) is self:
+            return index
+        return None
+
+    def _dropAddressIndex(self) -> None:
+        pass
+
+    def _registerAddresses(self, index: Dict[str, AddressableLeaf]) -> None:
+        index[self.getGlobalAddress()] = self
+
+    def _unregisterAddresses(self, index: Dict[str, AddressableLeaf]) -> None:
+        address: str = self.getGlobalAddress()
+        if index.get(address) is self:
+            del index[address]
+
+    def getObserverExecutor(self) -> Optional[ObserverExecutor]:
         if self.__parent is not None:
-            address = f'{self.__parent.getGlobalAddress()}/'
-        address += f'{self.__localAddress}'
-        return address
+            return self.__parent.getObserverExecutor()
+        return None
+
+    def _markModified(self) -> None:
+        AddressableLeaf.__modificationCounter += 1
+        stamp: int = AddressableLeaf.__modificationCounter
+        element: Optional[AddressableLeaf] = self
+        while element is not None:
+            element.__modificationStamp = stamp
+            element = element.__parent
+
+    def _markAppeared(self) -> None:
+        # Called when an enabled element shows up under a new address
+        self._markModified()
+        self.__enabledStamp = self.__modificationStamp
+
+    def _recordRemoval(self) -> None:
+        root: AddressableLeaf = self.getRoot()
+        if root is not self:
+            root._addTombstone(self, self.__enabledStamp)
+
+    def _addTombstone(self, element: AddressableLeaf, enabledStamp: int) -> None:
+        pass
+
+    def getAddressSegments(self) -> Tuple[str, ...]:
+        """Local addresses from the root down to this element, the root itself is not included"""
+        segments: List[str] = []
+        element: AddressableLeaf = self
+        while element.__parent is not None:
+            segments.append(element.__localAddress)
+            element = element.__parent
+        return tuple(reversed(segments))
+
+    @staticmethod
+    def currentModificationStamp() -> int:
+        return AddressableLeaf.__modificationCounter
+
+    @property
+    def enabledStamp(self) -> int:
+        """Modification stamp at which the element appeared at its current address"""
+        return self.__enabledStamp
+
+    @property
+    def modificationStamp(self) -> int:
+        """Stamp of the latest change of this element or anywhere below it. Stamps increase with every change"""
+        return self.__modificationStamp
+
+    def _isSerializationCacheable(self) -> bool:
+        return True
+
+    def _toJSONFragment(self) -> Optional[str]:
+        return None
+
+    def _changeValue(self) -> Optional[Any]:
+        return None
+
+    def _recordChange(self, element: AddressableLeaf, flags: AddressableLeaf.ObserverEvent, previousValue: Optional[Any]) -> None:
+        pass
 
     def getByAddressString(self, addressString: str) -> Union[AddressableLeaf, bool]:
         if addressString == self.getLocalAddress():
@@ -174,10 +402,37 @@ class AddressableLeaf():
         INTERNAL_LAST = 8
 
 
+class PlainAddressableLeaf(AddressableLeaf):
+    """Leaf that is neither an attribute nor an object, its state is kept in the instance dictionary"""
+
+
+def _updateFlags(valueChanged: bool, fromServer: bool, fromCar: bool) -> Optional[AddressableLeaf.ObserverEvent]:
+    flags: Optional[AddressableLeaf.ObserverEvent] = None
+    if valueChanged:
+        flags = AddressableLeaf.ObserverEvent.VALUE_CHANGED
+        if fromServer:
+            flags |= AddressableLeaf.ObserverEvent.UPDATED_FROM_SERVER
+    elif fromServer:
+        flags = AddressableLeaf.ObserverEvent.UPDATED_FROM_SERVER
+    if fromCar:
+        flags = AddressableLeaf.ObserverEvent.UPDATED_FROM_CAR if flags is None else flags | AddressableLeaf.ObserverEvent.UPDATED_FROM_CAR
+    return flags
+
+
+# Notification flags of an attribute update indexed by valueChanged * 4 + fromServer * 2 + fromCar
+_UPDATE_FLAGS: Tuple[Optional[AddressableLeaf.ObserverEvent], ...] = tuple(_updateFlags(bool(index & 4), bool(index & 2), bool(index & 1))
+                                                                           for index in range(8))
+
+
 T = TypeVar('T')
 
 
 class AddressableAttribute(AddressableLeaf, Generic[T]):
+    __slots__ = AddressableLeaf._leafSlots + ('__value', 'valueType', 'valueGetter', 'valueSetter')
+
+    # Histories are rare compared to attributes, they are kept here instead of a slot in every attribute
+    _histories: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
     def __init__(
         self,
         localAddress: str,
@@ -211,41 +466,89 @@ class AddressableAttribute(AddressableLeaf, Generic[T]):
             return self.value
         return None
 
+    def _changeValue(self) -> Optional[T]:
+        return self.value
+
+    def enableHistory(self, capacity: int = 1000) -> AttributeHistory:
+        """Starts recording the values of this numeric attribute in a ring buffer of the given capacity. Every change
+        of the value is recorded with the time of the car if known, else the time of the update"""
+        if not issubclass(self.valueType, (int, float)) or issubclass(self.valueType, Enum):
+            raise ValueError(f'{self.getGlobalAddress()}: history is only supported for numeric attributes, not {self.valueType}')
+        history: Optional[AttributeHistory] = AddressableAttribute._histories.get(self)
+        if history is None or history.capacity != capacity:
+            history = AttributeHistory(capacity)
+            if self.value is not None:
+                history.append(self.lastUpdateFromCar or self.lastChange or sharedUtcNow(), self.value)
+            AddressableAttribute._histories[self] = history
+        return history
+
+    def disableHistory(self) -> None:
+        AddressableAttribute._histories.pop(self, None)
+
+    @property
+    def history(self) -> Optional[AttributeHistory]:
+        if not AddressableAttribute._histories:
+            return None
+        return AddressableAttribute._histories.get(self)
+
     def toJSON(self):
         if SUPPORT_IMAGES and isinstance(self.value, Image.Image):
             return None
         return json.dumps(self.value, cls=ExtendedWithNullEncoder, skipkeys=True, indent=4)
 
+    def _isSerializationCacheable(self) -> bool:
+        return self.valueGetter is None
+
+    def _toJSONFragment(self) -> Optional[str]:
+        # Same entries as asDict(filterCallable=filterImages)
+        if self.value is None:
+            return None
+        return self.toJSON()
+
     def setValueWithCarTime(self, newValue, lastUpdateFromCar: Optional[datetime] = None, fromServer: bool = False, noNotify: bool = False) -> None:
         if newValue is not None and not isinstance(newValue, self.valueType):
             raise ValueError(f'{self.getGlobalAddress()}: new value {newValue} must be of type {self.valueType}'
                              f' but is of type {type(newValue)}')
-        valueChanged: bool = newValue != self.__value
+        previousValue: Optional[T] = self.__value
+        transaction: Optional[Transaction] = _transactionState.transaction
+        if transaction is not None:
+            transaction.recordUndo(AddressableAttribute.__restoreValue, self, previousValue, self.lastChange, self.lastUpdateFromServer,
+                                   self.lastUpdateFromCar)
+        valueChanged: bool = newValue != previousValue
         self.__value = newValue
-        flags: Optional[AddressableLeaf.ObserverEvent] = None
         if not self.enabled and valueChanged:
             self.enabled = True
-        self.lastUpdateFromServer = datetime.utcnow().replace(microsecond=0, tzinfo=timezone.utc)
+        now: datetime = sharedUtcNow()
+        self.lastUpdateFromServer = now
         if valueChanged:
-            self.lastChange = datetime.utcnow().replace(microsecond=0, tzinfo=timezone.utc)
-            flags = AddressableLeaf.ObserverEvent.VALUE_CHANGED
-            if fromServer:
-                if flags is None:
-                    flags = AddressableLeaf.ObserverEvent.UPDATED_FROM_SERVER
-                else:
-                    flags |= AddressableLeaf.ObserverEvent.UPDATED_FROM_SERVER
-        elif fromServer:
-            flags = AddressableLeaf.ObserverEvent.UPDATED_FROM_SERVER
-
-        if lastUpdateFromCar is not None and lastUpdateFromCar != self.lastUpdateFromCar:
+            self.lastChange = now
+        fromCar: bool = lastUpdateFromCar is not None and lastUpdateFromCar != self.lastUpdateFromCar
+        if fromCar:
             self.lastUpdateFromCar = lastUpdateFromCar
-            if flags is None:
-                flags = AddressableLeaf.ObserverEvent.UPDATED_FROM_CAR
-            else:
-                flags |= AddressableLeaf.ObserverEvent.UPDATED_FROM_CAR
+        flags: Optional[AddressableLeaf.ObserverEvent] = _UPDATE_FLAGS[valueChanged * 4 + bool(fromServer) * 2 + fromCar]
 
+        if valueChanged:
+            self._markModified()
+            if AddressableAttribute._histories:
+                self.__appendToHistory(lastUpdateFromCar or now, newValue, transaction)
         if not noNotify and flags is not None:
-            self.notify(flags)
+            self.notify(flags, previousValue=previousValue)
+
+    def __appendToHistory(self, timestamp: datetime, value: Optional[T], transaction: Optional[Transaction]) -> None:
+        history: Optional[AttributeHistory] = AddressableAttribute._histories.get(self)
+        if history is not None:
+            evicted: Optional[Tuple[int, float]] = history.append(timestamp, value)
+            if transaction is not None:
+                transaction.recordUndo(history.dropLast, evicted)
+
+    def __restoreValue(self, value: Optional[T], lastChange: Optional[datetime], lastUpdateFromServer: Optional[datetime],
+                       lastUpdateFromCar: Optional[datetime]) -> None:
+        if value != self.__value:
+            self.__value = value
+            self._markModified()
+        self.lastChange = lastChange
+        self.lastUpdateFromServer = lastUpdateFromServer
+        self.lastUpdateFromCar = lastUpdateFromCar
 
     def isLeaf(self) -> bool:  # pylint: disable=R0201
         return True
@@ -334,6 +637,8 @@ class AddressableAttribute(AddressableLeaf, Generic[T]):
 
 
 class ChangeableAttribute(AddressableAttribute):
+    __slots__ = ()
+
     def __init__(
         self,
         localAddress: str,
@@ -408,6 +713,8 @@ class ChangeableAttribute(AddressableAttribute):
 
 
 class AliasChangeableAttribute(ChangeableAttribute):
+    __slots__ = ('targetAttribute', 'conversion')
+
     def __init__(
         self,
         localAddress: str,
@@ -432,7 +739,262 @@ class AliasChangeableAttribute(ChangeableAttribute):
                                                  lastUpdateFromCar=None)
 
 
+class _TransactionState(threading.local):
+    transaction: Optional[Transaction] = None
+
+
+_transactionState: _TransactionState = _TransactionState()
+_transactionLockGuard: threading.Lock = threading.Lock()
+
+
+class Transaction():
+    """Changes to the tree made by one thread between begin and commit or rollback.
+
+    All attributes changed in the transaction share one timestamp, notifications are held back and delivered once per
+    element on commit. On rollback the values, timestamps and enabled states are restored from an undo log and the held
+    back notifications are dropped. Use AddressableObject.transaction() instead of creating transactions directly.
+    """
+
+    def __init__(self) -> None:
+        self.timestamp: datetime = sharedUtcNow()
+        self.__undoLog: List[Tuple[Callable[..., None], Tuple[Any, ...]]] = []
+        self.__notifications: List[Tuple[AddressableLeaf, AddressableLeaf.ObserverEvent, Optional[Any]]] = []
+
+    @staticmethod
+    def current() -> Optional[Transaction]:
+        """The transaction of the calling thread, None if there is none"""
+        return _transactionState.transaction
+
+    def recordUndo(self, undo: Callable[..., None], *args: Any) -> None:
+        self.__undoLog.append((undo, args))
+
+    def deferNotification(self, element: AddressableLeaf, flags: AddressableLeaf.ObserverEvent, previousValue: Optional[Any]) -> None:
+        self.__notifications.append((element, flags, previousValue))
+
+    def savepoint(self) -> Tuple[int, int]:
+        return (len(self.__undoLog), len(self.__notifications))
+
+    def rollback(self, savepoint: Tuple[int, int] = (0, 0)) -> None:
+        """Undoes all changes made after savepoint"""
+        undoLength, notificationLength = savepoint
+        for undo, args in reversed(self.__undoLog[undoLength:]):
+            undo(*args)
+        # Undoing records changes and notifications itself, they are dropped as well
+        del self.__undoLog[undoLength:]
+        del self.__notifications[notificationLength:]
+
+    def commit(self) -> None:
+        """Delivers the held back notifications, one per element with the flags of all its changes combined"""
+        self.__undoLog.clear()
+        pending: Dict[int, List[Any]] = {}
+        for element, flags, previousValue in self.__notifications:
+            entry: Optional[List[Any]] = pending.get(id(element))
+            if entry is None:
+                pending[id(element)] = [element, flags, previousValue]
+            else:
+                entry[1] |= flags
+        self.__notifications.clear()
+        enabledAndDisabled: AddressableLeaf.ObserverEvent = AddressableLeaf.ObserverEvent.ENABLED | AddressableLeaf.ObserverEvent.DISABLED
+        for element, flags, previousValue in pending.values():
+            # Enabled and disabled in the same transaction cancel each other out
+            if (flags & enabledAndDisabled) == enabledAndDisabled:
+                flags &= ~enabledAndDisabled  # pylint: disable=invalid-unary-operand-type
+            if flags:
+                element.notify(flags, previousValue=previousValue)
+
+
+class Change():
+    """A single coalesced change of an element within one update cycle"""
+    __slots__ = ('address', 'element', 'oldValue', 'newValue', 'flags', 'lastChange', 'lastUpdateFromServer', 'lastUpdateFromCar')
+
+    def __init__(self, element: AddressableLeaf, flags: AddressableLeaf.ObserverEvent, oldValue: Optional[Any]) -> None:
+        self.address: str = element.getGlobalAddress()
+        self.element: AddressableLeaf = element
+        self.oldValue: Optional[Any] = oldValue
+        self.newValue: Optional[Any] = None
+        self.flags: AddressableLeaf.ObserverEvent = flags
+        self.lastChange: Optional[datetime] = None
+        self.lastUpdateFromServer: Optional[datetime] = None
+        self.lastUpdateFromCar: Optional[datetime] = None
+        self.refresh(flags)
+
+    def merge(self, flags: AddressableLeaf.ObserverEvent) -> None:
+        # The old value stays the one from before the first change in this cycle
+        self.flags |= flags
+        self.refresh(flags)
+
+    def refresh(self, flags: AddressableLeaf.ObserverEvent) -> None:
+        # Disabled elements have no value, the notification is sent before the element is actually disabled
+        if flags & AddressableLeaf.ObserverEvent.DISABLED:
+            self.newValue = None
+        else:
+            self.newValue = self.element._changeValue()  # pylint: disable=protected-access
+        self.lastChange = self.element.lastChange
+        self.lastUpdateFromServer = self.element.lastUpdateFromServer
+        self.lastUpdateFromCar = self.element.lastUpdateFromCar
+
+    def __str__(self) -> str:
+        return f'{self.address}: {self.oldValue} -> {self.newValue} ({self.flags})'
+
+
+class ChangeSet():
+    """All changes below an object collected during one update cycle, one entry per address in order of the first change"""
+
+    def __init__(self) -> None:
+        self.__changes: Dict[str, Change] = {}
+
+    def record(self, element: AddressableLeaf, flags: AddressableLeaf.ObserverEvent, previousValue: Optional[Any]) -> None:
+        address: str = element.getGlobalAddress()
+        change: Optional[Change] = self.__changes.get(address)
+        if change is None:
+            self.__changes[address] = Change(element, flags, previousValue)
+        else:
+            change.merge(flags)
+
+    @property
+    def changes(self) -> List[Change]:
+        return list(self.__changes.values())
+
+    def get(self, address: str) -> Optional[Change]:
+        return self.__changes.get(address)
+
+    def __contains__(self, address: str) -> bool:
+        return address in self.__changes
+
+    def __iter__(self) -> Iterator[Change]:
+        return iter(list(self.__changes.values()))
+
+    def __len__(self) -> int:
+        return len(self.__changes)
+
+    def __str__(self) -> str:
+        return '\n'.join([str(change) for change in self.__changes.values()])
+
+
+class AddressPattern():
+    """Compiled address pattern, segments are separated by '/'.
+
+    A segment is either a literal local address, a glob as understood by fnmatch (e.g. '*' or 'charging*') or '**' which
+    matches zero or more segments. Patterns are relative to the object they are evaluated on.
+    """
+    ANY_SEGMENTS: str = '**'
+
+    def __init__(self, pattern: str) -> None:
+        self.pattern: str = pattern
+        self.segments: Tuple[str, ...] = tuple(segment for segment in pattern.split('/') if segment != '')
+        if not self.segments:
+            raise ValueError('Address pattern must contain at least one segment')
+        self.__matchers: Tuple[Optional[Callable[[str], Any]], ...] = tuple(
+            None if segment == AddressPattern.ANY_SEGMENTS or not AddressPattern.isGlob(segment)
+            else re.compile(fnmatch.translate(segment)).match for segment in self.segments)
+        self.initialStates: FrozenSet[int] = self.__closure({0})
+
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def compile(pattern: str) -> AddressPattern:
+        return AddressPattern(pattern)
+
+    @staticmethod
+    def isGlob(segment: str) -> bool:
+        return any(character in segment for character in '*?[')
+
+    def __closure(self, states: Set[int]) -> FrozenSet[int]:
+        # A '**' segment may match nothing, so the state after it is reachable without consuming a segment
+        closure: Set[int] = set()
+        for state in states:
+            closure.add(state)
+            while state < len(self.segments) and self.segments[state] == AddressPattern.ANY_SEGMENTS:
+                state += 1
+                closure.add(state)
+        return frozenset(closure)
+
+    def advance(self, states: FrozenSet[int], localAddress: str) -> FrozenSet[int]:
+        """Returns the states reached after consuming one local address, an empty set if the pattern cannot match anymore"""
+        nextStates: Set[int] = set()
+        for state in states:
+            if state >= len(self.segments):
+                continue
+            segment: str = self.segments[state]
+            if segment == AddressPattern.ANY_SEGMENTS:
+                nextStates.add(state)
+                continue
+            matcher: Optional[Callable[[str], Any]] = self.__matchers[state]
+            if (matcher is None and segment == localAddress) or (matcher is not None and matcher(localAddress)):
+                nextStates.add(state + 1)
+        if not nextStates:
+            return frozenset()
+        return self.__closure(nextStates)
+
+    def isFinal(self, states: FrozenSet[int]) -> bool:
+        return len(self.segments) in states
+
+    def literalSegments(self, states: FrozenSet[int]) -> Optional[Set[str]]:
+        """Returns the local addresses that can advance the given states if all of them are literals, else None"""
+        literals: Set[str] = set()
+        for state in states:
+            if state >= len(self.segments):
+                continue
+            if self.__matchers[state] is not None or self.segments[state] == AddressPattern.ANY_SEGMENTS:
+                return None
+            literals.add(self.segments[state])
+        return literals
+
+    def match(self, address: str) -> bool:
+        """Checks an address relative to the object the pattern is evaluated on"""
+        states: FrozenSet[int] = self.initialStates
+        for localAddress in address.split('/'):
+            if localAddress == '':
+                continue
+            states = self.advance(states, localAddress)
+            if not states:
+                return False
+        return self.isFinal(states)
+
+    def __str__(self) -> str:
+        return self.pattern
+
+    def __repr__(self) -> str:
+        return f'AddressPattern({self.pattern!r})'
+
+
+class _Tombstones():
+    # Addresses of elements that were removed or disabled, together with the stamp at which that happened and the stamp at
+    # which the element had appeared. Only the newest entries are kept, floor is the oldest stamp that is still complete
+    __slots__ = ('entries', 'floor')
+
+    def __init__(self, floor: int, limit: int) -> None:
+        self.entries: Deque[Tuple[int, Tuple[str, ...], int]] = deque(maxlen=limit)
+        self.floor: int = floor
+
+
+def escapeJSONPointer(address: str) -> str:
+    return address.replace('~', '~0').replace('/', '~1')
+
+
+class _SerializationCache():
+    # Memoized serializations of an object, each entry is valid as long as the modification stamp is unchanged
+    __slots__ = ('cacheable', 'asDicts', 'json', 'jsonEntries')
+
+    def __init__(self) -> None:
+        self.cacheable: bool = False
+        self.asDicts: Dict[Optional[Callable[[Any], bool]], Tuple[int, Dict[str, Any]]] = {}
+        self.json: Optional[Tuple[int, str]] = None
+        self.jsonEntries: Dict[str, Tuple[AddressableLeaf, int, Optional[str]]] = {}
+
+
+def filterImages(element: Any) -> bool:
+    """Filter for asDict that leaves out images, they cannot be serialized as JSON"""
+    return SUPPORT_IMAGES and isinstance(element, Image.Image)
+
+
 class AddressableObject(AddressableLeaf):
+    # Number of removals remembered for changesSince, clients that are further behind get the whole tree
+    TOMBSTONE_LIMIT: int = 10000
+    # Only set on roots once changesSince was used
+    __tombstones: Optional[_Tombstones] = None
+    # Only set on roots once a transaction was started
+    __transactionLock: Optional[threading.RLock] = None
+
     def __init__(
         self,
         localAddress: str,
@@ -440,6 +1002,11 @@ class AddressableObject(AddressableLeaf):
     ) -> None:
         super().__init__(localAddress, parent)
         self.__children: dict[str, AddressableLeaf] = {}
+        self.__addressIndex: Optional[Dict[str, AddressableLeaf]] = None
+        self.__changeSetObservers: Optional[List[Callable[..., None]]] = None
+        self.__changeSet: Optional[ChangeSet] = None
+        self.__observerExecutor: Optional[ObserverExecutor] = None
+        self.__serializationCache: Optional[_SerializationCache] = None
 
     @AddressableLeaf.enabled.setter  # type: ignore
     def enabled(self, setEnabled: bool) -> None:
@@ -449,20 +1016,128 @@ class AddressableObject(AddressableLeaf):
         AddressableLeaf.enabled.fset(self, setEnabled)  # type: ignore
 
     def asDict(self, filterCallable: Optional[Callable[[Any], None]] = None):
+        """Returns the enabled subtree as nested dicts. Unchanged subtrees are returned from a cache and shared
+        between calls, the result must not be modified"""
+        self._materializeChildren()
+        cache: _SerializationCache = self.__getSerializationCache()
+        cached: Optional[Tuple[int, Dict[str, Any]]] = cache.asDicts.get(filterCallable)
+        if cached is not None and cached[0] == self.modificationStamp:
+            return cached[1]
         asDict = {}
-        for child in self.children:
+        cacheable: bool = True
+        for child in self.__children.values():
             if child.enabled:
                 childDict = child.asDict(filterCallable=filterCallable)
+                cacheable = cacheable and child._isSerializationCacheable()
                 if childDict is not None:
                     asDict[child.getLocalAddress()] = childDict
+        cache.cacheable = cacheable
+        if cacheable:
+            cache.asDicts[filterCallable] = (self.modificationStamp, asDict)
+        else:
+            cache.asDicts.clear()
         return asDict
 
     def toJSON(self):
-        def filterDict(element):
-            if SUPPORT_IMAGES and isinstance(element, Image.Image):
-                return True
-            return False
-        return json.dumps(self.asDict(filterCallable=filterDict), cls=ExtendedWithNullEncoder, skipkeys=True, indent=4)
+        return self._toJSONFragment()
+
+    def _toJSONFragment(self) -> str:
+        # Produces the same output as json.dumps(self.asDict(filterCallable=filterImages), indent=4). Fragments of
+        # children are encoded at indentation level 0 and shifted when they are embedded
+        self._materializeChildren()
+        cache: _SerializationCache = self.__getSerializationCache()
+        if cache.json is not None and cache.json[0] == self.modificationStamp:
+            return cache.json[1]
+        entries: List[str] = []
+        jsonEntries: Dict[str, Tuple[AddressableLeaf, int, Optional[str]]] = {}
+        cacheable: bool = True
+        for address, child in self.__children.items():
+            if not child.enabled:
+                continue
+            entry: Optional[str]
+            cachedEntry: Optional[Tuple[AddressableLeaf, int, Optional[str]]] = cache.jsonEntries.get(address)
+            if cachedEntry is not None and cachedEntry[0] is child and cachedEntry[1] == child.modificationStamp \
+                    and child._isSerializationCacheable():
+                entry = cachedEntry[2]
+            else:
+                fragment: Optional[str] = child._toJSONFragment()
+                entry = None if fragment is None else f'    {json.dumps(address)}: {fragment.replace(chr(10), chr(10) + "    ")}'
+            cacheable = cacheable and child._isSerializationCacheable()
+            jsonEntries[address] = (child, child.modificationStamp, entry)
+            if entry is not None:
+                entries.append(entry)
+        jsonString: str = '{\n' + ',\n'.join(entries) + '\n}' if entries else '{}'
+        cache.jsonEntries = jsonEntries
+        cache.cacheable = cacheable
+        cache.json = (self.modificationStamp, jsonString) if cacheable else None
+        return jsonString
+
+    def __getSerializationCache(self) -> _SerializationCache:
+        if self.__serializationCache is None:
+            self.__serializationCache = _SerializationCache()
+        return self.__serializationCache
+
+    def _isSerializationCacheable(self) -> bool:
+        return self.__serializationCache is not None and self.__serializationCache.cacheable
+
+    @property
+    def version(self) -> int:
+        """Current version of the tree, pass it to changesSince later to get the changes made after this point"""
+        return AddressableLeaf.currentModificationStamp()
+
+    def changesSince(self, version: int) -> List[Dict[str, Any]]:
+        """Returns the changes below this object after the given version as RFC 6902 JSON Patch operations with paths
+        relative to this object. If the changes cannot be reconstructed anymore the patch replaces the whole document.
+        Values are not converted, encode the patch with ExtendedWithNullEncoder"""
+        root: AddressableLeaf = self.getRoot()
+        tombstones: Optional[_Tombstones] = root._getTombstones() if isinstance(root, AddressableObject) else None
+        if tombstones is None or version < tombstones.floor:
+            return [{'op': 'replace', 'path': '', 'value': self.asDict(filterCallable=filterImages)}]
+
+        patch: List[Dict[str, Any]] = []
+        prefix: Tuple[str, ...] = self.getAddressSegments()
+        removed: Dict[Tuple[str, ...], None] = {}
+        for stamp, addressSegments, enabledStamp in tombstones.entries:
+            # Skip elements the client never saw, they appeared after its version
+            if stamp <= version or enabledStamp > version or addressSegments[:len(prefix)] != prefix \
+                    or len(addressSegments) == len(prefix):
+                continue
+            removed[addressSegments[len(prefix):]] = None
+        for segments in removed:
+            # Removing a parent already removes its children
+            if any(segments[:length] in removed for length in range(1, len(segments))):
+                continue
+            patch.append({'op': 'remove', 'path': ''.join(f'/{escapeJSONPointer(segment)}' for segment in segments)})
+        self._collectChanges(version, '', patch)
+        return patch
+
+    def _collectChanges(self, version: int, path: str, patch: List[Dict[str, Any]]) -> None:
+        self._materializeChildren()
+        for address, child in self.__children.items():
+            if not child.enabled or child.modificationStamp <= version:
+                continue
+            childPath: str = f'{path}/{escapeJSONPointer(address)}'
+            if isinstance(child, AddressableObject) and child.enabledStamp <= version:
+                child._collectChanges(version, childPath, patch)
+            else:
+                patch.append({'op': 'add', 'path': childPath, 'value': child.asDict(filterCallable=filterImages)})
+
+    def _getTombstones(self) -> Optional[_Tombstones]:
+        if self.parent is not None:
+            return None
+        if self.__tombstones is None:
+            # Removals before this point are not known
+            self.__tombstones = _Tombstones(floor=AddressableLeaf.currentModificationStamp(), limit=self.TOMBSTONE_LIMIT)
+            return None
+        return self.__tombstones
+
+    def _addTombstone(self, element: AddressableLeaf, enabledStamp: int) -> None:
+        tombstones: Optional[_Tombstones] = self.__tombstones
+        if tombstones is None:
+            return
+        if len(tombstones.entries) == tombstones.entries.maxlen:
+            tombstones.floor = tombstones.entries[0][0]
+        tombstones.entries.append((AddressableLeaf.currentModificationStamp() + 1, element.getAddressSegments(), enabledStamp))
 
     def isLeaf(self) -> bool:
         return not self.__children
@@ -470,15 +1145,66 @@ class AddressableObject(AddressableLeaf):
     def addChild(self, child: AddressableLeaf):
         if not isinstance(child, AddressableLeaf):
             raise TypeError('Cannot add a child that is not addressable')
-        self.__children[child.getLocalAddress()] = child
+        self._attachChild(child)
         self.enabled = True
 
+    def _attachChild(self, child: AddressableLeaf) -> None:
+        address: str = child.getLocalAddress()
+        previous: Optional[AddressableLeaf] = self.__children.get(address)
+        if previous is child:
+            return
+        index: Optional[Dict[str, AddressableLeaf]] = self._getAddressIndex(create=False)
+        if index is not None and previous is not None:
+            previous._unregisterAddresses(index)
+        self.__children[address] = child
+        if child.enabled:
+            child._markAppeared()
+        else:
+            self._markModified()
+        if index is not None:
+            child._registerAddresses(index)
+
+    def removeChild(self, child: AddressableLeaf) -> bool:
+        address: str = child.getLocalAddress()
+        if self.__children.get(address) is not child:
+            return False
+        index: Optional[Dict[str, AddressableLeaf]] = self._getAddressIndex(create=False)
+        if index is not None:
+            child._unregisterAddresses(index)
+        if child.enabled:
+            child._recordRemoval()
+        del self.__children[address]
+        self._markModified()
+        return True
+
+    def _getAddressIndex(self, create: bool = True) -> Optional[Dict[str, AddressableLeaf]]:
+        if self.parent is not None:
+            return super()._getAddressIndex(create=create)
+        if self.__addressIndex is None and create:
+            self.__addressIndex = {}
+            self._registerAddresses(self.__addressIndex)
+        return self.__addressIndex
+
+    def _dropAddressIndex(self) -> None:
+        self.__addressIndex = None
+
+    def _registerAddresses(self, index: Dict[str, AddressableLeaf]) -> None:
+        super()._registerAddresses(index)
+        for child in self.__children.values():
+            child._registerAddresses(index)
+
+    def _unregisterAddresses(self, index: Dict[str, AddressableLeaf]) -> None:
+        super()._unregisterAddresses(index)
+        for child in self.__children.values():
+            child._unregisterAddresses(index)
+
     def getLeafChildren(self) -> List[AddressableLeaf]:
         return self.getRecursiveChildren(leaveOnly=True)
 
     def getRecursiveChildren(self, leaveOnly=False) -> List[AddressableLeaf]:
         if not self.enabled:
             return []
+        self._materializeChildren()
         if self.isLeaf():
             return [self]
 
@@ -495,15 +1221,57 @@ class AddressableObject(AddressableLeaf):
 
     @property
     def children(self) -> List[AddressableLeaf]:
+        self._materializeChildren()
         return list(self.__children.values())
 
+    def _materializeChildren(self) -> None:
+        """Hook for objects that build some of their children lazily, called before the children are traversed"""
+
+    def select(self, pattern: Union[str, AddressPattern]) -> Iterator[AddressableLeaf]:
+        """Lazily yields all enabled descendants whose address relative to this object matches the pattern"""
+        if not isinstance(pattern, AddressPattern):
+            pattern = AddressPattern.compile(pattern)
+        if not self.enabled:
+            return iter(())
+        return self._select(pattern, pattern.initialStates)
+
+    def _select(self, pattern: AddressPattern, states: FrozenSet[int]) -> Iterator[AddressableLeaf]:
+        self._materializeChildren()
+        literals: Optional[Set[str]] = pattern.literalSegments(states)
+        if literals is not None:
+            # Only literal segments are left, no need to look at every child
+            candidates: List[AddressableLeaf] = [self.__children[literal] for literal in literals if literal in self.__children]
+        else:
+            candidates = list(self.__children.values())
+        for child in candidates:
+            if not child.enabled:
+                continue
+            childStates: FrozenSet[int] = pattern.advance(states, child.getLocalAddress())
+            if not childStates:
+                continue
+            if pattern.isFinal(childStates):
+                yield child
+            if isinstance(child, AddressableObject):
+                yield from child._select(pattern, childStates)  # pylint: disable=protected-access
+
     def getByAddressString(self, addressString: str) -> Union[AddressableLeaf, bool]:
         if '/' not in addressString or addressString == '/':
             return super().getByAddressString(addressString)
 
         localAddress, _, childPath = addressString.partition('/')
+        # Resolve absolute paths through the address index of the root, relative paths are walked segment by segment
+        if '..' not in addressString:
+            index: Optional[Dict[str, AddressableLeaf]] = self._getAddressIndex()
+            if index is not None:
+                if localAddress != self.getLocalAddress():
+                    return False
+                found: Optional[AddressableLeaf] = index.get(f'{self.getGlobalAddress()}/{childPath}')
+                if found is not None:
+                    return found
+                # Not in the index, it might still be created lazily while walking the path
         if not super().getByAddressString(localAddress):
             return False
+        self._materializeChildren()
         childAddress, _, _ = childPath.partition('/')
         if childAddress == '..':
             if self.parent is not None:
@@ -513,10 +1281,91 @@ class AddressableObject(AddressableLeaf):
             return self.__children[childAddress].getByAddressString(childPath)
         return False
 
+    def getObserverExecutor(self) -> Optional[ObserverExecutor]:
+        if self.parent is not None:
+            return super().getObserverExecutor()
+        return self.__observerExecutor
+
+    def getTransactionLock(self) -> threading.RLock:
+        """Lock of the tree held during transactions. Readers that must not see a transaction in progress can hold it"""
+        root: AddressableObject = self.getRoot()
+        if root.__transactionLock is None:
+            with _transactionLockGuard:
+                if root.__transactionLock is None:
+                    root.__transactionLock = threading.RLock()
+        return root.__transactionLock
+
+    @contextlib.contextmanager
+    def transaction(self) -> Iterator[Transaction]:
+        """Runs the block as a transaction on the tree, see Transaction. If the block raises, all of its changes are
+        rolled back. Nested transactions roll back only their own changes, notifications are delivered when the outermost
+        transaction commits"""
+        with self.getTransactionLock():
+            current: Optional[Transaction] = _transactionState.transaction
+            if current is not None:
+                savepoint: Tuple[int, int] = current.savepoint()
+                try:
+                    yield current
+                except BaseException:
+                    current.rollback(savepoint)
+                    raise
+                return
+
+            transaction: Transaction = Transaction()
+            _transactionState.transaction = transaction
+            try:
+                yield transaction
+            except BaseException:
+                transaction.rollback()
+                raise
+            finally:
+                _transactionState.transaction = None
+        # Observers are called without the lock, so they cannot block other threads that wait for it
+        transaction.commit()
+
+    def setObserverExecutor(self, executor: Optional[ObserverExecutor]) -> None:
+        """Dispatches all observer callbacks of this tree to the executor. Only has an effect on the root object.
+        Callbacks run after the update moved on, so they see the element in its current state"""
+        self.__observerExecutor = executor
+
+    def addChangeSetObserver(self, observer: Callable[..., None]) -> None:
+        """Registers an observer that is called once per update cycle as observer(element=self, changeSet=changeSet)
+        with all changes below this object. Observers are only called if something changed"""
+        if self.__changeSetObservers is None:
+            self.__changeSetObservers = []
+        self.__changeSetObservers.append(observer)
+        AddressableLeaf._changeSetObserverCount += 1
+        LOG.debug('%s: Change set observer added', self.getGlobalAddress())
+
+    def removeChangeSetObserver(self, observer: Callable[..., None]) -> None:
+        if self.__changeSetObservers is not None and observer in self.__changeSetObservers:
+            self.__changeSetObservers.remove(observer)
+            AddressableLeaf._changeSetObserverCount -= 1
+            if not self.__changeSetObservers:
+                self.__changeSetObservers = None
+                self.__changeSet = None
+
+    def _recordChange(self, element: AddressableLeaf, flags: AddressableLeaf.ObserverEvent, previousValue: Optional[Any]) -> None:
+        if self.__changeSetObservers is None:
+            return
+        if self.__changeSet is None:
+            self.__changeSet = ChangeSet()
+        self.__changeSet.record(element, flags, previousValue)
+
     def updateComplete(self) -> None:
         for child in self.__children.values():
             child.updateComplete()
         super().updateComplete()
+        if self.__changeSet is not None:
+            changeSet: ChangeSet = self.__changeSet
+            self.__changeSet = None
+            executor: Optional[ObserverExecutor] = self.getObserverExecutor()
+            for observer in list(self.__changeSetObservers or []):
+                if executor is None:
+                    observer(element=self, changeSet=changeSet)
+                else:
+                    executor.submit(observer, element=self, changeSet=changeSet)
+            LOG.debug('%s: Change set with %d changes delivered', self.getGlobalAddress(), len(changeSet))
 
     def saveToFile(self, filename: str) -> None:  # noqa: C901
         if filename.endswith(('.txt', '.TXT', '.text')):
@@ -543,6 +1392,9 @@ L = TypeVar('L', bound=AddressableLeaf)
 
 class AddressableDict(AddressableObject, Dict[T, L]):
     def __setitem__(self, key: T, item: L):
+        transaction: Optional[Transaction] = _transactionState.transaction
+        if transaction is not None and not dict.__contains__(self, key):
+            transaction.recordUndo(AddressableDict.__removeAddedItem, self, key, item)
         self.addChild(item)
         # item.parent = self
         # item.enabled = True
@@ -551,6 +1403,35 @@ class AddressableDict(AddressableObject, Dict[T, L]):
             self.enabled = True
         return retVal
 
+    def __delitem__(self, key: T) -> None:
+        self.__removeItem(self[key])
+        super().__delitem__(key)
+
+    def pop(self, key: T, *args: Any) -> L:
+        if key in self:
+            self.__removeItem(self[key])
+        return super().pop(key, *args)
+
+    def popitem(self) -> Tuple[T, L]:
+        key, item = super().popitem()
+        self.__removeItem(item)
+        return key, item
+
+    def clear(self) -> None:
+        for item in list(self.values()):
+            self.__removeItem(item)
+        super().clear()
+
+    def __removeItem(self, item: L) -> None:
+        if item.enabled:
+            item.enabled = False
+        self.removeChild(item)
+
+    def __removeAddedItem(self, key: T, item: L) -> None:
+        if dict.get(self, key) is item:
+            dict.__delitem__(self, key)
+            self.removeChild(item)
+
     def __str__(self) -> str:
         return '[' + ', '.join([str(item) for item in self.values() if item.enabled]) + ']'
 
@@ -562,5 +1443,24 @@ class AddressableList(AddressableObject, List[L]):
             self.enabled = True
         return retVal
 
+    def remove(self, item: L) -> None:
+        super().remove(item)
+        self.__removeItem(item)
+
+    def pop(self, index: int = -1) -> L:
+        item: L = super().pop(index)
+        self.__removeItem(item)
+        return item
+
+    def clear(self) -> None:
+        for item in list(self):
+            self.__removeItem(item)
+        super().clear()
+
+    def __removeItem(self, item: L) -> None:
+        if item.enabled:
+            item.enabled = False
+        self.removeChild(item)
+
     def __str__(self) -> str:
         return '[' + ', '.join([str(item) for item in self if item.enabled]) + ']'
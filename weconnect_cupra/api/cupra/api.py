@@ -7,16 +7,19 @@ from weconnect_cupra.addressable import AddressableObject, AddressableDict
 from weconnect_cupra.fetch import Fetcher
 from weconnect_cupra.addressable import AddressableDict
 from weconnect_cupra.errors import RetrievalError
+from weconnect_cupra.snapshot import SnapshotObject
 from weconnect_cupra.api.cupra.domain import Domain
 from weconnect_cupra.api.cupra.elements.vehicle import Vehicle
 from weconnect_cupra.api.cupra.elements.charging_station import ChargingStation
+from weconnect_cupra.fleet.columnar import FleetColumns
 
 
 LOG = logging.getLogger("weconnect_cupra")
 
 
 class CupraApi:
-    def __init__(self, weconnect_cupra: AddressableObject, fetcher: Fetcher, enableTracker: bool = False, fixAPI: bool = True):
+    def __init__(self, weconnect_cupra: AddressableObject, fetcher: Fetcher, enableTracker: bool = False, fixAPI: bool = True,
+                 lazyStatus: bool = False):
         # https://github.com/evcc-io/evcc/blob/7abee00aa98a29d46d9d3c2a7a16a601558129b7/vehicle/seat/cupra/api.go
         self.base_url = 'https://ola.prod.code.seat.cloud.vwgroup.com'
         self.__vehicles: AddressableDict[str, Vehicle] = AddressableDict(localAddress='vehicles', parent=weconnect_cupra)
@@ -24,6 +27,7 @@ class CupraApi:
         self.__fetcher: Fetcher = fetcher
         self.__enableTracker: bool = enableTracker
         self.fixAPI: bool = fixAPI
+        self.lazyStatus: bool = lazyStatus
 
     @property
     def vehicles(self) -> AddressableDict[str, Vehicle]:
@@ -33,6 +37,9 @@ class CupraApi:
     def stations(self) -> AddressableDict[str, ChargingStation]:
         return self.__stations
 
+    def exportColumns(self, pattern: str = '**') -> FleetColumns:
+        return FleetColumns.fromVehicles(self.__vehicles, pattern=pattern)
+
     def update(self, updateCapabilities: bool = True, updatePictures: bool = True, force: bool = False,
                selective: Optional[list[Domain]] = None) -> \
             Tuple[AddressableDict[str, Vehicle], AddressableDict[str, ChargingStation]]:
@@ -51,6 +58,9 @@ class CupraApi:
                 vin: str = vehicleDict['vin']
                 vins.append(vin)
                 try:
+                    if vin in self.__vehicles and isinstance(self.__vehicles[vin], SnapshotObject):
+                        # Restored from a snapshot, replace the placeholder with the real vehicle
+                        del self.__vehicles[vin]
                     if vin not in self.__vehicles:
                         vehicle = Vehicle(
                             fetcher=self.__fetcher,
@@ -61,7 +71,8 @@ class CupraApi:
                             updateCapabilities=updateCapabilities,
                             updatePictures=updatePictures,
                             selective=selective,
-                            enableTracker=self.__enableTracker)
+                            enableTracker=self.__enableTracker,
+                            lazyStatus=self.lazyStatus)
                         self.__vehicles[vin] = vehicle
                     else:
                         self.__vehicles[vin].update(
@@ -29,62 +29,25 @@ class AccessStatus(GenericStatus):
         ignoreAttributes = ignoreAttributes or []
         LOG.debug('Update access status from dict')
 
-        # Cupra
-        if 'value' not in fromDict:
-            fromDict['value'] = fromDict
-
-        if 'value' in fromDict:
-            # self.overallStatus.fromDict(fromDict['value'], 'overallStatus')
-
-            if 'doors' in fromDict['value'] and fromDict['value']['doors'] is not None:
-                for doorName in fromDict['value']['doors']:
-
-                    doorDict = fromDict['value']['doors'][doorName]
-
-                    if 'name' not in doorDict:
-                        doorDict['name'] = doorName
-
-                    if 'name' in doorDict:
-                        if doorDict['name'] in self.doors:
-                            self.doors[doorDict['name']].update(fromDict=doorDict)
-                        else:
-                            self.doors[doorDict['name']] = AccessStatus.Door(fromDict=doorDict, parent=self.doors)
-                # for doorName in [doorName for doorName in self.doors.keys()
-                #                  if doorName not in [door['name'] for door in fromDict['value']['doors'] if 'name' in door]]:
-                #     # del self.doors[doorName]
-                #     LOG.debug('deleted something here')
+        value = GenericStatus.payloadValue(fromDict)
+        if isinstance(value, dict):
+            if 'doors' in value and value['doors'] is not None:
+                for doorName, doorDict in value['doors'].items():
+                    self.__updateDoor(doorDict.get('name', doorName), doorDict)
             else:
                 self.doors.clear()
                 self.doors.enabled = False
 
-            if 'trunk' in fromDict['value']:
-                doorDict = fromDict['value']['trunk']
-
-                if 'name' not in doorDict:
-                    doorDict['name'] = 'trunk'
-
-                if 'name' in doorDict:
-                    if doorDict['name'] in self.doors:
-                        self.doors[doorDict['name']].update(fromDict=doorDict)
-                    else:
-                        self.doors[doorDict['name']] = AccessStatus.Door(fromDict=doorDict, parent=self.doors)
-
-            if 'hood' in fromDict['value']:
-                doorDict = fromDict['value']['hood']
+            if 'trunk' in value:
+                self.__updateDoor(value['trunk'].get('name', 'trunk'), value['trunk'])
 
-                if 'name' not in doorDict:
-                    doorDict['name'] = 'hood'
+            if 'hood' in value:
+                self.__updateDoor(value['hood'].get('name', 'hood'), value['hood'])
 
-                if 'name' in doorDict:
-                    if doorDict['name'] in self.doors:
-                        self.doors[doorDict['name']].update(fromDict=doorDict)
-                    else:
-                        self.doors[doorDict['name']] = AccessStatus.Door(fromDict=doorDict, parent=self.doors)
+            if 'windows' in value and value['windows'] is not None:
+                for windowName in value['windows']:
 
-            if 'windows' in fromDict['value'] and fromDict['value']['windows'] is not None:
-                for windowName in fromDict['value']['windows']:
-
-                    windowDict = { 'name' : windowName, 'status' : fromDict['value']['windows'][windowName] }
+                    windowDict = { 'name' : windowName, 'status' : value['windows'][windowName] }
 
                     if 'name' in windowDict:
                         if windowDict['name'] in self.windows:
@@ -93,36 +56,36 @@ class AccessStatus(GenericStatus):
                             self.windows[windowDict['name']] = AccessStatus.Window(fromDict=windowDict, parent=self.windows)
                 # for windowName in [windowName for windowName in self.windows.keys()
                 #                    if windowName not in [window['name']
-                #                    for window in fromDict['value']['windows'] if 'name' in window]]:
+                #                    for window in value['windows'] if 'name' in window]]:
                 #     del self.doors[windowName]
             else:
                 self.windows.clear()
                 self.windows.enabled = False
 
-            fromDict['value']['overallStatus'] = AccessControlState.OverallState.SAFE
-            fromDict['value']['doorLockStatus'] = AccessControlState.LockState.LOCKED
+            overallStatus = AccessControlState.OverallState.SAFE
+            doorLockStatus = AccessControlState.LockState.LOCKED
 
             for doorName in self.doors.keys():
                 door = self.doors[doorName]
                 if door.lockState.value == AccessControlState.LockState.UNLOCKED:
-                    fromDict['value']['doorLockStatus'] = AccessControlState.LockState.UNLOCKED
+                    doorLockStatus = AccessControlState.LockState.UNLOCKED
 
                 if (door.openState.value == AccessControlState.OpenState.OPEN) or (door.lockState.value == AccessControlState.LockState.UNLOCKED):
-                    fromDict['value']['overallStatus'] = AccessControlState.OverallState.UNSAFE
+                    overallStatus = AccessControlState.OverallState.UNSAFE
 
             for windowName in self.windows.keys():
                 window = self.windows[windowName]
                 if (window.openState.value == AccessControlState.OpenState.OPEN):
-                    fromDict['value']['overallStatus'] = AccessControlState.OverallState.UNSAFE
+                    overallStatus = AccessControlState.OverallState.UNSAFE
 
-            self.overallStatus.fromDict(fromDict['value'], 'overallStatus')
-            self.doorLockStatus.fromDict(fromDict['value'], 'doorLockStatus')
+            self.overallStatus.setValueWithCarTime(overallStatus, lastUpdateFromCar=None, fromServer=True)
+            self.doorLockStatus.setValueWithCarTime(doorLockStatus, lastUpdateFromCar=None, fromServer=True)
 
-            if 'engine' in fromDict['value']:
-                self.engineStatus.fromDict(fromDict['value'], 'engine')
+            if 'engine' in value:
+                self.engineStatus.fromDict(value, 'engine')
 
-            if 'lights' in fromDict['value']:
-                self.lightsStatus.fromDict(fromDict['value'], 'lights')
+            if 'lights' in value:
+                self.lightsStatus.fromDict(value, 'lights')
 
         else:
             self.overallStatus.enabled = False
@@ -135,6 +98,12 @@ class AccessStatus(GenericStatus):
 
         super().update(fromDict=fromDict, ignoreAttributes=(ignoreAttributes + ['overallStatus', 'doors', 'windows']))
 
+    def __updateDoor(self, doorName, doorDict):
+        if doorName in self.doors:
+            self.doors[doorName].update(fromDict=doorDict, name=doorName)
+        else:
+            self.doors[doorName] = AccessStatus.Door(fromDict=doorDict, parent=self.doors, name=doorName)
+
     def __str__(self):
         string = super().__str__()
         if self.overallStatus is not None and self.overallStatus.enabled:
@@ -164,6 +133,7 @@ class AccessStatus(GenericStatus):
             self,
             parent,
             fromDict=None,
+            name=None,
         ):
             super().__init__(localAddress=None, parent=parent)
             self.openState = AddressableAttribute(
@@ -171,45 +141,22 @@ class AccessStatus(GenericStatus):
             self.lockState = AddressableAttribute(
                 localAddress='lockState', parent=self, value=None, valueType=AccessControlState.LockState)
             if fromDict is not None:
-                self.update(fromDict)
+                self.update(fromDict, name=name)
 
-        def update(self, fromDict):
+        def update(self, fromDict, name=None):
             LOG.debug('Update door from dict')
 
-            if 'name' in fromDict:
-                self.id = fromDict['name']
+            # Cupra has the name as key of the door instead of in the door
+            if name is None:
+                name = fromDict.get('name')
+            if name is not None:
+                self.id = name
                 self.localAddress = self.id
             else:
                 LOG.error('Door is missing name attribute')
 
-            if 'locked' in fromDict:
-                if fromDict['locked'] == "true":
-                    self.lockState.setValueWithCarTime(
-                        AccessControlState.LockState.LOCKED, lastUpdateFromCar=None, fromServer=True)
-                elif fromDict['locked'] == "false":
-                    self.lockState.setValueWithCarTime(
-                        AccessControlState.LockState.UNLOCKED, lastUpdateFromCar=None, fromServer=True)
-                else:
-                    self.lockState.setValueWithCarTime(
-                        AccessControlState.LockState.UNKNOWN, lastUpdateFromCar=None, fromServer=True)
-            else:
-                self.lockState.setValueWithCarTime(
-                    AccessControlState.LockState.UNKNOWN, lastUpdateFromCar=None, fromServer=True)
-
-
-            if 'open' in fromDict:
-                if fromDict['open'] == "true":
-                    self.openState.setValueWithCarTime(
-                        AccessControlState.OpenState.OPEN, lastUpdateFromCar=None, fromServer=True)
-                elif fromDict['open'] == "false":
-                    self.openState.setValueWithCarTime(
-                        AccessControlState.OpenState.CLOSED, lastUpdateFromCar=None, fromServer=True)
-                else:
-                    self.openState.setValueWithCarTime(
-                        AccessControlState.OpenState.UNKNOWN, lastUpdateFromCar=None, fromServer=True)
-            else:
-                self.openState.setValueWithCarTime(
-                    AccessControlState.OpenState.UNKNOWN, lastUpdateFromCar=None, fromServer=True)
+            self.lockState.setValueWithCarTime(AccessStatus.Door.__parseLockState(fromDict), lastUpdateFromCar=None, fromServer=True)
+            self.openState.setValueWithCarTime(AccessStatus.Door.__parseOpenState(fromDict), lastUpdateFromCar=None, fromServer=True)
 
             # Fudge because the Cupra Born always returns that the hood is unlocked, so we force it locked
             if self.id == 'hood':
@@ -221,8 +168,25 @@ class AccessStatus(GenericStatus):
                         AccessControlState.LockState.LOCKED, lastUpdateFromCar=None, fromServer=True)
 
 
-            for key, value in {key: value for key, value in fromDict.items() if key not in ['locked', 'open', 'name']}.items():
-                LOG.warning('%s: Unknown attribute %s with value %s', self.getGlobalAddress(), key, value)
+            for key, value in fromDict.items():
+                if key not in ('locked', 'open', 'name'):
+                    LOG.warning('%s: Unknown attribute %s with value %s', self.getGlobalAddress(), key, value)
+
+        @staticmethod
+        def __parseLockState(fromDict):
+            if fromDict.get('locked') == "true":
+                return AccessControlState.LockState.LOCKED
+            if fromDict.get('locked') == "false":
+                return AccessControlState.LockState.UNLOCKED
+            return AccessControlState.LockState.UNKNOWN
+
+        @staticmethod
+        def __parseOpenState(fromDict):
+            if fromDict.get('open') == "true":
+                return AccessControlState.OpenState.OPEN
+            if fromDict.get('open') == "false":
+                return AccessControlState.OpenState.CLOSED
+            return AccessControlState.OpenState.UNKNOWN
 
         def __str__(self):
             returnString = f'{self.id}: '
@@ -271,8 +235,9 @@ class AccessStatus(GenericStatus):
             else:
                 self.openState.enabled = False
 
-            for key, value in {key: value for key, value in fromDict.items() if key not in ['name', 'status']}.items():
-                LOG.warning('%s: Unknown attribute %s with value %s', self.getGlobalAddress(), key, value)
+            for key, value in fromDict.items():
+                if key not in ('name', 'status'):
+                    LOG.warning('%s: Unknown attribute %s with value %s', self.getGlobalAddress(), key, value)
 
         def __str__(self):
             return f'{self.id}: {self.openState.value.value}'  # pylint: disable=no-member
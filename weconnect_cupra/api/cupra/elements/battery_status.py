@@ -1,11 +1,19 @@
 import logging
 
-from weconnect_cupra.addressable import AddressableAttribute
 from weconnect_cupra.elements.generic_status import GenericStatus
+from weconnect_cupra.elements.schema import StatusSchema, Field
 
 LOG = logging.getLogger("weconnect_cupra")
 
 
+def fixCruisingRange(status, cruisingRangeElectric_km):
+    if cruisingRangeElectric_km == 0x3FFF:
+        LOG.info('%s: Attribute cruisingRangeElectric_km was error value 0x3FFF. Setting error state instead'
+                 ' of 16383 km.', status.getGlobalAddress())
+        return None
+    return cruisingRangeElectric_km
+
+
 class BatteryStatus(GenericStatus):
     def __init__(
         self,
@@ -15,42 +23,15 @@ class BatteryStatus(GenericStatus):
         fromDict=None,
         fixAPI=True,
     ):
-        # TODO get from engines.primary.level (as float)
-        self.currentSOC_pct = AddressableAttribute(
-            localAddress='currentSOC_pct', parent=self, value=None, valueType=int)
-        # TODO get from engines.primary.range.value (as float)
-        self.cruisingRangeElectric_km = AddressableAttribute(
-            localAddress='cruisingRangeElectric_km', value=None, parent=self, valueType=int)
-
+        BatteryStatus.schema.createAttributes(self)
         super().__init__(vehicle=vehicle, parent=parent, statusId=statusId, fromDict=fromDict, fixAPI=fixAPI)
 
     def update(self, fromDict, ignoreAttributes=None):
-        ignoreAttributes = ignoreAttributes or []
         LOG.debug('Update battery status from dict')
 
-        # Cupra
-        if 'value' not in fromDict:
-            fromDict['value'] = fromDict
-            
-        if 'value' in fromDict:
-            self.currentSOC_pct.fromDict(fromDict['value'], 'currentSOC_pct')
+        BatteryStatus.schema.parse(self, GenericStatus.payloadValue(fromDict), fixAPI=self.fixAPI)
 
-            if 'cruisingRangeElectric_km' in fromDict['value']:
-                cruisingRangeElectric_km = int(fromDict['value']['cruisingRangeElectric_km'])
-                if self.fixAPI and cruisingRangeElectric_km == 0x3FFF:
-                    cruisingRangeElectric_km = None
-                    LOG.info('%s: Attribute cruisingRangeElectric_km was error value 0x3FFF. Setting error state instead'
-                             ' of 16383 km.', self.getGlobalAddress())
-                self.cruisingRangeElectric_km.setValueWithCarTime(
-                    cruisingRangeElectric_km, lastUpdateFromCar=None, fromServer=True)
-            else:
-                self.cruisingRangeElectric_km.enabled = False
-        else:
-            self.currentSOC_pct.enabled = False
-            self.cruisingRangeElectric_km.enabled = False
-
-        super().update(fromDict=fromDict, ignoreAttributes=(
-            ignoreAttributes + ['currentSOC_pct', 'cruisingRangeElectric_km']))
+        super().update(fromDict=fromDict, ignoreAttributes=BatteryStatus.schema.ignoring(ignoreAttributes))
 
     def __str__(self):
         string = super().__str__()
@@ -62,3 +43,10 @@ class BatteryStatus(GenericStatus):
             else:
                 string += '\n\tRange: currently unknown'
         return string
+
+    schema = StatusSchema(
+        # TODO get from engines.primary.level (as float)
+        Field('currentSOC_pct', int),
+        # TODO get from engines.primary.range.value (as float)
+        Field('cruisingRangeElectric_km', int, fix=fixCruisingRange),
+    )
@@ -2,6 +2,7 @@ import logging
 
 from weconnect_cupra.addressable import AddressableLeaf, ChangeableAttribute
 from weconnect_cupra.api.cupra.elements.generic_settings import GenericSettings
+from weconnect_cupra.elements.schema import StatusSchema, Field
 from weconnect_cupra.api.cupra.elements.enums import UnlockPlugState, MaximumChargeCurrent
 
 LOG = logging.getLogger("weconnect_cupra")
@@ -16,14 +17,8 @@ class ChargingSettings(GenericSettings):
         fromDict=None,
         fixAPI=True,
     ):
-        self.maxChargeCurrentAC = ChangeableAttribute(
-            localAddress='maxChargeCurrentAC', parent=self, value=None, valueType=MaximumChargeCurrent)
-        self.autoUnlockPlugWhenCharged = ChangeableAttribute(localAddress='autoUnlockPlugWhenCharged', value=None,
-                                                             parent=self, valueType=UnlockPlugState)
-        self.autoUnlockPlugWhenChargedAC = ChangeableAttribute(localAddress='autoUnlockPlugWhenChargedAC', value=None,
-                                                               parent=self, valueType=UnlockPlugState)
-        self.targetSOC_pct = ChangeableAttribute(localAddress='targetSOC_pct', value=None, parent=self, valueType=float)
-        
+        ChargingSettings.schema.createAttributes(self)
+
         super().__init__(vehicle=vehicle, parent=parent, statusId=statusId, fromDict=fromDict, fixAPI=fixAPI)
 
         self.maxChargeCurrentAC.addObserver(self.valueChanged, AddressableLeaf.ObserverEvent.VALUE_CHANGED,
@@ -36,32 +31,11 @@ class ChargingSettings(GenericSettings):
                                        priority=AddressableLeaf.ObserverPriority.INTERNAL_MID)
 
     def update(self, fromDict, ignoreAttributes=None):
-        ignoreAttributes = ignoreAttributes or []
         LOG.debug('Update Charging settings from dict')
 
-        # Cupra
-        if 'value' not in fromDict:
-            fromDict['value'] = fromDict
-
-        if 'value' in fromDict:
-            self.maxChargeCurrentAC.fromDict(fromDict['value'], 'maxChargeCurrentAC')
-            self.autoUnlockPlugWhenCharged.fromDict(fromDict['value'], 'autoUnlockPlugWhenCharged')
-            self.autoUnlockPlugWhenChargedAC.fromDict(fromDict['value'], 'autoUnlockPlugWhenChargedAC')
-            # Apparently different for Cupra. targetSOC_pct -> targetSoc_pct
-            self.targetSOC_pct.fromDict(fromDict['value'], 'targetSoc_pct')
-        else:
-            self.maxChargeCurrentAC.enabled = False
-            self.autoUnlockPlugWhenCharged.enabled = False
-            self.autoUnlockPlugWhenChargedAC.enabled = False
-            self.targetSOC_pct.enabled = False
+        ChargingSettings.schema.parse(self, GenericSettings.payloadValue(fromDict), fixAPI=self.fixAPI)
 
-        super().update(fromDict=fromDict, ignoreAttributes=(ignoreAttributes
-                                                            + [
-                                                                'maxChargeCurrentAC',
-                                                                'autoUnlockPlugWhenCharged',
-                                                                'autoUnlockPlugWhenChargedAC',
-                                                                'targetSOC_pct'
-                                                            ]))
+        super().update(fromDict=fromDict, ignoreAttributes=ChargingSettings.schema.ignoring(ignoreAttributes))
 
     def __str__(self):
         string = super().__str__()
@@ -74,3 +48,11 @@ class ChargingSettings(GenericSettings):
         if self.targetSOC_pct.enabled:
             string += f'\n\tTarget SoC: {self.targetSOC_pct.value} %'
         return string
+
+    schema = StatusSchema(
+        Field('maxChargeCurrentAC', MaximumChargeCurrent, attributeClass=ChangeableAttribute),
+        Field('autoUnlockPlugWhenCharged', UnlockPlugState, attributeClass=ChangeableAttribute),
+        Field('autoUnlockPlugWhenChargedAC', UnlockPlugState, attributeClass=ChangeableAttribute),
+        # Apparently different for Cupra. targetSOC_pct -> targetSoc_pct
+        Field('targetSOC_pct', float, key='targetSoc_pct', attributeClass=ChangeableAttribute),
+    )
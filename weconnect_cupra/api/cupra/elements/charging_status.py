@@ -1,12 +1,35 @@
 from enum import Enum
 import logging
 
-from weconnect_cupra.addressable import AddressableAttribute
 from weconnect_cupra.elements.generic_status import GenericStatus
+from weconnect_cupra.elements.schema import StatusSchema, Field
 
 LOG = logging.getLogger("weconnect_cupra")
 
 
+def zeroWhileNotCharging(attributeName):
+    def fix(status, value):
+        if value != 0 and status.chargingState.value in [ChargingStatus.ChargingState.OFF,
+                                                         ChargingStatus.ChargingState.READY_FOR_CHARGING,
+                                                         ChargingStatus.ChargingState.NOT_READY_FOR_CHARGING,
+                                                         ChargingStatus.ChargingState.CHARGE_PURPOSE_REACHED_NOT_CONSERVATION_CHARGING,
+                                                         ChargingStatus.ChargingState.ERROR]:
+            LOG.debug('%s: Attribute %s is %s while chargingState is %s. Setting 0 instead',
+                      status.getGlobalAddress(), attributeName, value, status.chargingState.value)
+            return 0.0
+        return value
+    return fix
+
+
+def parseChargeRate(chargeRate_kmph):
+    if chargeRate_kmph:
+        try:
+            return float(chargeRate_kmph)
+        except ValueError:
+            pass
+    return float(0)
+
+
 class ChargingStatus(GenericStatus):
     def __init__(
         self,
@@ -16,90 +39,15 @@ class ChargingStatus(GenericStatus):
         fromDict=None,
         fixAPI=True,
     ):
-        self.remainingChargingTimeToComplete_min = AddressableAttribute(
-            localAddress='remainingChargingTimeToComplete_min', parent=self, value=None, valueType=int)
-        self.chargingState = AddressableAttribute(
-            localAddress='chargingState', value=None, parent=self, valueType=ChargingStatus.ChargingState)
-        self.chargeMode = AddressableAttribute(
-            localAddress='chargeMode', value=None, parent=self, valueType=ChargingStatus.ChargeMode)
-        self.chargePower_kW = AddressableAttribute(
-            localAddress='chargePower_kW', value=None, parent=self, valueType=float)
-        self.chargeRate_kmph = AddressableAttribute(
-            localAddress='chargeRate_kmph', value=None, parent=self, valueType=float)
-        self.chargeType = AddressableAttribute(localAddress='chargeType', value=None, parent=self, valueType=ChargingStatus.ChargeType)
-        self.chargingSettings = AddressableAttribute(localAddress='chargingSettings', value=None, parent=self, valueType=str)
-
+        ChargingStatus.schema.createAttributes(self)
         super().__init__(vehicle=vehicle, parent=parent, statusId=statusId, fromDict=fromDict, fixAPI=fixAPI)
 
-    def update(self, fromDict, ignoreAttributes=None):  # noqa: C901
-        ignoreAttributes = ignoreAttributes or []
+    def update(self, fromDict, ignoreAttributes=None):
         LOG.debug('Update Charging status from dict')
 
-        # Cupra
-        if 'value' not in fromDict:
-            fromDict['value'] = fromDict
-
-        if 'value' in fromDict:
-            self.remainingChargingTimeToComplete_min.fromDict(fromDict['value'], 'remainingChargingTimeToComplete_min')
-            self.chargingState.fromDict(fromDict['value'], 'chargingState')
-            self.chargeMode.fromDict(fromDict['value'], 'chargeMode')
-            self.chargePower_kW.fromDict(fromDict['value'], 'chargePower_kW')
-            if 'chargePower_kW' in fromDict['value']:
-                chargePower_kW = float(fromDict['value']['chargePower_kW'])
-                if self.fixAPI and chargePower_kW != 0 \
-                        and self.chargingState.value in [ChargingStatus.ChargingState.OFF,
-                                                         ChargingStatus.ChargingState.READY_FOR_CHARGING,
-                                                         ChargingStatus.ChargingState.NOT_READY_FOR_CHARGING,
-                                                         ChargingStatus.ChargingState.CHARGE_PURPOSE_REACHED_NOT_CONSERVATION_CHARGING,
-                                                         ChargingStatus.ChargingState.ERROR]:
-                    chargePower_kW = 0.0
-                    LOG.debug('%s: Attribute chargePower_kW is %s while chargingState is %s. Setting 0 instead',
-                              self.getGlobalAddress(), fromDict['value']['chargePower_kW'], self.chargingState.value)
-                self.chargePower_kW.setValueWithCarTime(chargePower_kW, lastUpdateFromCar=None, fromServer=True)
-            else:
-                self.chargePower_kW.enabled = False
-            if 'chargeRate_kmph' in fromDict['value']:
-                if fromDict['value']['chargeRate_kmph']:
-                    try:
-                        chargeRate_kmph = float(fromDict['value']['chargeRate_kmph'])
-                    except ValueError:
-                        chargeRate_kmph = float(0)
-                else:
-                    chargeRate_kmph = float(0)
-
-                if self.fixAPI and chargeRate_kmph != 0 \
-                        and self.chargingState.value in [ChargingStatus.ChargingState.OFF,
-                                                         ChargingStatus.ChargingState.READY_FOR_CHARGING,
-                                                         ChargingStatus.ChargingState.NOT_READY_FOR_CHARGING,
-                                                         ChargingStatus.ChargingState.CHARGE_PURPOSE_REACHED_NOT_CONSERVATION_CHARGING,
-                                                         ChargingStatus.ChargingState.ERROR]:
-                    chargeRate_kmph = 0.0
-                    LOG.debug('%s: Attribute chargeRate_kmph is %s while chargingState is %s. Setting 0 instead',
-                              self.getGlobalAddress(), fromDict['value']['chargeRate_kmph'], self.chargingState.value)
-                self.chargeRate_kmph.setValueWithCarTime(chargeRate_kmph, lastUpdateFromCar=None, fromServer=True)
-            else:
-                self.chargeRate_kmph.enabled = False
-            self.chargeType.fromDict(fromDict['value'], 'chargeType')
-            self.chargingSettings.fromDict(fromDict['value'], 'chargingSettings')
-        else:
-            self.remainingChargingTimeToComplete_min.enabled = False
-            self.chargingState.enabled = False
-            self.chargeMode.enabled = False
-            self.chargePower_kW.enabled = False
-            self.chargeRate_kmph.enabled = False
-            self.chargeType.enabled = False
-            self.chargingSettings.enabled = False
-
-        super().update(fromDict=fromDict, ignoreAttributes=(ignoreAttributes
-                                                            + [
-                                                                'remainingChargingTimeToComplete_min',
-                                                                'chargingState',
-                                                                'chargeMode',
-                                                                'chargePower_kW',
-                                                                'chargeRate_kmph',
-                                                                'chargeType',
-                                                                'chargingSettings'
-                                                            ]))
+        ChargingStatus.schema.parse(self, GenericStatus.payloadValue(fromDict), fixAPI=self.fixAPI)
+
+        super().update(fromDict=fromDict, ignoreAttributes=ChargingStatus.schema.ignoring(ignoreAttributes))
 
     def __str__(self):
         string = super().__str__()
@@ -148,3 +96,13 @@ class ChargingStatus(GenericStatus):
         AC = 'ac'
         DC = 'dc'
         UNKNOWN = 'unknown charge type'
+
+    schema = StatusSchema(
+        Field('remainingChargingTimeToComplete_min', int),
+        Field('chargingState', ChargingState),
+        Field('chargeMode', ChargeMode),
+        Field('chargePower_kW', float, fix=zeroWhileNotCharging('chargePower_kW')),
+        Field('chargeRate_kmph', float, coerce=parseChargeRate, fix=zeroWhileNotCharging('chargeRate_kmph'), coerceNone=True),
+        Field('chargeType', ChargeType),
+        Field('chargingSettings', str),
+    )
@@ -70,26 +70,19 @@ class ClimatizationSettings(GenericSettings):
         ignoreAttributes = ignoreAttributes or []
         LOG.debug('Update Climatization settings from dict')
 
-        # Cupra
-        if 'value' not in fromDict:
-            fromDict['value'] = fromDict
-        # if 'targetTemperature_C' not in fromDict['value']:
-        #     fromDict['value']['targetTemperature_C'] = kelvinToCelsius(fromDict['value']['targetTemperature_K'])
-        # if 'targetTemperature_F' not in fromDict['value']:
-        #     fromDict['value']['targetTemperature_F'] = kelvinToFarenheit(fromDict['value']['targetTemperature_K'])
-
-        if 'value' in fromDict:
-            self.targetTemperature_K.fromDict(fromDict['value'], 'targetTemperature_K')
-            self.targetTemperature_C.fromDict(fromDict['value'], 'targetTemperatureInCelsius')
-            self.targetTemperature_F.fromDict(fromDict['value'], 'targetTemperatureInFahrenheit')
-            self.unitInCar.fromDict(fromDict['value'], 'unitInCar')
-            self.climatisationWithoutExternalPower.fromDict(fromDict['value'], 'climatisationWithoutExternalPower')
-            self.climatisationAtUnlock.fromDict(fromDict['value'], 'climatisationAtUnlock')
-            self.windowHeatingEnabled.fromDict(fromDict['value'], 'windowHeatingEnabled')
-            self.zoneFrontLeftEnabled.fromDict(fromDict['value'], 'zoneFrontLeftEnabled')
-            self.zoneFrontRightEnabled.fromDict(fromDict['value'], 'zoneFrontRightEnabled')
-            self.zoneRearLeftEnabled.fromDict(fromDict['value'], 'zoneRearLeftEnabled')
-            self.zoneRearRightEnabled.fromDict(fromDict['value'], 'zoneRearRightEnabled')
+        value = GenericSettings.payloadValue(fromDict)
+        if isinstance(value, dict):
+            self.targetTemperature_K.fromDict(value, 'targetTemperature_K')
+            self.targetTemperature_C.fromDict(value, 'targetTemperatureInCelsius')
+            self.targetTemperature_F.fromDict(value, 'targetTemperatureInFahrenheit')
+            self.unitInCar.fromDict(value, 'unitInCar')
+            self.climatisationWithoutExternalPower.fromDict(value, 'climatisationWithoutExternalPower')
+            self.climatisationAtUnlock.fromDict(value, 'climatisationAtUnlock')
+            self.windowHeatingEnabled.fromDict(value, 'windowHeatingEnabled')
+            self.zoneFrontLeftEnabled.fromDict(value, 'zoneFrontLeftEnabled')
+            self.zoneFrontRightEnabled.fromDict(value, 'zoneFrontRightEnabled')
+            self.zoneRearLeftEnabled.fromDict(value, 'zoneRearLeftEnabled')
+            self.zoneRearRightEnabled.fromDict(value, 'zoneRearRightEnabled')
         else:
             self.targetTemperature_K.enabled = False
             self.targetTemperature_C.enabled = False
@@ -27,18 +27,15 @@ class ClimatizationStatus(GenericStatus):
         ignoreAttributes = ignoreAttributes or []
         LOG.debug('Update Climatization status from dict')
 
-        # Cupra
-        if 'value' not in fromDict:
-            fromDict['value'] = fromDict
-
-        if 'value' in fromDict:
-            self.climatisationState.fromDict(fromDict['value'], 'climatisationState')
-            if 'remainingClimatisationTimeInMinutes' in fromDict['value']:
-                remainingTime = int(fromDict['value']['remainingClimatisationTimeInMinutes'])
+        value = GenericStatus.payloadValue(fromDict)
+        if isinstance(value, dict):
+            self.climatisationState.fromDict(value, 'climatisationState')
+            if 'remainingClimatisationTimeInMinutes' in value:
+                remainingTime = int(value['remainingClimatisationTimeInMinutes'])
                 if self.fixAPI and remainingTime != 0 and self.climatisationState.value == ClimatizationState.OFF:
                     remainingTime = 0
                     LOG.debug('%s: Attribute remainingClimatisationTimeInMinutes is %s while climatisationState is %s. Setting 0 instead',
-                              self.getGlobalAddress(), fromDict['value']['remainingClimatisationTimeInMinutes'], self.climatisationState.value)
+                              self.getGlobalAddress(), value['remainingClimatisationTimeInMinutes'], self.climatisationState.value)
                 self.remainingClimatisationTime_min.setValueWithCarTime(remainingTime, lastUpdateFromCar=None, fromServer=True)
             else:
                 self.remainingClimatisationTime_min.enabled = False
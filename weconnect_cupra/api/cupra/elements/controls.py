@@ -33,13 +33,14 @@ class Controls(AddressableObject):
 
     def update(self):
         for domain in self.vehicle.domains.values():
-            for status in domain.values():
-                if isinstance(status, ClimatizationSettings):
+            # Only look at the classes, deferred statuses do not need to be built for this
+            for statusClass in [domain.getStatusClass(key) for key in domain.keys()]:
+                if statusClass is not None and issubclass(statusClass, ClimatizationSettings):
                     if self.climatizationControl is None:
                         self.climatizationControl = ChangeableAttribute(
                             localAddress='climatisation', parent=self, value=ControlOperation.NONE, valueType=(ControlOperation, float),
                             valueSetter=self.__setClimatizationControlChange)
-                elif isinstance(status, ChargingSettings):
+                elif statusClass is not None and issubclass(statusClass, ChargingSettings):
                     if self.chargingControl is None:
                         self.chargingControl = ChangeableAttribute(
                             localAddress='charging', parent=self, value=ControlOperation.NONE, valueType=ControlOperation,
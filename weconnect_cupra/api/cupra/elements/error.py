@@ -65,9 +65,10 @@ class Error(AddressableObject):
         else:
             self.enabled = True
 
-        for key, value in {key: value for key, value in fromDict.items()
-                           if key not in ['code', 'message', 'group', 'info', 'errorTimeStamp', 'retry']}.items():
-            LOG.debug('%s: Unknown attribute %s with value %s', self.getGlobalAddress(), key, value)
+        if LOG.isEnabledFor(logging.DEBUG):
+            for key, value in fromDict.items():
+                if key not in ('code', 'message', 'group', 'info', 'errorTimeStamp', 'retry'):
+                    LOG.debug('%s: Unknown attribute %s with value %s', self.getGlobalAddress(), key, value)
 
     def __str__(self) -> str:
         return f'Error {self.code.value}: {self.message.value} \n\tinfo: {self.info.value} \n\ttimestamp: {self.timestamp.value}'
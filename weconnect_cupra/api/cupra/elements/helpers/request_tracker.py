@@ -1,12 +1,12 @@
-from typing import TYPE_CHECKING, Tuple
+from typing import TYPE_CHECKING, Optional, Tuple
 from datetime import datetime, timedelta
-from threading import Timer
 import logging
 
 if TYPE_CHECKING:
     from weconnect_cupra.api.cupra.elements.vehicle import Vehicle
 
 from weconnect_cupra.elements.generic_status import GenericStatus
+from weconnect_cupra.scheduler import Scheduler, getDefaultScheduler
 from weconnect_cupra.api.cupra.domain import Domain
 
 
@@ -14,15 +14,27 @@ LOG = logging.getLogger("weconnect_cupra")
 
 
 class RequestTracker:
-    def __init__(self, vehicle: 'Vehicle') -> None:
+    # Seconds between two status updates while requests are tracked
+    INTERVAL: float = 5
+
+    def __init__(self, vehicle: 'Vehicle', scheduler: Optional[Scheduler] = None) -> None:
         self.vehicle: 'Vehicle' = vehicle
         self.requests: dict[Domain, list[Tuple[str, datetime, datetime]]] = {}
-        self.__timer = None
+        # All trackers share one scheduler thread instead of starting a Timer thread for every update
+        self.__scheduler: Optional[Scheduler] = scheduler
+
+    @property
+    def scheduler(self) -> Scheduler:
+        # The default scheduler is looked up on every use, it is replaced if it was shut down
+        return self.__scheduler if self.__scheduler is not None else getDefaultScheduler()
 
     def clear(self) -> None:
         self.requests.clear()
-        if self.__timer is not None or self.__timer.is_alive():
-            self.__timer.cancel()
+        self.scheduler.cancel(self)
+
+    @property
+    def pendingRequests(self) -> int:
+        return sum(len(requests) for requests in list(self.requests.values()))
 
     def trackRequest(self, id: str, domain: Domain, minTime: int, maxTime: int) -> None:
         minDate = datetime.now() + timedelta(seconds=minTime)
@@ -33,10 +45,8 @@ class RequestTracker:
         else:
             self.requests[domain].append((id, minDate, maxDate))
 
-        if self.__timer is None or not self.__timer.is_alive():
-            self.__timer = Timer(5, self.update)
-            self.__timer.daemon = True
-            self.__timer.start()
+        # Merged with the update that is already pending
+        self.scheduler.schedule(self, RequestTracker.INTERVAL, self.update)
 
     def update(self) -> None:  # noqa: C901
         LOG.debug('request tracking update status for %d domains', len(self.requests))
@@ -48,7 +58,7 @@ class RequestTracker:
                     openRequests.extend(status.requests.values())
 
         for domain, requests in list(self.requests.items()):
-            for request in requests:
+            for request in list(requests):
                 id, minDate, maxDate = request
 
                 if maxDate < datetime.now():
@@ -71,7 +81,5 @@ class RequestTracker:
             if not requests:
                 self.requests.pop(domain)
 
-        if self.requests:  # Restart timer if there are still requests left
-            self.__timer = Timer(5, self.update)
-            self.__timer.daemon = True
-            self.__timer.start()
+        if self.requests:  # Schedule the next update if there are still requests left
+            self.scheduler.schedule(self, RequestTracker.INTERVAL, self.update)
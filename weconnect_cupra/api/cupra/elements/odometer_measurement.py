@@ -21,23 +21,17 @@ class OdometerMeasurement(GenericStatus):
 
     def update(self, fromDict, ignoreAttributes=None):
         ignoreAttributes = ignoreAttributes or []
-        LOG.debug(f'Odometer measurement from dict: {fromDict}')
-
-        # Cupra
-        if 'value' not in fromDict:
-            fromDict['value'] = fromDict
-
-        if 'value' in fromDict:
-            if 'mileageKm' in fromDict['value']:
-                self.set(fromDict['value']['mileageKm'])
-                odometer = int(fromDict['value']['mileageKm'])
-                if self.fixAPI and odometer == 0x7FFFFFFF:
-                    odometer = None
-                    LOG.info('%s: Attribute odometer was error value 0x7FFFFFFF. Setting error state instead'
-                             ' of 2147483647 km.', self.getGlobalAddress())
-                self.odometer.setValueWithCarTime(odometer, lastUpdateFromCar=None, fromServer=True)
+        LOG.debug('Odometer measurement from dict: %s', fromDict)
+
+        value = GenericStatus.payloadValue(fromDict)
+        if isinstance(value, dict):
+            if 'mileageKm' in value:
+                self.set(value['mileageKm'])
             else:
                 self.odometer.enabled = False
+        elif value is not None:
+            # Plain mileage instead of a dict
+            self.set(value)
         else:
             self.odometer.enabled = False
 
@@ -1,9 +1,9 @@
 from __future__ import annotations
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Callable, Iterator, Tuple, Type
 from enum import Enum
 import logging
 
-from weconnect_cupra.addressable import AddressableObject, AddressableAttribute, AddressableDict, AddressableList
+from weconnect_cupra.addressable import AddressableLeaf, AddressableObject, AddressableAttribute, AddressableDict, AddressableList, Transaction
 from weconnect_cupra.api.cupra.elements.odometer_measurement import OdometerMeasurement
 from weconnect_cupra.api.cupra.elements.parking_position import ParkingPosition
 from weconnect_cupra.elements.error import Error
@@ -12,6 +12,7 @@ from weconnect_cupra.errors import APICompatibilityError, APIError
 from weconnect_cupra.util import toBool
 from weconnect_cupra.api.cupra.domain import Domain
 from weconnect_cupra.fetch import Fetcher
+from weconnect_cupra.observer_registry import ObserverHandle
 from weconnect_cupra.elements.plug_status import PlugStatus
 from weconnect_cupra.api.cupra.elements.climatization_status import ClimatizationStatus
 from weconnect_cupra.api.cupra.elements.climatization_settings import ClimatizationSettings
@@ -29,10 +30,117 @@ LOG: logging.Logger = logging.getLogger("weconnect_cupra")
 
 
 class DomainDict(AddressableDict):
-    def __init__(self, **kwargs):
+    """Statuses of a domain. Statuses can be deferred, then only the payload is kept and the status object is built on
+    first access to it or when the domain is traversed"""
+
+    def __init__(self, materializer: Optional[Callable[[DomainDict, str, Type[Any], Any], None]] = None, **kwargs):
         self.error: Error = Error(localAddress='error', parent=self)
+        self.__materializer: Optional[Callable[[DomainDict, str, Type[Any], Any], None]] = materializer
+        self.__pending: Dict[str, Tuple[Type[Any], Any]] = {}
         super().__init__(**kwargs)
 
+    def defer(self, key: str, klass: Type[Any], payload: Any) -> None:
+        if self.__materializer is None:
+            raise ValueError('Statuses can only be deferred if the domain has a materializer')
+        transaction: Optional[Transaction] = Transaction.current()
+        if transaction is not None:
+            transaction.recordUndo(self.__restorePending, key, self.__pending.get(key))
+        self.__pending[key] = (klass, payload)
+        self._markModified()
+
+    def __restorePending(self, key: str, pending: Optional[Tuple[Type[Any], Any]]) -> None:
+        if pending is None:
+            self.__pending.pop(key, None)
+        else:
+            self.__pending[key] = pending
+        self._markModified()
+
+    def isPending(self, key: str) -> bool:
+        return key in self.__pending
+
+    def getStatusClass(self, key: str) -> Optional[Type[Any]]:
+        """Class of the status stored under key without building it"""
+        if key in self.__pending:
+            return self.__pending[key][0]
+        if super().__contains__(key):
+            return type(super().__getitem__(key))
+        return None
+
+    def hasSubscribers(self) -> bool:
+        """True if anything would miss notifications of a deferred status"""
+        return bool(AddressableLeaf._changeSetObserverCount  # pylint: disable=protected-access
+                    or self.getObserverEntries(AddressableLeaf.ObserverEvent.ALL)
+                    or self.getObserverEntries(AddressableLeaf.ObserverEvent.ALL, onUpdateComplete=True))
+
+    def materialize(self, key: Optional[str] = None) -> None:
+        keys: List[str] = list(self.__pending) if key is None else [key]
+        for pendingKey in keys:
+            if pendingKey in self.__pending and self.__materializer is not None:
+                transaction: Optional[Transaction] = Transaction.current()
+                if transaction is not None:
+                    transaction.recordUndo(self.__restorePending, pendingKey, self.__pending[pendingKey])
+                klass, payload = self.__pending.pop(pendingKey)
+                self.__materializer(self, pendingKey, klass, payload)
+
+    def _materializeChildren(self) -> None:
+        if self.__pending:
+            self.materialize()
+
+    def addObserver(self, observer: Callable, flag: AddressableLeaf.ObserverEvent, priority: Optional[AddressableLeaf.ObserverPriority] = None,
+                    onUpdateComplete: bool = False, weak: bool = False) -> ObserverHandle:
+        # Deferred statuses would not notify the new observer, so they are built before it is registered
+        self.materialize()
+        return super().addObserver(observer, flag, priority=priority, onUpdateComplete=onUpdateComplete, weak=weak)
+
+    def addChangeSetObserver(self, observer: Callable[..., None]) -> None:
+        self.materialize()
+        super().addChangeSetObserver(observer)
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self.__pending:
+            self.materialize(key)
+        return super().__getitem__(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self.__pending:
+            self.materialize(key)
+        return super().get(key, default)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.__pending or super().__contains__(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return super().__len__() + len(self.__pending)
+
+    def keys(self) -> List[str]:  # type: ignore
+        return list(super().keys()) + list(self.__pending)
+
+    def values(self) -> List[Any]:  # type: ignore
+        self._materializeChildren()
+        return list(super().values())
+
+    def items(self) -> List[Tuple[str, Any]]:  # type: ignore
+        self._materializeChildren()
+        return list(super().items())
+
+    def __delitem__(self, key: str) -> None:
+        if self.__pending.pop(key, None) is not None:
+            self._markModified()
+            return
+        super().__delitem__(key)
+
+    def pop(self, key: str, *args: Any) -> Any:
+        if key in self.__pending:
+            self.materialize(key)
+        return super().pop(key, *args)
+
+    def clear(self) -> None:
+        self.__pending.clear()
+        super().clear()
+
     def updateError(self, fromDict: Dict[str, Any]):
         if 'error' in fromDict:
             self.error.update(fromDict['error'])
@@ -55,9 +163,12 @@ class Vehicle(AddressableObject):  # pylint: disable=too-many-instance-attribute
         updateCapabilities: bool = True,
         updatePictures: bool = True,
         selective: Optional[list[Domain]] = None,
-        enableTracker: bool = False
+        enableTracker: bool = False,
+        lazyStatus: bool = False
     ) -> None:
         self.fetcher: Fetcher = fetcher
+        # Only keep the payloads of statuses nobody subscribed to, they are built when they are accessed
+        self.lazyStatus: bool = lazyStatus
         super().__init__(localAddress=vin, parent=parent)
 
         # Public API properties
@@ -114,24 +225,37 @@ class Vehicle(AddressableObject):  # pylint: disable=too-many-instance-attribute
     def assign_properties_to_domain(self, klass, properties: dict, domain_value: str, settings_key: str) -> DomainDict:
         if not properties:
             return
-        if domain_value not in self.domains:
-            self.domains[domain_value] = DomainDict(localAddress=domain_value, parent=self.domains)
-            self.domains[domain_value].enabled = True
-        # Create a settings object
-        if settings_key in self.domains[domain_value]:
-            LOG.debug('Status %s exists, updating it', settings_key)
-            self.domains[domain_value][settings_key].update(fromDict=properties)
-            self.domains[domain_value][settings_key].enabled = True
-        else:
-            LOG.debug('Status %s does not exist, creating it', settings_key)
-            self.domains[domain_value][settings_key] = klass(vehicle=self,
-                                                             parent=self.domains[domain_value],
-                                                             statusId=settings_key,
-                                                             fixAPI=self.fixAPI,
-                                                             fromDict=properties)
-            # We also have to call update(), not just pass fromDict to constructor
-            self.domains[domain_value][settings_key].update(fromDict=properties)
-            self.domains[domain_value][settings_key].enabled = True
+        # A status that fails to update is rolled back on its own, other statuses of the update are kept
+        with self.transaction():
+            if domain_value not in self.domains:
+                self.domains[domain_value] = DomainDict(localAddress=domain_value, parent=self.domains, materializer=self.__createStatus)
+                self.domains[domain_value].enabled = True
+            domain: DomainDict = self.domains[domain_value]
+            if self.lazyStatus and (domain.isPending(settings_key) or settings_key not in domain) and not domain.hasSubscribers():
+                LOG.debug('Status %s is deferred until it is accessed', settings_key)
+                domain.defer(settings_key, klass, properties)
+            elif domain.isPending(settings_key):
+                domain.defer(settings_key, klass, properties)
+                domain.materialize(settings_key)
+            # Create a settings object
+            elif settings_key in domain:
+                LOG.debug('Status %s exists, updating it', settings_key)
+                domain[settings_key].updateIfChanged(fromDict=properties)
+                domain[settings_key].enabled = True
+            else:
+                self.__createStatus(domain, settings_key, klass, properties)
+        return domain
+
+    def __createStatus(self, domain: DomainDict, settings_key: str, klass, properties) -> None:
+        LOG.debug('Status %s does not exist, creating it', settings_key)
+        domain[settings_key] = klass(vehicle=self,
+                                     parent=domain,
+                                     statusId=settings_key,
+                                     fixAPI=self.fixAPI,
+                                     fromDict=properties)
+        # We also have to call update(), not just pass fromDict to constructor
+        domain[settings_key].updateIfChanged(fromDict=properties)
+        domain[settings_key].enabled = True
 
     def update(  # noqa: C901  # pylint: disable=too-many-branches
         self,
@@ -144,21 +268,31 @@ class Vehicle(AddressableObject):  # pylint: disable=too-many-instance-attribute
         if fromDict is not None:
             LOG.debug('Create /update vehicle')
 
-             # Set basic vehicle properties
-            self.vin.fromDict(fromDict, 'vin')
-            self.role.fromDict(fromDict, 'userRole')
-            self.enrollmentStatus.fromDict(fromDict, 'enrollmentStatus')
-            self.userRoleStatus.fromDict(fromDict, 'userRoleStatus')
-            self.model.fromDict(fromDict, 'model')
-            self.devicePlatform.fromDict(fromDict, 'devicePlatform')
-            self.nickname.fromDict(fromDict, 'vehicleNickname')
-            self.brandCode.fromDict(fromDict, 'brandCode')
-
-            # Update capabilities
+            # Fetch the capabilities before anything is changed
+            capabilities_dict = None
             if updateCapabilities:
+                vin = fromDict.get('vin', self.vin.value)
                 try:
                     capabilities_dict = self.fetcher.fetchData(
-                        f'https://ola.prod.code.seat.cloud.vwgroup.com/v1/user/{self.fetcher.user_id}/vehicle/{self.vin.value}/capabilities')
+                        f'https://ola.prod.code.seat.cloud.vwgroup.com/v1/user/{self.fetcher.user_id}/vehicle/{vin}/capabilities')
+                except Exception as e:
+                    LOG.warning('Failed to fetch capabilities for VIN %s: %s', vin, e)
+                    LOG.warning('Capabilities endpoint may have changed or is unavailable, continuing without capabilities')
+
+            # Everything fetched is applied in one transaction, observers see the vehicle only after it is complete
+            with self.transaction():
+                # Set basic vehicle properties
+                self.vin.fromDict(fromDict, 'vin')
+                self.role.fromDict(fromDict, 'userRole')
+                self.enrollmentStatus.fromDict(fromDict, 'enrollmentStatus')
+                self.userRoleStatus.fromDict(fromDict, 'userRoleStatus')
+                self.model.fromDict(fromDict, 'model')
+                self.devicePlatform.fromDict(fromDict, 'devicePlatform')
+                self.nickname.fromDict(fromDict, 'vehicleNickname')
+                self.brandCode.fromDict(fromDict, 'brandCode')
+
+                # Update capabilities
+                if updateCapabilities:
                     if capabilities_dict and 'capabilities' in capabilities_dict and capabilities_dict['capabilities'] is not None:
                         for capDict in capabilities_dict['capabilities']:
                             if 'id' in capDict:
@@ -177,45 +311,61 @@ class Vehicle(AddressableObject):  # pylint: disable=too-many-instance-attribute
                     else:
                         self.capabilities.clear()
                         self.capabilities.enabled = False
-                except Exception as e:
-                    LOG.warning('Failed to fetch capabilities for VIN %s: %s', self.vin.value, e)
-                    LOG.warning('Capabilities endpoint may have changed or is unavailable, continuing without capabilities')
-                    self.capabilities.clear()
-                    self.capabilities.enabled = False
 
-            if 'images' in fromDict:
-                self.images.setValueWithCarTime(fromDict['images'], lastUpdateFromCar=None, fromServer=True)
-            else:
-                self.images.enabled = False
-
-            if 'tags' in fromDict:
-                self.tags.setValueWithCarTime(fromDict['tags'], lastUpdateFromCar=None, fromServer=True)
-            else:
-                self.tags.enabled = False
-
-            if 'coUsers' in fromDict and fromDict['coUsers'] is not None:
-                for user in fromDict['coUsers']:
-                    if 'id' in user:
-                        usersWithId = [x for x in self.coUsers if x.id.value == user['id']]
-                        if len(usersWithId) > 0:
-                            usersWithId[0].update(fromDict=user)
+                if 'images' in fromDict:
+                    self.images.setValueWithCarTime(fromDict['images'], lastUpdateFromCar=None, fromServer=True)
+                else:
+                    self.images.enabled = False
+
+                if 'tags' in fromDict:
+                    self.tags.setValueWithCarTime(fromDict['tags'], lastUpdateFromCar=None, fromServer=True)
+                else:
+                    self.tags.enabled = False
+
+                if 'coUsers' in fromDict and fromDict['coUsers'] is not None:
+                    for user in fromDict['coUsers']:
+                        if 'id' in user:
+                            usersWithId = [x for x in self.coUsers if x.id.value == user['id']]
+                            if len(usersWithId) > 0:
+                                usersWithId[0].update(fromDict=user)
+                            else:
+                                self.coUsers.append(Vehicle.User(localAddress=str(len(self.coUsers)), parent=self.coUsers, fromDict=user))
                         else:
-                            self.coUsers.append(Vehicle.User(localAddress=str(len(self.coUsers)), parent=self.coUsers, fromDict=user))
-                    else:
-                        raise APICompatibilityError('User is missing id field')
-                # Remove all users that are not in list anymore
-                for user in [user for user in self.coUsers if user.id.value not in [x['id'] for x in fromDict['coUsers']]]:
-                    self.coUsers.remove(user)
-            else:
-                self.coUsers.enabled = False
-                self.coUsers.clear()
+                            raise APICompatibilityError('User is missing id field')
+                    # Remove all users that are not in list anymore
+                    for user in [user for user in self.coUsers if user.id.value not in [x['id'] for x in fromDict['coUsers']]]:
+                        self.coUsers.remove(user)
+                else:
+                    self.coUsers.enabled = False
+                    self.coUsers.clear()
 
         self.updateStatus(updateCapabilities=updateCapabilities, force=force, selective=selective)
 
-    def updateStatus(self, updateCapabilities: bool = True, force: bool = False,  # noqa: C901 # pylint: disable=too-many-branches
-                selective: Optional[list[Domain]] = None):
-        """Update vehicle status and settings domains, as well as controls, following calls to API"""
-
+    def updateStatus(self, updateCapabilities: bool = True, force: bool = False,
+                     selective: Optional[list[Domain]] = None):
+        """Update vehicle status and settings domains, as well as controls, following calls to API. All payloads are
+        fetched first and then applied in a transaction, if applying fails nothing is changed and no observer is
+        notified"""
+        statuses: List[Tuple[Any, Any, str, str, bool]] = self.__fetchStatuses()
+        with self.transaction():
+            for klass, properties, domain_value, settings_key, optional in statuses:
+                try:
+                    self.assign_properties_to_domain(
+                        klass=klass,
+                        properties=properties,
+                        domain_value=domain_value,
+                        settings_key=settings_key)
+                except Exception as e:  # pylint: disable=broad-except
+                    if not optional:
+                        raise
+                    LOG.warning('Failed to update %s: %s', settings_key, e)
+
+            # Controls
+            self.controls.update()
+
+    def __fetchStatuses(self) -> List[Tuple[Any, Any, str, str, bool]]:  # noqa: C901 # pylint: disable=too-many-branches
+        """Fetches the payloads of all statuses as (class, payload, domain, status, optional). Optional statuses are
+        not always available, e.g. the parking position while driving"""
         if self.vin.value is None:
             raise APIError('VIN value is not set')
 
@@ -244,24 +394,17 @@ class Vehicle(AddressableObject):  # pylint: disable=too-many-instance-attribute
           
         }
 
+        statuses: List[Tuple[Any, Any, str, str, bool]] = []
         for domain_enum, domain_props in jobs.items():
             for prop_name, prop_config in domain_props.items():
-                self.assign_properties_to_domain(
-                    klass=prop_config[0],
-                    properties=prop_config[1],
-                    domain_value=domain_enum.value,
-                    settings_key=prop_name)
+                statuses.append((prop_config[0], prop_config[1], domain_enum.value, prop_name, False))
 
         if 'parkingPosition' in self.capabilities and not self.capabilities['parkingPosition'].status.value:
             try:
                 parking_position_dict = self.fetcher.fetchData(
                     f'https://ola.prod.code.seat.cloud.vwgroup.com/v1/vehicles/{self.vin.value}/parkingposition')
                 
-                self.assign_properties_to_domain(
-                    klass=ParkingPosition,
-                    properties=parking_position_dict,
-                    domain_value=Domain.PARKING.value,
-                    settings_key='parkingPosition')
+                statuses.append((ParkingPosition, parking_position_dict, Domain.PARKING.value, 'parkingPosition', True))
             except:
                 # This can fire when the vehicle is driving, so suppress it
                 LOG.debug('Failed to get parking position')
@@ -271,20 +414,12 @@ class Vehicle(AddressableObject):  # pylint: disable=too-many-instance-attribute
                 mileage_dict = self.fetcher.fetchData(
                     f'https://ola.prod.code.seat.cloud.vwgroup.com/v1/vehicles/{self.vin.value}/mileage') 
                 
-                self.assign_properties_to_domain(
-                    klass=OdometerMeasurement,
-                    properties=mileage_dict,
-                    domain_value=Domain.MEASUREMENTS.value,
-                    settings_key='odometerStatus')
+                statuses.append((OdometerMeasurement, mileage_dict, Domain.MEASUREMENTS.value, 'odometerStatus', True))
 
                 status_dict = self.fetcher.fetchData(
                     f'https://ola.prod.code.seat.cloud.vwgroup.com/v2/vehicles/{self.vin.value}/status') #same
 
-                self.assign_properties_to_domain(
-                    klass=AccessStatus,
-                    properties=status_dict,
-                    domain_value=Domain.ACCESS.value,
-                    settings_key='accessStatus')                
+                statuses.append((AccessStatus, status_dict, Domain.ACCESS.value, 'accessStatus', True))
 
             except:
                 LOG.warn('Failed to get vehicle status')
@@ -293,18 +428,12 @@ class Vehicle(AddressableObject):  # pylint: disable=too-many-instance-attribute
             connection_dict = self.fetcher.fetchData(
                 f'https://ola.prod.code.seat.cloud.vwgroup.com/vehicles/{self.vin.value}/connection')['connection']
 
-            self.assign_properties_to_domain(
-                klass=ConnectionStatus,
-                properties=connection_dict,
-                domain_value=Domain.STATUS.value,
-                settings_key='connectionStatus')
+            statuses.append((ConnectionStatus, connection_dict, Domain.STATUS.value, 'connectionStatus', True))
 
         except:
             LOG.debug('Failed to get connection status')
 
-
-        # Controls
-        self.controls.update()
+        return statuses
 
     def __str__(self) -> str:  # noqa: C901
         returnString: str = ''
@@ -1,17 +1,23 @@
 from __future__ import annotations
-from typing import TYPE_CHECKING, Optional, Dict, Any, List
+from typing import TYPE_CHECKING, Optional, Dict, Any, Collection
 
 from enum import Enum
+import hashlib
+import json
 import logging
 from datetime import datetime, timedelta, timezone
 
 from weconnect_cupra.util import robustTimeParse
-from weconnect_cupra.addressable import AddressableObject, AddressableAttribute, AddressableList, AddressableDict
+from weconnect_cupra.addressable import AddressableLeaf, AddressableObject, AddressableAttribute, AddressableList, AddressableDict, Transaction, \
+    sharedUtcNow
 from weconnect_cupra.elements.control_operation import ControlOperation
 from weconnect_cupra.elements.error import Error
 
 LOG: logging.Logger = logging.getLogger("weconnect_cupra")
 
+# Reported by the API if the car did not provide a timestamp
+INVALID_TIMESTAMP: datetime = datetime(year=2000, month=1, day=1, hour=0, minute=0, second=0, tzinfo=timezone.utc)
+
 
 class GenericStatus(AddressableObject):
     def __init__(
@@ -31,39 +37,83 @@ class GenericStatus(AddressableObject):
         self.error: Error = Error(localAddress='error', parent=self)
         self.requests: AddressableDict[GenericStatus.Request] = AddressableDict(localAddress='request', parent=self)
 
+        self.__fingerprint: Optional[bytes] = None
+
         self.fromDict = fromDict
         if fromDict is not None:
             self.update(fromDict=fromDict)
 
+    @staticmethod
+    def payloadFingerprint(payload: Any) -> Optional[bytes]:
+        """Digest of the canonical JSON form of a payload, None if the payload cannot be serialized"""
+        try:
+            serialized: str = json.dumps(payload, sort_keys=True, default=str, separators=(',', ':'))
+        except (ValueError, TypeError):
+            return None
+        return hashlib.blake2b(serialized.encode('utf-8'), digest_size=16).digest()
+
+    def updateIfChanged(self, fromDict: Dict[str, Any]) -> bool:
+        """Updates from the payload unless it is identical to the last one applied. Unchanged payloads only refresh
+        lastUpdateFromServer and notify UPDATED_FROM_SERVER. Returns True if a full update was done"""
+        # The same payload object may have been modified in place since it was applied, so it is always fingerprinted
+        fingerprint: Optional[bytes] = GenericStatus.payloadFingerprint(fromDict)
+        if fingerprint is not None and fingerprint == self.__fingerprint:
+            self.touchFromServer()
+            return False
+        transaction: Optional[Transaction] = Transaction.current()
+        if transaction is not None:
+            transaction.recordUndo(self.__restoreFingerprint, self.__fingerprint)
+        self.update(fromDict=fromDict)
+        self.__fingerprint = fingerprint
+        return True
+
+    def __restoreFingerprint(self, fingerprint: Optional[bytes]) -> None:
+        self.__fingerprint = fingerprint
+
+    @staticmethod
+    def payloadValue(fromDict: Any) -> Any:
+        """Value part of a payload. Cupra payloads are not wrapped in 'value', then the payload itself is the value.
+        Payloads may be shared with the cache and other readers and must not be modified"""
+        if isinstance(fromDict, dict):
+            return fromDict.get('value', fromDict)
+        return fromDict
+
+    def touchFromServer(self) -> None:
+        now: datetime = sharedUtcNow()
+        for element in self.getLeafChildren():
+            if isinstance(element, AddressableAttribute):
+                element.lastUpdateFromServer = now
+                element.notify(AddressableLeaf.ObserverEvent.UPDATED_FROM_SERVER)
+
     def hasError(self) -> bool:
         return self.error.enabled
 
     def hasRequests(self) -> bool:
         return len(self.requests) > 0
 
-    def update(self, fromDict: Dict[str, Any], ignoreAttributes: Optional[List[str]] = None):  # noqa: C901
-        ignoreAttributes = ignoreAttributes or []
+    def update(self, fromDict: Dict[str, Any], ignoreAttributes: Optional[Collection[str]] = None):  # noqa: C901
         LOG.debug('Update status from dict')
 
+        value: Any = GenericStatus.payloadValue(fromDict)
         # Cupra is not a dict
-        if isinstance(fromDict, Dict) and 'value' in fromDict:
-            if 'carCapturedTimestamp' in fromDict['value']:
-                carCapturedTimestamp: Optional[datetime] = robustTimeParse(fromDict['value']['carCapturedTimestamp'])
+        if isinstance(fromDict, dict):
+            if isinstance(value, dict) and 'carCapturedTimestamp' in value:
+                carCapturedTimestamp: Optional[datetime] = robustTimeParse(value['carCapturedTimestamp'])
                 if self.fixAPI and carCapturedTimestamp is not None:
                     # Looks like for some cars the calculation of the carCapturedTimestamp does not account for the timezone
                     # Unfortunatly it is unknown what the timezone of the car is. So the best we can do is substract 30
                     # minutes as long as the timestamp is in the future. This will create false results when the query
                     # interval is large
-                    fixed: timedelta = timedelta(hours=0, minutes=0)
-                    while carCapturedTimestamp > datetime.utcnow().replace(tzinfo=timezone.utc):
-                        carCapturedTimestamp -= timedelta(hours=0, minutes=30)
-                        fixed -= timedelta(hours=0, minutes=30)
-                    if fixed > timedelta(hours=0, minutes=0):
+                    now: datetime = sharedUtcNow()
+                    if carCapturedTimestamp > now:
+                        fixed: timedelta = timedelta()
+                        while carCapturedTimestamp > now:
+                            carCapturedTimestamp -= timedelta(minutes=30)
+                            fixed += timedelta(minutes=30)
                         LOG.debug('%s: Attribute carCapturedTimestamp was in the future. Substracted %s to fix this.'
-                                    ' This is a problem of the weconnect_cupra API and might be fixed in the future',
-                                    self.getGlobalAddress(), fixed)
-                    if carCapturedTimestamp == datetime(year=2000, month=1, day=1, hour=0, minute=0, second=0,
-                                                        tzinfo=timezone.utc):
+                                  ' This is a problem of the weconnect_cupra API and might be fixed in the future',
+                                  self.getGlobalAddress(), fixed)
+                    if carCapturedTimestamp == INVALID_TIMESTAMP:
                         carCapturedTimestamp = None
 
                 self.carCapturedTimestamp.setValueWithCarTime(carCapturedTimestamp, lastUpdateFromCar=None, fromServer=True)
@@ -73,23 +123,22 @@ class GenericStatus(AddressableObject):
                 self.carCapturedTimestamp.setValueWithCarTime(None, fromServer=True)
                 self.carCapturedTimestamp.enabled = False
 
-            if isinstance(fromDict['value'], Dict):
-                for key, value in {key: value for key, value in fromDict['value'].items()
-                                   if key not in (['carCapturedTimestamp'] + ignoreAttributes)
-                                   }.items():
-                    LOG.debug('%s: Unknown attribute %s with value %s', self.getGlobalAddress(), key, value)
+            if isinstance(value, dict) and LOG.isEnabledFor(logging.DEBUG):
+                for key, attributeValue in value.items():
+                    if key not in (ignoreAttributes or ()) and key != 'carCapturedTimestamp':
+                        LOG.debug('%s: Unknown attribute %s with value %s', self.getGlobalAddress(), key, attributeValue)
         else:
             self.carCapturedTimestamp.setValueWithCarTime(None, fromServer=True)
             self.carCapturedTimestamp.enabled = False
 
         # Cupra is not a dict
-        if isinstance(fromDict, Dict) and 'error' in fromDict:
+        if isinstance(fromDict, dict) and 'error' in fromDict:
             self.error.update(fromDict['error'])
         else:
             self.error.reset()
 
         # Cupra is not a dict
-        if isinstance(fromDict, Dict) and 'requests' in fromDict:
+        if isinstance(fromDict, dict) and 'requests' in fromDict:
             requestsToRemove = list(self.requests.keys())
             for request in fromDict['requests']:
                 key = None
@@ -111,15 +160,15 @@ class GenericStatus(AddressableObject):
                 self.requests[requestKey].enabled = False
                 del self.requests[requestKey]
 
-        else:
+        elif self.requests.enabled or len(self.requests) > 0:
             self.requests.clear()
             self.requests.enabled = False
 
-        # Cupra is not a dict
-        if isinstance(fromDict, Dict):
-            for key, value in {key: value for key, value in fromDict.items()
-                            if key not in (['value', 'error', 'requests'] + ['carCapturedTimestamp'] + ignoreAttributes)}.items():
-                LOG.debug('%s: Unknown element %s with value %s', self.getGlobalAddress(), key, value)
+        # Cupra has no value element, the attributes were already checked above
+        if isinstance(fromDict, dict) and 'value' in fromDict and LOG.isEnabledFor(logging.DEBUG):
+            for key, elementValue in fromDict.items():
+                if key not in (ignoreAttributes or ()) and key not in ('value', 'error', 'requests', 'carCapturedTimestamp'):
+                    LOG.debug('%s: Unknown element %s with value %s', self.getGlobalAddress(), key, elementValue)
 
     def __str__(self) -> str:
         returnString: str = f'[{self.id}]'
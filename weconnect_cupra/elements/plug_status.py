@@ -1,8 +1,8 @@
 from enum import Enum
 import logging
 
-from weconnect_cupra.addressable import AddressableAttribute
 from weconnect_cupra.elements.generic_status import GenericStatus
+from weconnect_cupra.elements.schema import StatusSchema, Field
 
 LOG = logging.getLogger("weconnect_cupra")
 
@@ -16,36 +16,15 @@ class PlugStatus(GenericStatus):
         fromDict=None,
         fixAPI=True,
     ):
-        self.plugConnectionState = AddressableAttribute(
-            localAddress='plugConnectionState', parent=self, value=None, valueType=PlugStatus.PlugConnectionState)
-        self.plugLockState = AddressableAttribute(
-            localAddress='plugLockState', value=None, parent=self, valueType=PlugStatus.PlugLockState)
-        self.externalPower = AddressableAttribute(
-            localAddress='externalPower', value=None, parent=self, valueType=PlugStatus.ExternalPower)
-        self.ledColor = AddressableAttribute(localAddress='ledColor', value=None, parent=self, valueType=PlugStatus.LedColor)
+        PlugStatus.schema.createAttributes(self)
         super().__init__(vehicle=vehicle, parent=parent, statusId=statusId, fromDict=fromDict, fixAPI=fixAPI)
 
     def update(self, fromDict, ignoreAttributes=None):
-        ignoreAttributes = ignoreAttributes or []
         LOG.debug('Update Plug status from dict')
 
-        # Cupra
-        if 'value' not in fromDict:
-            fromDict['value'] = fromDict
+        PlugStatus.schema.parse(self, GenericStatus.payloadValue(fromDict), fixAPI=self.fixAPI)
 
-        if 'value' in fromDict:
-            self.plugConnectionState.fromDict(fromDict['value'], 'plugConnectionState')
-            self.plugLockState.fromDict(fromDict['value'], 'plugLockState')
-            self.externalPower.fromDict(fromDict['value'], 'externalPower')
-            self.ledColor.fromDict(fromDict['value'], 'ledColor')
-        else:
-            self.plugConnectionState.enabled = False
-            self.plugLockState.enabled = False
-            self.externalPower.enabled = False
-            self.ledColor.enabled = False
-
-        super().update(fromDict=fromDict, ignoreAttributes=(
-            ignoreAttributes + ['plugConnectionState', 'plugLockState', 'externalPower', 'ledColor']))
+        super().update(fromDict=fromDict, ignoreAttributes=PlugStatus.schema.ignoring(ignoreAttributes))
 
     def __str__(self):
         string = super().__str__()
@@ -86,3 +65,10 @@ class PlugStatus(GenericStatus):
         GREEN = 'green'
         RED = 'red'
         UNKNOWN = 'unknown plug led color'
+
+    schema = StatusSchema(
+        Field('plugConnectionState', PlugConnectionState),
+        Field('plugLockState', PlugLockState),
+        Field('externalPower', ExternalPower),
+        Field('ledColor', LedColor),
+    )
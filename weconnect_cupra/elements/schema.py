@@ -0,0 +1,132 @@
+from __future__ import annotations
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple, Type
+
+from enum import Enum
+import logging
+from datetime import datetime, time
+import time as timemodule
+
+from weconnect_cupra.util import robustTimeParse, toBool
+from weconnect_cupra.addressable import AddressableAttribute, AddressableObject
+
+LOG: logging.Logger = logging.getLogger("weconnect_cupra")
+
+
+class Field():
+    """One attribute of a status.
+
+    Args:
+        name (str): Name of the attribute on the status object and its local address.
+        valueType (type): Type of the value, the payload value is converted to it.
+        key (str, optional): Key in the payload if it differs from name.
+        attributeClass (type, optional): Class of the attribute, e.g. ChangeableAttribute for settings.
+        coerce (callable, optional): Conversion from the payload value replacing the default one for valueType.
+        fix (callable, optional): fix(status, value) -> value, applied after conversion. Used to work around known API
+            issues and only applied if fixAPI is set on the status.
+        coerceNone (bool, optional): Pass null values in the payload to coerce instead of disabling the attribute, it is
+            still disabled if the key is missing.
+    """
+
+    def __init__(self, name: str, valueType: Type[Any], key: Optional[str] = None,
+                 attributeClass: Type[AddressableAttribute] = AddressableAttribute, coerce: Optional[Callable[[Any], Any]] = None,
+                 fix: Optional[Callable[[Any, Any], Any]] = None, coerceNone: bool = False) -> None:
+        self.name: str = name
+        self.valueType: Type[Any] = valueType
+        self.key: str = key if key is not None else name
+        self.attributeClass: Type[AddressableAttribute] = attributeClass
+        self.coerce: Optional[Callable[[Any], Any]] = coerce
+        self.fix: Optional[Callable[[Any, Any], Any]] = fix
+        self.coerceNone: bool = coerceNone
+
+
+class StatusSchema():
+    """Declarative description of the attributes of a status. The fields are compiled once into a parse function that
+    converts the values without looking at the value type again for every update"""
+
+    def __init__(self, *fields: Field) -> None:
+        self.fields: Tuple[Field, ...] = fields
+        self.keys: FrozenSet[str] = frozenset(field.key for field in fields)
+        self.__parsers: List[Callable[[AddressableObject, Dict[str, Any], bool], None]] = [
+            StatusSchema.__compileField(field) for field in fields]
+
+    def ignoring(self, ignoreAttributes: Optional[Iterable[str]] = None) -> FrozenSet[str]:
+        """Keys of the schema together with ignoreAttributes, to be passed on to GenericStatus.update"""
+        if not ignoreAttributes:
+            return self.keys
+        return self.keys.union(ignoreAttributes)
+
+    def createAttributes(self, status: AddressableObject) -> None:
+        for field in self.fields:
+            setattr(status, field.name, field.attributeClass(localAddress=field.name, parent=status, value=None,
+                                                             valueType=field.valueType))
+
+    def parse(self, status: AddressableObject, value: Optional[Dict[str, Any]], fixAPI: bool = True) -> None:
+        """Updates all attributes of status from value. Attributes that are missing in value are disabled"""
+        if not isinstance(value, dict):
+            value = {}
+        for parser in self.__parsers:
+            parser(status, value, fixAPI)
+
+    @staticmethod
+    def __compileField(field: Field) -> Callable[[AddressableObject, Dict[str, Any], bool], None]:
+        name: str = field.name
+        key: str = field.key
+        fix: Optional[Callable[[Any, Any], Any]] = field.fix
+        coerceNone: bool = field.coerceNone
+        coerce: Callable[[Any], Any] = field.coerce if field.coerce is not None else StatusSchema.coercer(field.valueType, key)
+
+        def parseField(status: AddressableObject, value: Dict[str, Any], fixAPI: bool) -> None:
+            attribute: AddressableAttribute = getattr(status, name)
+            raw: Any = value.get(key)
+            if raw is None and (not coerceNone or key not in value):
+                attribute.enabled = False
+                return
+            converted: Any = coerce(raw)
+            if converted is _DISABLE:
+                attribute.enabled = False
+                return
+            if fix is not None and fixAPI:
+                converted = fix(status, converted)
+            attribute.setValueWithCarTime(converted, lastUpdateFromCar=None, fromServer=True)
+        return parseField
+
+    @staticmethod
+    def coercer(valueType: Type[Any], key: str) -> Callable[[Any], Any]:
+        """Conversion function from a payload value to valueType, behaves like AddressableAttribute.fromDict"""
+        if issubclass(valueType, bool):
+            return toBool
+        if issubclass(valueType, Enum):
+            return StatusSchema.__enumCoercer(valueType, key)
+        if issubclass(valueType, (int, float, str)):
+            return valueType
+        if issubclass(valueType, datetime):
+            return robustTimeParse
+        if issubclass(valueType, time):
+            def parseTime(raw: Any) -> time:
+                parsedtime = timemodule.strptime(raw, "%H:%M")
+                return time(hour=parsedtime.tm_hour, minute=parsedtime.tm_min)
+            return parseTime
+        raise ValueError(f'Unknown attribute type {valueType}')
+
+    @staticmethod
+    def __enumCoercer(valueType: Type[Enum], key: str) -> Callable[[Any], Any]:
+        lookup: Dict[Any, Enum] = {member.value: member for member in valueType}
+        unknown: Optional[Enum] = getattr(valueType, 'UNKNOWN', None)
+        knownValues: str = ', '.join([str(member.value) for member in valueType])
+
+        def parseEnum(raw: Any) -> Any:
+            if not raw:
+                return _DISABLE
+            try:
+                return lookup[raw]
+            except (KeyError, TypeError):
+                pass
+            if unknown is None:
+                raise ValueError(f'{raw} is not a valid {valueType.__name__}')
+            LOG.debug('An unsupported %s: %s was provided, known values are [%s] please report this as a bug', key, raw, knownValues)
+            return unknown
+        return parseEnum
+
+
+# Returned by conversions if the attribute has to be disabled instead of set
+_DISABLE: object = object()
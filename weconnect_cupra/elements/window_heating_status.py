@@ -23,13 +23,10 @@ class WindowHeatingStatus(GenericStatus):
         ignoreAttributes = ignoreAttributes or []
         LOG.debug('Update window heating status from dict')
 
-        # Cupra
-        if 'value' not in fromDict:
-            fromDict['value'] = fromDict
-
-        if 'value' in fromDict:
-            if 'windowHeatingStatus' in fromDict['value'] and fromDict['value']['windowHeatingStatus'] is not None:
-                for windowDict in fromDict['value']['windowHeatingStatus']:
+        value = GenericStatus.payloadValue(fromDict)
+        if isinstance(value, dict):
+            if 'windowHeatingStatus' in value and value['windowHeatingStatus'] is not None:
+                for windowDict in value['windowHeatingStatus']:
                     if 'windowLocation' in windowDict:
                         if windowDict['windowLocation'] in self.windows:
                             self.windows[windowDict['windowLocation']].update(fromDict=windowDict)
@@ -38,7 +35,7 @@ class WindowHeatingStatus(GenericStatus):
                                 fromDict=windowDict, parent=self.windows)
                 for windowName in [windowName for windowName in self.windows.keys()
                                    if windowName not in [window['windowLocation']
-                                   for window in fromDict['value']['windowHeatingStatus'] if 'windowLocation' in window]]:
+                                   for window in value['windowHeatingStatus'] if 'windowLocation' in window]]:
                     del self.windows[windowName]
             else:
                 self.windows.clear()
@@ -80,9 +77,9 @@ class WindowHeatingStatus(GenericStatus):
 
             self.windowHeatingState.fromDict(fromDict, 'windowHeatingState')
 
-            for key, value in {key: value for key, value in fromDict.items()
-                               if key not in ['windowLocation', 'windowHeatingState']}.items():
-                LOG.warning('%s: Unknown attribute %s with value %s', self.getGlobalAddress(), key, value)
+            for key, value in fromDict.items():
+                if key not in ('windowLocation', 'windowHeatingState'):
+                    LOG.warning('%s: Unknown attribute %s with value %s', self.getGlobalAddress(), key, value)
 
         def __str__(self):
             return f'{self.id}: {self.windowHeatingState.value.value}'  # pylint: disable=no-member
@@ -1,9 +1,10 @@
 from __future__ import annotations
-from typing import Dict, List, Set, Tuple, Callable, Any, Optional
+from typing import Dict, List, Callable, Any, Optional
 import logging
 
 from weconnect_cupra.weconnect_errors import ErrorEventType
 from weconnect_cupra.addressable import AddressableLeaf, AddressableObject, AddressableDict
+from weconnect_cupra.observer_registry import ObserverHandle, ObserverRegistry
 
 
 LOG = logging.getLogger("weconnect_cupra")
@@ -39,27 +40,20 @@ class APIError(Exception):
 class ErrorBus:
 
     def __init__(self):
-        self.__errorObservers: Set[Tuple[Callable[[Optional[Any], ErrorEventType], None], ErrorEventType]] = set()
+        self.__errorObservers: ObserverRegistry = ObserverRegistry()
 
-    def addErrorObserver(self, observer: Callable, errortype: ErrorEventType) -> None:
-        self.__errorObservers.add((observer, errortype))
+    def addErrorObserver(self, observer: Callable, errortype: ErrorEventType, weak: bool = False) -> ObserverHandle:
         # LOG.debug('%s: Error event observer added for type: %s', self.getGlobalAddress(), errortype)
+        return self.__errorObservers.add(observer, errortype, weak=weak)
 
     def removeErrorObserver(self, observer: Callable, errortype: Optional[ErrorEventType] = None) -> None:
-        self.__errorObservers = filter(lambda observerEntry: observerEntry[0] == observer
-                                       or (errortype is not None and observerEntry[1] == errortype), self.__errorObservers)
+        self.__errorObservers.remove(observer, errortype)
 
     def getErrorObservers(self, errortype) -> List[Any]:
         return [observerEntry[0] for observerEntry in self.getErrorObserverEntries(errortype)]
 
     def getErrorObserverEntries(self, errortype: ErrorEventType) -> List[Any]:
-        observers: Set[Tuple[Callable, ErrorEventType]] = set()
-        for observerEntry in self.__errorObservers:
-            observer, observertype = observerEntry
-            del observer
-            if errortype & observertype:
-                observers.add(observerEntry)
-        return observers
+        return [observerEntry for observerEntry in self.__errorObservers.entries() if errortype & observerEntry[1]]
 
     def notifyError(self, element, errortype: ErrorEventType, detail: str, message: str = None) -> None:
         observers: List[Callable] = self.getErrorObservers(errortype)
@@ -0,0 +1,194 @@
+from __future__ import annotations
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, List, Optional, Tuple, Union
+
+import asyncio
+from collections import OrderedDict, deque
+from enum import Enum
+import logging
+import threading
+import time
+
+from weconnect_cupra.addressable import AddressableLeaf, AddressableObject, AddressPattern, Change
+from weconnect_cupra.observer_registry import ObserverHandle
+
+LOG: logging.Logger = logging.getLogger("weconnect_cupra")
+
+
+class EventStream():
+    """Changes of the elements below an object whose relative address matches a pattern, consumed by iterating the
+    stream either synchronously (for event in stream) or asynchronously (async for event in stream).
+
+    Events are Change objects, oldValue is not known to streams and always None. At most maxSize events are buffered,
+    the overflow policy decides what happens if the consumer falls behind. With BLOCK the update waits for the consumer,
+    so the stream must not be consumed from the thread that updates the tree.
+    """
+
+    # Number of addresses whose match result is remembered, the least recently seen ones are forgotten first
+    MATCH_CACHE_SIZE: int = 4096
+
+    def __init__(self, source: AddressableObject, pattern: Union[str, AddressPattern] = '**',
+                 flags: AddressableLeaf.ObserverEvent = AddressableLeaf.ObserverEvent.ALL, maxSize: int = 1000,
+                 overflow: Optional[EventStream.Overflow] = None, blockTimeout: Optional[float] = None,
+                 onUpdateComplete: bool = False) -> None:
+        if maxSize < 1:
+            raise ValueError('EventStream needs room for at least one event')
+        self.pattern: AddressPattern = pattern if isinstance(pattern, AddressPattern) else AddressPattern.compile(pattern)
+        self.maxSize: int = maxSize
+        self.overflow: EventStream.Overflow = overflow if overflow is not None else EventStream.Overflow.DROP_OLDEST
+        self.blockTimeout: Optional[float] = blockTimeout
+
+        self.__prefixLength: int = len(source.getAddressSegments())
+        # Global address -> True if it matches the pattern, in order of last use
+        self.__matches: OrderedDict[str, bool] = OrderedDict()
+        self.__events: Deque[Change] = deque()
+        # Only used with COALESCE, pending event per address
+        self.__pending: Dict[str, Change] = {}
+        self.__condition: threading.Condition = threading.Condition()
+        self.__waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self.__closed: bool = False
+        self.__dropped: int = 0
+        self.__coalesced: int = 0
+
+        # The stream is only weakly referenced by the tree, it unsubscribes when the consumer drops it
+        self.__handle: ObserverHandle = source.addObserver(self.__observe, flags, priority=AddressableLeaf.ObserverPriority.USER_LOW,
+                                                           onUpdateComplete=onUpdateComplete, weak=True)
+
+    def __observe(self, element: AddressableLeaf, flags: AddressableLeaf.ObserverEvent) -> None:
+        address: str = element.getGlobalAddress()
+        matches: Optional[bool] = self.__matches.get(address)
+        if matches is None:
+            matches = self.__match(element)
+            self.__matches[address] = matches
+            if len(self.__matches) > EventStream.MATCH_CACHE_SIZE:
+                self.__matches.popitem(last=False)
+        else:
+            self.__matches.move_to_end(address)
+        if matches:
+            self.put(element, flags)
+
+    def __match(self, element: AddressableLeaf) -> bool:
+        states = self.pattern.initialStates
+        for localAddress in element.getAddressSegments()[self.__prefixLength:]:
+            states = self.pattern.advance(states, localAddress)
+            if not states:
+                return False
+        return self.pattern.isFinal(states)
+
+    def put(self, element: AddressableLeaf, flags: AddressableLeaf.ObserverEvent) -> bool:
+        """Adds an event for element, returns False if it was dropped"""
+        with self.__condition:
+            if self.__closed:
+                return False
+            if self.overflow == EventStream.Overflow.COALESCE:
+                pending: Optional[Change] = self.__pending.get(element.getGlobalAddress())
+                if pending is not None and pending.element is element:
+                    pending.merge(flags)
+                    self.__coalesced += 1
+                    return True
+            if len(self.__events) >= self.maxSize:
+                if self.overflow == EventStream.Overflow.BLOCK:
+                    deadline: Optional[float] = time.monotonic() + self.blockTimeout if self.blockTimeout is not None else None
+                    while len(self.__events) >= self.maxSize and not self.__closed:
+                        remaining: Optional[float] = deadline - time.monotonic() if deadline is not None else None
+                        if remaining is not None and remaining <= 0:
+                            LOG.warning('Event stream stayed full for %s seconds, dropping event', self.blockTimeout)
+                            self.__dropped += 1
+                            return False
+                        self.__condition.wait(remaining)
+                    if self.__closed:
+                        return False
+                else:
+                    self.__popEvent()
+                    self.__dropped += 1
+            event: Change = Change(element, flags, None)
+            self.__events.append(event)
+            if self.overflow == EventStream.Overflow.COALESCE:
+                self.__pending[event.address] = event
+            self.__wakeup()
+        return True
+
+    def __popEvent(self) -> Change:
+        event: Change = self.__events.popleft()
+        if self.__pending and self.__pending.get(event.address) is event:
+            del self.__pending[event.address]
+        return event
+
+    def __wakeup(self) -> None:
+        self.__condition.notify_all()
+        waiters, self.__waiters = self.__waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(EventStream.__resolve, future)
+
+    @staticmethod
+    def __resolve(future: asyncio.Future) -> None:
+        if not future.done():
+            future.set_result(None)
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Change]:
+        """Returns the next event, waits up to timeout seconds (forever if None). Returns None on timeout or if the
+        stream was closed and all events were consumed"""
+        with self.__condition:
+            if not self.__events and not self.__closed:
+                self.__condition.wait_for(lambda: self.__events or self.__closed, timeout)
+            if not self.__events:
+                return None
+            event: Change = self.__popEvent()
+            self.__condition.notify_all()
+            return event
+
+    def close(self) -> None:
+        """Unsubscribes from the tree. Buffered events can still be consumed, then iteration ends"""
+        self.__handle.remove()
+        with self.__condition:
+            self.__closed = True
+            self.__wakeup()
+
+    @property
+    def closed(self) -> bool:
+        return self.__closed
+
+    def stats(self) -> Dict[str, Any]:
+        with self.__condition:
+            return {'buffered': len(self.__events), 'dropped': self.__dropped, 'coalesced': self.__coalesced}
+
+    def __len__(self) -> int:
+        return len(self.__events)
+
+    def __iter__(self) -> Iterator[Change]:
+        return self
+
+    def __next__(self) -> Change:
+        event: Optional[Change] = self.get()
+        if event is None:
+            raise StopIteration
+        return event
+
+    def __aiter__(self) -> AsyncIterator[Change]:
+        return self
+
+    async def __anext__(self) -> Change:
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        while True:
+            with self.__condition:
+                if self.__events:
+                    event: Change = self.__popEvent()
+                    self.__condition.notify_all()
+                    return event
+                if self.__closed:
+                    raise StopAsyncIteration
+                future: asyncio.Future = loop.create_future()
+                self.__waiters.append((loop, future))
+            await future
+
+    def __enter__(self) -> EventStream:
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    class Overflow(Enum):
+        # COALESCE merges events for an address that is still buffered and drops the oldest event if a new address
+        # does not fit anymore
+        BLOCK = 'block'
+        DROP_OLDEST = 'drop oldest'
+        COALESCE = 'coalesce'
@@ -103,7 +103,7 @@ class Fetcher:
         
         self.__cache[url] = (data, str(datetime.utcnow()))
 
-        LOG.debug(f'Retrieved data from url: {url}')
+        LOG.debug('Retrieved data from url: %s', url)
         LOG.debug(json.dumps(data))
 
         return data
@@ -0,0 +1,135 @@
+from __future__ import annotations
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from enum import Enum
+import heapq
+
+from weconnect_cupra.addressable import AddressPattern
+from weconnect_cupra.fleet.observer import FleetObserver
+
+
+class Aggregate():
+    """Aggregate over one value per vehicle, kept up to date with every change.
+
+    COUNT counts the vehicles whose value satisfies the predicate (or that have a value at all), SUM, AVERAGE, MIN and
+    MAX combine the numeric values of the vehicles that satisfy the predicate. Count, sum and average are updated in
+    constant time. MIN and MAX keep a heap with lazily deleted entries, updates take logarithmic time and reads
+    are constant time unless outdated entries have to be dropped first.
+    """
+    __slots__ = ('name', 'kind', 'predicate', '__values', '__sum', '__heap', '__versions')
+
+    def __init__(self, name: str, kind: Aggregate.Kind, predicate: Optional[Callable[[Any], bool]] = None) -> None:
+        self.name: str = name
+        self.kind: Aggregate.Kind = kind
+        self.predicate: Optional[Callable[[Any], bool]] = predicate
+        # Vin -> contributed value
+        self.__values: Dict[str, float] = {}
+        self.__sum: float = 0.0
+        # (key, version, vin), the key is negated for MAX
+        self.__heap: List[Tuple[float, int, str]] = []
+        self.__versions: Dict[str, int] = {}
+
+    def update(self, vin: str, value: Any) -> None:
+        self.remove(vin)
+        if self.predicate is not None and not self.predicate(value):
+            return
+        contribution: float = 1.0 if self.kind == Aggregate.Kind.COUNT else float(value)
+        self.__values[vin] = contribution
+        self.__sum += contribution
+        if self.kind in (Aggregate.Kind.MIN, Aggregate.Kind.MAX):
+            version: int = self.__versions.get(vin, 0) + 1
+            self.__versions[vin] = version
+            heapq.heappush(self.__heap, (contribution if self.kind == Aggregate.Kind.MIN else -contribution, version, vin))
+            if len(self.__heap) > 2 * len(self.__values) + 16:
+                # Outdated entries are only dropped when they reach the top, rebuild the heap before it grows unbounded
+                sign: float = 1.0 if self.kind == Aggregate.Kind.MIN else -1.0
+                self.__heap = [(sign * value, self.__versions[key], key) for key, value in self.__values.items()]
+                heapq.heapify(self.__heap)
+
+    def remove(self, vin: str) -> None:
+        contribution: Optional[float] = self.__values.pop(vin, None)
+        if contribution is None:
+            return
+        if self.__values:
+            self.__sum -= contribution
+        else:
+            # Start over without the rounding errors of all previous additions and subtractions
+            self.__sum = 0.0
+        if self.kind in (Aggregate.Kind.MIN, Aggregate.Kind.MAX):
+            self.__versions[vin] = self.__versions.get(vin, 0) + 1
+            if not self.__values:
+                self.__heap.clear()
+
+    @property
+    def count(self) -> int:
+        return len(self.__values)
+
+    @property
+    def value(self) -> Optional[Union[int, float]]:
+        if self.kind == Aggregate.Kind.COUNT:
+            return len(self.__values)
+        if self.kind == Aggregate.Kind.SUM:
+            return self.__sum
+        if self.kind == Aggregate.Kind.AVERAGE:
+            return self.__sum / len(self.__values) if self.__values else None
+        heap: List[Tuple[float, int, str]] = self.__heap
+        while heap and self.__versions.get(heap[0][2]) != heap[0][1]:
+            heapq.heappop(heap)
+        if not heap:
+            return None
+        return heap[0][0] if self.kind == Aggregate.Kind.MIN else -heap[0][0]
+
+    def argument(self) -> Optional[str]:
+        """Vin of the vehicle with the minimum or maximum value"""
+        if self.kind not in (Aggregate.Kind.MIN, Aggregate.Kind.MAX) or self.value is None:
+            return None
+        return self.__heap[0][2]
+
+    def __str__(self) -> str:
+        return f'{self.name}: {self.value}'
+
+    class Kind(Enum):
+        COUNT = 'count'
+        SUM = 'sum'
+        AVERAGE = 'average'
+        MIN = 'min'
+        MAX = 'max'
+
+
+class FleetAggregates(FleetObserver):
+    """Materialized aggregates over the vehicles of a fleet. Declare them with add before attaching, e.g.
+
+        aggregates.add('charging', 'domains/charging/chargingStatus/chargingState', Aggregate.Kind.COUNT,
+                       predicate=lambda state: state == ChargingStatus.ChargingState.CHARGING)
+        aggregates.add('power', 'domains/charging/chargingStatus/chargePower_kW', Aggregate.Kind.SUM)
+
+    Every aggregate takes one value per vehicle, the pattern should match one attribute per vehicle. Reading a value does
+    not walk the tree.
+    """
+
+    def __init__(self) -> None:
+        super().__init__({})
+        self.aggregates: Dict[str, Aggregate] = {}
+
+    def add(self, name: str, pattern: Union[str, AddressPattern], kind: Aggregate.Kind,
+            predicate: Optional[Callable[[Any], bool]] = None) -> Aggregate:
+        aggregate: Aggregate = Aggregate(name, kind, predicate)
+        self.aggregates[name] = aggregate
+        self.addField(name, pattern)
+        return aggregate
+
+    def onValue(self, vin: str, field: str, timestamp: float, value: Any) -> None:
+        aggregate: Optional[Aggregate] = self.aggregates.get(field)
+        if aggregate is not None:
+            aggregate.update(vin, value)
+
+    def onRemoved(self, vin: str, field: str) -> None:
+        aggregate: Optional[Aggregate] = self.aggregates.get(field)
+        if aggregate is not None:
+            aggregate.remove(vin)
+
+    def __getitem__(self, name: str) -> Optional[Union[int, float]]:
+        return self.aggregates[name].value
+
+    def asDict(self) -> Dict[str, Optional[Union[int, float]]]:
+        return {name: aggregate.value for name, aggregate in self.aggregates.items()}
@@ -0,0 +1,219 @@
+from __future__ import annotations
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional, Tuple, Union
+
+from array import array
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+import math
+
+from weconnect_cupra.addressable import AddressableAttribute, AddressableObject, AddressPattern
+
+SUPPORT_NUMPY = False
+try:
+    import numpy  # type: ignore
+    SUPPORT_NUMPY = True
+except ImportError:
+    pass
+
+SUPPORT_ARROW = False
+try:
+    import pyarrow  # type: ignore
+    import pyarrow.parquet  # type: ignore
+    SUPPORT_ARROW = True
+except ImportError:
+    pass
+
+
+class Column():
+    """Values of one attribute address for all vehicles.
+
+    Numbers are stored as float64 with NaN for missing values, booleans as int8 and enums as int16 codes into
+    categories, both with -1 for missing values, and datetimes as int64 microseconds since the epoch with the smallest
+    int64 for missing values (like numpy NaT). Strings are kept in a list with None for missing values.
+    """
+    FLOAT: str = 'float'
+    BOOL: str = 'bool'
+    CATEGORY: str = 'category'
+    DATETIME: str = 'datetime'
+    STRING: str = 'string'
+
+    MISSING_DATETIME: int = -2**63
+
+    __slots__ = ('address', 'kind', 'data', 'categories', '__codes')
+
+    def __init__(self, address: str, kind: str, rows: int, enumType: Optional[type] = None) -> None:
+        self.address: str = address
+        self.kind: str = kind
+        self.categories: Optional[Tuple[Any, ...]] = None
+        self.__codes: Optional[Dict[Any, int]] = None
+        self.data: Union[array, List[Optional[str]]]
+        if kind == Column.FLOAT:
+            self.data = array('d', [math.nan]) * rows
+        elif kind == Column.BOOL:
+            self.data = array('b', [-1]) * rows
+        elif kind == Column.CATEGORY:
+            members: List[Enum] = list(enumType)  # type: ignore
+            self.categories = tuple(member.value for member in members)
+            # Members are singletons, looking them up by identity avoids the hash of Enum implemented in Python
+            self.__codes = {id(member): code for code, member in enumerate(members)}
+            self.data = array('h', [-1]) * rows
+        elif kind == Column.DATETIME:
+            self.data = array('q', [Column.MISSING_DATETIME]) * rows
+        else:
+            self.data = [None] * rows
+
+    @staticmethod
+    def kindOf(valueType: Any) -> Tuple[Optional[str], Optional[type]]:
+        """Column kind and enum type for an attribute value type, None if the type is not exported"""
+        valueTypes: Tuple[Any, ...] = valueType if isinstance(valueType, tuple) else (valueType,)
+        if not all(isinstance(candidate, type) for candidate in valueTypes):
+            return None, None
+        for candidate in valueTypes:
+            if issubclass(candidate, Enum):
+                return Column.CATEGORY, candidate
+        if all(issubclass(candidate, bool) for candidate in valueTypes):
+            return Column.BOOL, None
+        if all(issubclass(candidate, (int, float)) for candidate in valueTypes):
+            return Column.FLOAT, None
+        if all(issubclass(candidate, datetime) for candidate in valueTypes):
+            return Column.DATETIME, None
+        if all(issubclass(candidate, str) for candidate in valueTypes):
+            return Column.STRING, None
+        return None, None
+
+    def set(self, row: int, value: Any) -> None:
+        kind: str = self.kind
+        if kind == Column.FLOAT:
+            if isinstance(value, (int, float)):
+                self.data[row] = value
+        elif kind == Column.CATEGORY:
+            self.data[row] = self.__codes.get(id(value), -1)  # type: ignore
+        elif kind == Column.BOOL:
+            self.data[row] = 1 if value else 0
+        elif kind == Column.DATETIME:
+            if value.tzinfo is None:
+                value = value.replace(tzinfo=timezone.utc)
+            self.data[row] = (value - _EPOCH) // _MICROSECOND
+        else:
+            self.data[row] = value
+
+    def toNumpy(self) -> Any:
+        """View of the column without copying, strings are returned as object array"""
+        if self.kind == Column.STRING:
+            return numpy.array(self.data, dtype=object)
+        return numpy.frombuffer(self.data, dtype=_NUMPY_TYPES[self.kind])
+
+    def toArrow(self) -> Any:
+        if self.kind == Column.STRING:
+            return pyarrow.array(self.data, type=pyarrow.string())
+        values: Any = self.toNumpy()
+        if self.kind == Column.FLOAT:
+            return pyarrow.array(values, from_pandas=True)
+        if self.kind == Column.BOOL:
+            return pyarrow.array(values == 1, mask=values == -1)
+        if self.kind == Column.DATETIME:
+            return pyarrow.array(values, type=pyarrow.timestamp('us', tz='UTC'), mask=values == Column.MISSING_DATETIME)
+        return pyarrow.DictionaryArray.from_arrays(pyarrow.array(values, mask=values == -1),
+                                                   pyarrow.array([str(category) for category in self.categories]))  # type: ignore
+
+
+class FleetColumns():
+    """Columnar snapshot of a fleet with one row per vehicle and one Column per attribute address relative to the
+    vehicle"""
+
+    def __init__(self, vins: List[str], columns: Dict[str, Column]) -> None:
+        self.vins: List[str] = vins
+        self.columns: Dict[str, Column] = columns
+
+    @staticmethod
+    def fromVehicles(vehicles: Mapping[str, AddressableObject], pattern: Union[str, AddressPattern] = '**') -> FleetColumns:
+        """Collects all enabled attributes of the vehicles whose address relative to the vehicle matches the pattern"""
+        if not isinstance(pattern, AddressPattern):
+            pattern = AddressPattern.compile(pattern)
+        vins: List[str] = list(vehicles.keys())
+        columns: Dict[str, Column] = {}
+        # Addresses are resolved once for all vehicles, walking the trie does not build address strings per vehicle
+        root: _Node = _Node('', pattern.initialStates)
+        for row, vehicle in enumerate(vehicles.values()):
+            if vehicle.enabled:
+                FleetColumns.__collect(vehicle, root, row, len(vins), pattern, columns)
+        return FleetColumns(vins, columns)
+
+    @staticmethod
+    def __collect(element: AddressableObject, node: _Node, row: int, rows: int, pattern: AddressPattern, columns: Dict[str, Column]) -> None:
+        for child in element.children:
+            if not child.enabled:
+                continue
+            localAddress: str = child.getLocalAddress()
+            childNode: Optional[_Node] = node.children.get(localAddress)
+            if childNode is None:
+                childNode = _Node(f'{node.address}/{localAddress}' if node.address else localAddress,
+                                  pattern.advance(node.states, localAddress))
+                node.children[localAddress] = childNode
+            if not childNode.states:
+                continue
+            if isinstance(child, AddressableAttribute):
+                if childNode.column is None:
+                    childNode.column = FleetColumns.__createColumn(child, childNode.address, rows, columns) \
+                        if pattern.isFinal(childNode.states) else _UNSUPPORTED
+                if childNode.column is not _UNSUPPORTED:
+                    value: Any = child.value
+                    if value is not None:
+                        childNode.column.set(row, value)  # type: ignore
+            elif isinstance(child, AddressableObject):
+                FleetColumns.__collect(child, childNode, row, rows, pattern, columns)
+
+    @staticmethod
+    def __createColumn(attribute: AddressableAttribute, address: str, rows: int, columns: Dict[str, Column]) -> Any:
+        kind, enumType = Column.kindOf(attribute.valueType)
+        if kind is None:
+            return _UNSUPPORTED
+        column: Column = Column(address, kind, rows, enumType)
+        columns[address] = column
+        return column
+
+    def __len__(self) -> int:
+        return len(self.vins)
+
+    def toNumpy(self) -> Dict[str, Any]:
+        """Column address -> numpy array, the vins are in 'vin'. Numeric columns share memory with this object"""
+        if not SUPPORT_NUMPY:
+            raise ImportError('numpy is needed for the numpy export, install weconnect-cupra-daern[Numpy]')
+        arrays: Dict[str, Any] = {'vin': numpy.array(self.vins, dtype=object)}
+        for address, column in self.columns.items():
+            arrays[address] = column.toNumpy()
+        return arrays
+
+    def toArrow(self) -> Any:
+        """pyarrow.Table with the vin as first column, enums become dictionary columns and datetimes UTC timestamps"""
+        if not SUPPORT_ARROW or not SUPPORT_NUMPY:
+            raise ImportError('pyarrow is needed for the arrow export, install weconnect-cupra-daern[Fleet]')
+        names: List[str] = ['vin']
+        arrays: List[Any] = [pyarrow.array(self.vins, type=pyarrow.string())]
+        for address, column in self.columns.items():
+            names.append(address)
+            arrays.append(column.toArrow())
+        return pyarrow.Table.from_arrays(arrays, names=names)
+
+    def toParquet(self, filename: str, **kwargs: Any) -> None:
+        """Writes the arrow table to a parquet file, kwargs are passed on to pyarrow.parquet.write_table"""
+        pyarrow.parquet.write_table(self.toArrow(), filename, **kwargs)
+
+
+class _Node():
+    __slots__ = ('address', 'states', 'children', 'column')
+
+    def __init__(self, address: str, states: FrozenSet[int]) -> None:
+        self.address: str = address
+        self.states: FrozenSet[int] = states
+        self.children: Dict[str, _Node] = {}
+        self.column: Optional[Any] = None
+
+
+# Marks trie nodes of attributes that are not exported
+_UNSUPPORTED: object = object()
+
+_EPOCH: datetime = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND: timedelta = timedelta(microseconds=1)
+
+_NUMPY_TYPES: Dict[str, str] = {Column.FLOAT: 'float64', Column.BOOL: 'int8', Column.CATEGORY: 'int16', Column.DATETIME: 'int64'}
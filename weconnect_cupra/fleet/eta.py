@@ -0,0 +1,202 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Tuple
+
+from datetime import datetime, timezone
+import math
+
+from weconnect_cupra.api.cupra.elements.charging_status import ChargingStatus
+from weconnect_cupra.fleet.observer import FleetObserver
+
+SUPPORT_NUMPY = False
+try:
+    import numpy  # type: ignore
+    SUPPORT_NUMPY = True
+except ImportError:
+    pass
+
+# Name, fill value and dtype of the arrays with one row per vehicle, the rows of the per sample arrays hold the window
+_COLUMNS: Tuple[Tuple[str, Any, str], ...] = (
+    ('_count', 0, 'int32'), ('_next', 0, 'int32'), ('_origin', math.nan, 'float64'), ('_sumT', 0.0, 'float64'),
+    ('_sumS', 0.0, 'float64'), ('_sumTT', 0.0, 'float64'), ('_sumTS', 0.0, 'float64'), ('_lastTime', math.nan, 'float64'),
+    ('_lastSoc', math.nan, 'float64'), ('_target', 100.0, 'float64'), ('_reportedEta', math.nan, 'float64'),
+    ('_charging', False, 'bool'), ('_known', 0, 'int8'))
+_SAMPLE_COLUMNS: Tuple[str, ...] = ('_times', '_socs')
+# Bits of the fields in _known, a vehicle is dropped when none of its fields is known anymore
+_FIELD_BITS: Dict[str, int] = {'state': 1, 'soc': 2, 'target': 4, 'remaining': 8}
+
+
+class ChargeEtaEstimator(FleetObserver):
+    """Projects when charging vehicles reach their target SoC.
+
+    For every vehicle the last window SoC samples of the running charging session are fitted with a straight line. The
+    sums of the least squares fit are updated with every sample, so estimate computes the projections of all vehicles
+    at once from a handful of arrays. Times are hours since the start of the session, so the sums do not lose precision
+    over the uptime. Vehicles without a usable fit fall back to remainingChargingTimeToComplete_min reported by the car.
+    The target is the targetSOC_pct of the charging settings, 100 if unknown.
+    """
+    FIELDS: Dict[str, str] = {'state': 'domains/charging/chargingStatus/chargingState',
+                              'soc': 'domains/charging/batteryStatus/currentSOC_pct',
+                              'target': 'domains/charging/chargingSettings/targetSOC_pct',
+                              'remaining': 'domains/charging/chargingStatus/remainingChargingTimeToComplete_min'}
+
+    def __init__(self, window: int = 8, capacity: int = 64) -> None:
+        if not SUPPORT_NUMPY:
+            raise ImportError('numpy is needed for the charge estimation, install weconnect-cupra-daern[Fleet]')
+        if window < 2:
+            raise ValueError('At least two samples are needed for a fit')
+        super().__init__(ChargeEtaEstimator.FIELDS)
+        self.window: int = window
+        self.vins: List[str] = []
+        self.__rows: Dict[str, int] = {}
+        self.__capacity: int = 0
+        self.__chargingValues: frozenset = frozenset((ChargingStatus.ChargingState.CHARGING, ChargingStatus.ChargingState.CHARGING.value))
+        self.__allocate(max(capacity, 1))
+
+    def __allocate(self, capacity: int) -> None:
+        def grow(name: str, fill: Any, dtype: str, shape: Tuple[int, ...]) -> None:
+            array = numpy.full(shape, fill, dtype=dtype)
+            if self.__capacity > 0:
+                array[:self.__capacity] = getattr(self, name)
+            setattr(self, name, array)
+        for name in _SAMPLE_COLUMNS:
+            grow(name, math.nan, 'float64', (capacity, self.window))
+        for name, fill, dtype in _COLUMNS:
+            grow(name, fill, dtype, (capacity,))
+        self.__capacity = capacity
+
+    def __row(self, vin: str) -> int:
+        row: Optional[int] = self.__rows.get(vin)
+        if row is None:
+            row = len(self.vins)
+            if row >= self.__capacity:
+                self.__allocate(self.__capacity * 2)
+            self.__rows[vin] = row
+            self.vins.append(vin)
+        return row
+
+    def __reset(self, row: int) -> None:
+        self._times[row] = math.nan
+        self._socs[row] = math.nan
+        self._count[row] = 0
+        self._next[row] = 0
+        self._origin[row] = math.nan
+        self._sumT[row] = self._sumS[row] = self._sumTT[row] = self._sumTS[row] = 0.0
+
+    def __remove(self, vin: str) -> None:
+        row: Optional[int] = self.__rows.pop(vin, None)
+        if row is None:
+            return
+        # Move the last row into the removed one to keep the rows dense
+        last: int = len(self.vins) - 1
+        if row != last:
+            lastVin: str = self.vins[last]
+            self.vins[row] = lastVin
+            self.__rows[lastVin] = row
+            for name in _SAMPLE_COLUMNS + tuple(column[0] for column in _COLUMNS):
+                array = getattr(self, name)
+                array[row] = array[last]
+        self.vins.pop()
+        for name in _SAMPLE_COLUMNS:
+            getattr(self, name)[last] = math.nan
+        for name, fill, _ in _COLUMNS:
+            getattr(self, name)[last] = fill
+
+    def onValue(self, vin: str, field: str, timestamp: float, value: Any) -> None:
+        row: int = self.__row(vin)
+        self._known[row] |= _FIELD_BITS.get(field, 0)
+        if field == 'soc':
+            self.__addSample(row, timestamp, float(value))
+        elif field == 'state':
+            charging: bool = value in self.__chargingValues
+            if charging != self._charging[row]:
+                # A new session starts a new fit
+                self.__reset(row)
+                self._charging[row] = charging
+                if charging and not math.isnan(self._lastSoc[row]):
+                    self.__addSample(row, timestamp, float(self._lastSoc[row]))
+        elif field == 'target':
+            self._target[row] = float(value)
+        elif field == 'remaining':
+            self._reportedEta[row] = timestamp + float(value) * 60
+
+    def onRemoved(self, vin: str, field: str) -> None:
+        row: Optional[int] = self.__rows.get(vin)
+        if row is None:
+            return
+        if field == 'soc':
+            self._lastTime[row] = math.nan
+            self._lastSoc[row] = math.nan
+        elif field == 'state':
+            self.__reset(row)
+            self._charging[row] = False
+        elif field == 'target':
+            self._target[row] = 100.0
+        elif field == 'remaining':
+            self._reportedEta[row] = math.nan
+        self._known[row] &= ~_FIELD_BITS.get(field, 0)
+        if not self._known[row]:
+            self.__remove(vin)
+
+    def __addSample(self, row: int, timestamp: float, soc: float) -> None:
+        self._lastTime[row] = timestamp
+        self._lastSoc[row] = soc
+        if not self._charging[row]:
+            return
+        position: int = int(self._next[row])
+        count: int = int(self._count[row])
+        if count == 0:
+            # Every session has its own origin, the times and sums stay small however long the estimator runs
+            self._origin[row] = timestamp
+        hours: float = (timestamp - self._origin[row]) / 3600
+        if count == self.window:
+            # The window is full, the oldest sample leaves the sums
+            oldHours: float = float(self._times[row, position])
+            oldSoc: float = float(self._socs[row, position])
+            self._sumT[row] -= oldHours
+            self._sumS[row] -= oldSoc
+            self._sumTT[row] -= oldHours * oldHours
+            self._sumTS[row] -= oldHours * oldSoc
+        else:
+            self._count[row] = count + 1
+        self._times[row, position] = hours
+        self._socs[row, position] = soc
+        self._sumT[row] += hours
+        self._sumS[row] += soc
+        self._sumTT[row] += hours * hours
+        self._sumTS[row] += hours * soc
+        self._next[row] = (position + 1) % self.window
+
+    def rates(self) -> Any:
+        """Charge rate in percent per hour for all vehicles in the order of vins, NaN without a usable fit"""
+        size: int = len(self.vins)
+        count = self._count[:size].astype(numpy.float64)
+        sumT = self._sumT[:size]
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            denominator = count * self._sumTT[:size] - sumT * sumT
+            slope = (count * self._sumTS[:size] - sumT * self._sumS[:size]) / denominator
+        # Nearly identical timestamps make the fit meaningless
+        usable = self._charging[:size] & (count >= 2) & (denominator > 1e-9)
+        return numpy.where(usable, slope, math.nan)
+
+    def estimate(self) -> Any:
+        """Projected completion times in seconds since the epoch for all vehicles in the order of vins, NaN for vehicles
+        that are not charging or cannot be estimated"""
+        size: int = len(self.vins)
+        slope = self.rates()
+        lastTime = self._lastTime[:size]
+        missing = self._target[:size] - self._lastSoc[:size]
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            projected = lastTime + missing / slope * 3600
+        charging = self._charging[:size]
+        eta = numpy.where(charging & (slope > 0), projected, self._reportedEta[:size])
+        eta = numpy.where(charging & (missing <= 0), lastTime, eta)
+        return numpy.where(charging, eta, math.nan)
+
+    def eta(self, vin: str) -> Optional[datetime]:
+        row: Optional[int] = self.__rows.get(vin)
+        if row is None:
+            return None
+        value: float = float(self.estimate()[row])
+        if math.isnan(value):
+            return None
+        return datetime.fromtimestamp(value, tz=timezone.utc)
@@ -0,0 +1,228 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import math
+
+from weconnect_cupra.fleet.observer import FleetObserver
+
+SUPPORT_NUMPY = False
+try:
+    import numpy  # type: ignore
+    SUPPORT_NUMPY = True
+except ImportError:
+    pass
+
+EARTH_RADIUS_KM: float = 6371.0088
+
+
+class GeoIndex(FleetObserver):
+    """Spatial index over the parking positions of the vehicles.
+
+    Positions are kept in numpy arrays with one row per vehicle and bucketed into a grid of cellSize degrees, which is
+    updated when a vehicle moves to another cell. Queries only compute distances for the vehicles in the grid cells
+    around the query, vectorized over all of them.
+    """
+    FIELDS: Dict[str, str] = {'latitude': 'domains/parking/parkingPosition/latitude',
+                              'longitude': 'domains/parking/parkingPosition/longitude'}
+
+    def __init__(self, cellSize: float = 0.1, capacity: int = 1024) -> None:
+        if not SUPPORT_NUMPY:
+            raise ImportError('numpy is needed for the spatial index, install weconnect-cupra-daern[Fleet]')
+        if cellSize <= 0 or cellSize > 180:
+            raise ValueError('cellSize has to be between 0 and 180 degrees')
+        super().__init__(GeoIndex.FIELDS)
+        self.cellSize: float = cellSize
+        self.__latitudeCells: int = math.ceil(180 / cellSize)
+        self.__longitudeCells: int = math.ceil(360 / cellSize)
+        # Row -> vin, rows are kept dense by moving the last row into removed ones
+        self.vins: List[str] = []
+        self.__rows: Dict[str, int] = {}
+        # Latest latitude and longitude of each vehicle, a vehicle is indexed when both are known
+        self.__coordinates: Dict[str, List[Optional[float]]] = {}
+        self.__cellOf: Dict[str, Tuple[int, int]] = {}
+        self.__cells: Dict[Tuple[int, int], Set[str]] = {}
+        self._latitudes: Any = numpy.empty(max(capacity, 1), dtype=numpy.float64)
+        self._longitudes: Any = numpy.empty(max(capacity, 1), dtype=numpy.float64)
+
+    def onValue(self, vin: str, field: str, timestamp: float, value: Any) -> None:
+        coordinates: Optional[List[Optional[float]]] = self.__coordinates.get(vin)
+        if coordinates is None:
+            coordinates = [None, None]
+            self.__coordinates[vin] = coordinates
+        coordinates[0 if field == 'latitude' else 1] = float(value)
+        if coordinates[0] is not None and coordinates[1] is not None:
+            self.__place(vin, coordinates[0], coordinates[1])
+
+    def onRemoved(self, vin: str, field: str) -> None:
+        coordinates: Optional[List[Optional[float]]] = self.__coordinates.get(vin)
+        if coordinates is not None:
+            coordinates[0 if field == 'latitude' else 1] = None
+            if coordinates[0] is None and coordinates[1] is None:
+                del self.__coordinates[vin]
+        self.__remove(vin)
+
+    def __cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return (min(int((latitude + 90) // self.cellSize), self.__latitudeCells - 1),
+                int((longitude + 180) // self.cellSize) % self.__longitudeCells)
+
+    def __place(self, vin: str, latitude: float, longitude: float) -> None:
+        row: Optional[int] = self.__rows.get(vin)
+        if row is None:
+            row = len(self.vins)
+            if row >= len(self._latitudes):
+                self._latitudes = numpy.concatenate((self._latitudes, numpy.empty_like(self._latitudes)))
+                self._longitudes = numpy.concatenate((self._longitudes, numpy.empty_like(self._longitudes)))
+            self.__rows[vin] = row
+            self.vins.append(vin)
+        self._latitudes[row] = latitude
+        self._longitudes[row] = longitude
+        cell: Tuple[int, int] = self.__cell(latitude, longitude)
+        oldCell: Optional[Tuple[int, int]] = self.__cellOf.get(vin)
+        if oldCell != cell:
+            if oldCell is not None:
+                self.__discard(oldCell, vin)
+            self.__cellOf[vin] = cell
+            self.__cells.setdefault(cell, set()).add(vin)
+
+    def __remove(self, vin: str) -> None:
+        row: Optional[int] = self.__rows.pop(vin, None)
+        if row is None:
+            return
+        last: int = len(self.vins) - 1
+        if row != last:
+            lastVin: str = self.vins[last]
+            self.vins[row] = lastVin
+            self.__rows[lastVin] = row
+            self._latitudes[row] = self._latitudes[last]
+            self._longitudes[row] = self._longitudes[last]
+        self.vins.pop()
+        self.__discard(self.__cellOf.pop(vin), vin)
+
+    def __discard(self, cell: Tuple[int, int], vin: str) -> None:
+        vins: Set[str] = self.__cells[cell]
+        vins.discard(vin)
+        if not vins:
+            del self.__cells[cell]
+
+    def __len__(self) -> int:
+        return len(self.vins)
+
+    def position(self, vin: str) -> Optional[Tuple[float, float]]:
+        row: Optional[int] = self.__rows.get(vin)
+        if row is None:
+            return None
+        return float(self._latitudes[row]), float(self._longitudes[row])
+
+    def __candidates(self, south: float, west: float, north: float, east: float) -> Any:
+        """Rows of the vehicles in the grid cells overlapping the box, west > east crosses the antimeridian"""
+        firstRow: int = max(int((south + 90) // self.cellSize), 0)
+        lastRow: int = min(int((north + 90) // self.cellSize), self.__latitudeCells - 1)
+        firstColumn: int = int((west + 180) // self.cellSize)
+        lastColumn: int = int((east + 180) // self.cellSize)
+        if west > east:
+            lastColumn += self.__longitudeCells
+        columns: int = min(lastColumn - firstColumn + 1, self.__longitudeCells)
+        if (lastRow - firstRow + 1) * columns >= len(self.__cells):
+            # Looking at every occupied cell is cheaper than looking up all cells of the box
+            return numpy.arange(len(self.vins))
+        rows: Dict[str, int] = self.__rows
+        found: List[int] = []
+        for latitudeCell in range(firstRow, lastRow + 1):
+            for column in range(firstColumn, firstColumn + columns):
+                vins: Optional[Set[str]] = self.__cells.get((latitudeCell, column % self.__longitudeCells))
+                if vins:
+                    found.extend(rows[vin] for vin in vins)
+        return numpy.array(found, dtype=numpy.intp)
+
+    def boundingBox(self, south: float, west: float, north: float, east: float) -> List[str]:
+        """Vins of the vehicles inside the box, west > east crosses the antimeridian"""
+        rows = self.__candidates(south, west, north, east)
+        latitudes = self._latitudes[rows]
+        longitudes = self._longitudes[rows]
+        if west <= east:
+            inside = (longitudes >= west) & (longitudes <= east)
+        else:
+            inside = (longitudes >= west) | (longitudes <= east)
+        inside &= (latitudes >= south) & (latitudes <= north)
+        return [self.vins[row] for row in rows[inside]]
+
+    def distances(self, latitude: float, longitude: float, rows: Optional[Any] = None) -> Any:
+        """Great circle distances in km from the point to the vehicles in rows, to all vehicles in the order of vins if
+        rows is None"""
+        if rows is None:
+            rows = slice(0, len(self.vins))
+        latitudes = numpy.radians(self._latitudes[rows])
+        longitudes = numpy.radians(self._longitudes[rows])
+        pointLatitude: float = math.radians(latitude)
+        haversine = numpy.sin((latitudes - pointLatitude) / 2) ** 2 \
+            + math.cos(pointLatitude) * numpy.cos(latitudes) * numpy.sin((longitudes - math.radians(longitude)) / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * numpy.arcsin(numpy.sqrt(numpy.minimum(haversine, 1.0)))
+
+    @staticmethod
+    def __box(latitude: float, longitude: float, distance_km: float) -> Optional[Tuple[float, float, float, float]]:
+        """(south, west, north, east) enclosing all points within distance of the point, None if that is the whole
+        world"""
+        angle: float = distance_km / EARTH_RADIUS_KM
+        south: float = latitude - math.degrees(angle)
+        north: float = latitude + math.degrees(angle)
+        if south <= -90 or north >= 90:
+            return None
+        ratio: float = math.sin(angle) / math.cos(math.radians(latitude))
+        if angle >= math.pi / 2 or ratio >= 1:
+            return None
+        delta: float = math.degrees(math.asin(ratio))
+        return south, (longitude - delta + 180) % 360 - 180, north, (longitude + delta + 180) % 360 - 180
+
+    def nearest(self, latitude: float, longitude: float, count: int = 1, maxDistance_km: Optional[float] = None) -> List[Tuple[str, float]]:
+        """Up to count (vin, distance in km) of the vehicles closest to the point, closest first"""
+        if count <= 0 or not self.vins:
+            return []
+        count = min(count, len(self.vins))
+        # Grow the searched box until it holds enough vehicles
+        distance_km: float = self.cellSize * 111.0
+        while True:
+            box: Optional[Tuple[float, float, float, float]] = GeoIndex.__box(latitude, longitude, distance_km)
+            rows = self.__candidates(*box) if box is not None else numpy.arange(len(self.vins))
+            if len(rows) >= count or box is None or (maxDistance_km is not None and distance_km >= maxDistance_km):
+                break
+            distance_km *= 2
+        distances = self.distances(latitude, longitude, rows)
+        if len(rows) >= count:
+            # Every vehicle closer than the count-th candidate lies in the box around that distance
+            bound: float = float(numpy.partition(distances, count - 1)[count - 1])
+            if maxDistance_km is not None:
+                bound = min(bound, maxDistance_km)
+            box = GeoIndex.__box(latitude, longitude, bound)
+            rows = self.__candidates(*box) if box is not None else numpy.arange(len(self.vins))
+            distances = self.distances(latitude, longitude, rows)
+        if maxDistance_km is not None:
+            within = distances <= maxDistance_km
+            rows = rows[within]
+            distances = distances[within]
+        if len(rows) > count:
+            closest = numpy.argpartition(distances, count - 1)[:count]
+            rows = rows[closest]
+            distances = distances[closest]
+        order = numpy.argsort(distances, kind='stable')
+        return [(self.vins[row], float(distance)) for row, distance in zip(rows[order], distances[order])]
+
+    def withinPolygon(self, polygon: Sequence[Tuple[float, float]]) -> List[str]:
+        """Vins of the vehicles inside the polygon given as (latitude, longitude) corners. Edges are straight lines in
+        latitude and longitude, polygons crossing the antimeridian are not supported"""
+        if len(polygon) < 3:
+            raise ValueError('A polygon needs at least three corners')
+        rows = self.__candidates(min(corner[0] for corner in polygon), min(corner[1] for corner in polygon),
+                                 max(corner[0] for corner in polygon), max(corner[1] for corner in polygon))
+        latitudes = self._latitudes[rows]
+        longitudes = self._longitudes[rows]
+        inside = numpy.zeros(len(rows), dtype=bool)
+        previousLatitude, previousLongitude = polygon[-1]
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            for cornerLatitude, cornerLongitude in polygon:
+                # Even-odd rule, count the edges crossed by a ray from the vehicle towards smaller longitudes
+                spans = (cornerLatitude > latitudes) != (previousLatitude > latitudes)
+                crossing = (previousLongitude - cornerLongitude) * (latitudes - cornerLatitude) / (previousLatitude - cornerLatitude) \
+                    + cornerLongitude
+                inside ^= spans & (longitudes > crossing)
+                previousLatitude, previousLongitude = cornerLatitude, cornerLongitude
+        return [self.vins[row] for row in rows[inside]]
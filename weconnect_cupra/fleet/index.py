@@ -0,0 +1,228 @@
+from __future__ import annotations
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from bisect import bisect_left, bisect_right, insort
+import math
+
+from weconnect_cupra.addressable import AddressPattern
+from weconnect_cupra.fleet.observer import FleetObserver
+
+
+class HashIndex():
+    """Vins of the vehicles by the value of one attribute, for enums and other values that are compared for equality"""
+    __slots__ = ('name', '__vins', '__values')
+
+    def __init__(self, name: str) -> None:
+        self.name: str = name
+        # Value -> vins with this value
+        self.__vins: Dict[Any, Set[str]] = {}
+        self.__values: Dict[str, Any] = {}
+
+    def update(self, vin: str, value: Any) -> None:
+        self.remove(vin)
+        self.__values[vin] = value
+        vins: Optional[Set[str]] = self.__vins.get(value)
+        if vins is None:
+            vins = set()
+            self.__vins[value] = vins
+        vins.add(vin)
+
+    def remove(self, vin: str) -> None:
+        if vin not in self.__values:
+            return
+        value: Any = self.__values.pop(vin)
+        vins: Set[str] = self.__vins[value]
+        vins.discard(vin)
+        if not vins:
+            del self.__vins[value]
+
+    def equals(self, *values: Any) -> Set[str]:
+        """Vins of the vehicles with one of the values"""
+        result: Set[str] = set()
+        for value in values:
+            result.update(self.__vins.get(value, ()))
+        return result
+
+    def estimate(self, *values: Any) -> int:
+        return sum(len(self.__vins.get(value, ())) for value in values)
+
+    def valueOf(self, vin: str) -> Any:
+        return self.__values.get(vin)
+
+    def __contains__(self, vin: str) -> bool:
+        return vin in self.__values
+
+    def __len__(self) -> int:
+        return len(self.__values)
+
+
+class SortedIndex():
+    """Vins of the vehicles sorted by the numeric value of one attribute, for range queries"""
+    __slots__ = ('name', '__entries', '__values')
+
+    def __init__(self, name: str) -> None:
+        self.name: str = name
+        # Sorted (value, vin) tuples
+        self.__entries: List[Tuple[float, str]] = []
+        self.__values: Dict[str, float] = {}
+
+    def update(self, vin: str, value: Any) -> None:
+        number: float = float(value)
+        if self.__values.get(vin) == number:
+            return
+        self.remove(vin)
+        if math.isnan(number):
+            return
+        self.__values[vin] = number
+        insort(self.__entries, (number, vin))
+
+    def remove(self, vin: str) -> None:
+        number: Optional[float] = self.__values.pop(vin, None)
+        if number is None:
+            return
+        position: int = bisect_left(self.__entries, (number, vin))
+        del self.__entries[position]
+
+    def __bounds(self, low: Optional[float], high: Optional[float], includeLow: bool, includeHigh: bool) -> Tuple[int, int]:
+        entries: List[Tuple[float, str]] = self.__entries
+        # Vins are strings, (value,) sorts before and (value, MAX) after all entries with the same value
+        if low is None:
+            start: int = 0
+        elif includeLow:
+            start = bisect_left(entries, (low,))
+        else:
+            start = bisect_right(entries, (low, _MAX_VIN))
+        if high is None:
+            end: int = len(entries)
+        elif includeHigh:
+            end = bisect_right(entries, (high, _MAX_VIN))
+        else:
+            end = bisect_left(entries, (high,))
+        return start, max(start, end)
+
+    def range(self, low: Optional[float] = None, high: Optional[float] = None, includeLow: bool = True, includeHigh: bool = True) -> Set[str]:
+        """Vins of the vehicles with low <= value <= high, a bound of None is open"""
+        start, end = self.__bounds(low, high, includeLow, includeHigh)
+        return {vin for _, vin in self.__entries[start:end]}
+
+    def estimate(self, low: Optional[float] = None, high: Optional[float] = None, includeLow: bool = True, includeHigh: bool = True) -> int:
+        start, end = self.__bounds(low, high, includeLow, includeHigh)
+        return end - start
+
+    def smallest(self, count: int = 1) -> List[Tuple[str, float]]:
+        return [(vin, value) for value, vin in self.__entries[:count]]
+
+    def largest(self, count: int = 1) -> List[Tuple[str, float]]:
+        return [(vin, value) for value, vin in reversed(self.__entries[-count:])] if count > 0 else []
+
+    def valueOf(self, vin: str) -> Optional[float]:
+        return self.__values.get(vin)
+
+    def __len__(self) -> int:
+        return len(self.__values)
+
+
+class Range():
+    """Condition of a query on a sorted index, e.g. Range(high=20, includeHigh=False) for values below 20"""
+    __slots__ = ('low', 'high', 'includeLow', 'includeHigh')
+
+    def __init__(self, low: Optional[float] = None, high: Optional[float] = None, includeLow: bool = True, includeHigh: bool = True) -> None:
+        self.low: Optional[float] = low
+        self.high: Optional[float] = high
+        self.includeLow: bool = includeLow
+        self.includeHigh: bool = includeHigh
+
+    def __str__(self) -> str:
+        return f'{"[" if self.includeLow else "("}{self.low}, {self.high}{"]" if self.includeHigh else ")"}'
+
+
+class FleetIndex(FleetObserver):
+    """Secondary indexes over the vehicles of a fleet, updated by observers. Declare them before attaching, e.g.
+
+        index.addHashIndex('plug', 'domains/charging/plugStatus/plugConnectionState')
+        index.addSortedIndex('soc', 'domains/charging/batteryStatus/currentSOC_pct')
+        index.query({'soc': Range(high=20, includeHigh=False), 'plug': PlugStatus.PlugConnectionState.DISCONNECTED})
+
+    Queries only look at the indexes, no vehicle is scanned.
+    """
+
+    def __init__(self) -> None:
+        super().__init__({})
+        self.indexes: Dict[str, Union[HashIndex, SortedIndex]] = {}
+
+    def addHashIndex(self, name: str, pattern: Union[str, AddressPattern]) -> HashIndex:
+        index: HashIndex = HashIndex(name)
+        self.indexes[name] = index
+        self.addField(name, pattern)
+        return index
+
+    def addSortedIndex(self, name: str, pattern: Union[str, AddressPattern]) -> SortedIndex:
+        index: SortedIndex = SortedIndex(name)
+        self.indexes[name] = index
+        self.addField(name, pattern)
+        return index
+
+    def onValue(self, vin: str, field: str, timestamp: float, value: Any) -> None:
+        index: Optional[Union[HashIndex, SortedIndex]] = self.indexes.get(field)
+        if index is not None:
+            index.update(vin, value)
+
+    def onRemoved(self, vin: str, field: str) -> None:
+        index: Optional[Union[HashIndex, SortedIndex]] = self.indexes.get(field)
+        if index is not None:
+            index.remove(vin)
+
+    def query(self, conditions: Optional[Dict[str, Any]] = None, **kwargs: Any) -> Set[str]:
+        """Vins of the vehicles matching all conditions. A condition on a sorted index is a Range, on a hash index a value
+        or a list, tuple or set of values of which one has to match"""
+        allConditions: Dict[str, Any] = dict(conditions or {}, **kwargs)
+        if not allConditions:
+            raise ValueError('A query needs at least one condition')
+        # Evaluate the most selective condition first and only check the other ones for its vins
+        ordered: List[Tuple[int, Union[HashIndex, SortedIndex], Any]] = []
+        for name, condition in allConditions.items():
+            index: Union[HashIndex, SortedIndex] = self.indexes[name]
+            ordered.append((self.__estimate(index, condition), index, condition))
+        ordered.sort(key=lambda entry: entry[0])
+        _, firstIndex, firstCondition = ordered[0]
+        result: Set[str] = self.__evaluate(firstIndex, firstCondition)
+        for _, index, condition in ordered[1:]:
+            if not result:
+                break
+            result = {vin for vin in result if FleetIndex.__matches(index, condition, vin)}
+        return result
+
+    @staticmethod
+    def __values(condition: Any) -> Iterable[Any]:
+        return condition if isinstance(condition, (list, tuple, set, frozenset)) else (condition,)
+
+    @staticmethod
+    def __estimate(index: Union[HashIndex, SortedIndex], condition: Any) -> int:
+        if isinstance(index, SortedIndex):
+            if not isinstance(condition, Range):
+                raise ValueError(f'Condition on sorted index {index.name} has to be a Range')
+            return index.estimate(condition.low, condition.high, condition.includeLow, condition.includeHigh)
+        return index.estimate(*FleetIndex.__values(condition))
+
+    @staticmethod
+    def __evaluate(index: Union[HashIndex, SortedIndex], condition: Any) -> Set[str]:
+        if isinstance(index, SortedIndex):
+            return index.range(condition.low, condition.high, condition.includeLow, condition.includeHigh)
+        return index.equals(*FleetIndex.__values(condition))
+
+    @staticmethod
+    def __matches(index: Union[HashIndex, SortedIndex], condition: Any, vin: str) -> bool:
+        if isinstance(index, SortedIndex):
+            value: Optional[float] = index.valueOf(vin)
+            if value is None:
+                return False
+            if condition.low is not None and (value < condition.low or (value == condition.low and not condition.includeLow)):
+                return False
+            if condition.high is not None and (value > condition.high or (value == condition.high and not condition.includeHigh)):
+                return False
+            return True
+        return vin in index and index.valueOf(vin) in FleetIndex.__values(condition)
+
+
+# Sorts after every vin
+_MAX_VIN: str = '\U0010ffff'
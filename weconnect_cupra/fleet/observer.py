@@ -0,0 +1,135 @@
+from __future__ import annotations
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from abc import ABC, abstractmethod
+from datetime import datetime
+import logging
+
+from weconnect_cupra.addressable import AddressableLeaf, AddressableObject, AddressableAttribute, AddressableDict, AddressPattern
+from weconnect_cupra.observer_registry import ObserverHandle, ObserverRegistry
+
+LOG: logging.Logger = logging.getLogger("weconnect_cupra")
+
+
+class FleetObserver(ABC):
+    """Base class of streaming analytics over the vehicles of a fleet.
+
+    Subclasses name the attributes they need with address patterns relative to the vehicle, e.g.
+    {'soc': 'domains/charging/batteryStatus/currentSOC_pct'}, and implement onValue and if needed onRemoved. Values
+    reach onValue either live from the tree after attach or from recorded data through replay, so both are processed
+    the same way. Timestamps are seconds since the epoch, taken from the carCapturedTimestamp of the status if
+    available.
+    """
+
+    def __init__(self, fields: Dict[str, Union[str, AddressPattern]]) -> None:
+        self.fields: Dict[str, AddressPattern] = {}
+        # Global address -> (vin, fields) or None if no field matches
+        self.__addresses: Dict[str, Optional[Tuple[str, Tuple[str, ...]]]] = {}
+        self.__handle: Optional[ObserverHandle] = None
+        self.__vehicles: Optional[AddressableObject] = None
+        self.__recordObservers: ObserverRegistry = ObserverRegistry()
+        for name, pattern in fields.items():
+            self.addField(name, pattern)
+
+    def addField(self, name: str, pattern: Union[str, AddressPattern]) -> None:
+        self.fields[name] = pattern if isinstance(pattern, AddressPattern) else AddressPattern.compile(pattern)
+        self.__addresses.clear()
+
+    def attach(self, vehicles: AddressableDict, seed: bool = True) -> None:
+        """Starts observing the vehicles, usually WeConnect.vehicles. With seed the current values are processed first"""
+        self.detach()
+        self.__vehicles = vehicles
+        self.__addresses.clear()
+        if seed:
+            for vin, vehicle in list(vehicles.items()):
+                for name, pattern in self.fields.items():
+                    for element in vehicle.select(pattern):
+                        if isinstance(element, AddressableAttribute) and element.value is not None:
+                            self.onValue(vin, name, FleetObserver.timestampOf(element), element.value)
+        self.__handle = vehicles.addObserver(self.__observe, AddressableLeaf.ObserverEvent.VALUE_CHANGED | AddressableLeaf.ObserverEvent.DISABLED,
+                                             priority=AddressableLeaf.ObserverPriority.USER_LOW)
+
+    def detach(self) -> None:
+        if self.__handle is not None:
+            self.__handle.remove()
+            self.__handle = None
+        self.__vehicles = None
+
+    def __observe(self, element: AddressableLeaf, flags: AddressableLeaf.ObserverEvent) -> None:
+        address: str = element.getGlobalAddress()
+        try:
+            target: Optional[Tuple[str, Tuple[str, ...]]] = self.__addresses[address]
+        except KeyError:
+            target = self.__resolve(element)
+            self.__addresses[address] = target
+        if target is None or not isinstance(element, AddressableAttribute):
+            return
+        vin, names = target
+        value: Any = element.value
+        if value is None or flags & AddressableLeaf.ObserverEvent.DISABLED:
+            for name in names:
+                self.onRemoved(vin, name)
+            return
+        timestamp: float = FleetObserver.timestampOf(element)
+        for name in names:
+            self.onValue(vin, name, timestamp, value)
+
+    def __resolve(self, element: AddressableLeaf) -> Optional[Tuple[str, Tuple[str, ...]]]:
+        if self.__vehicles is None:
+            return None
+        segments: Tuple[str, ...] = element.getAddressSegments()[len(self.__vehicles.getAddressSegments()):]
+        if len(segments) < 2:
+            return None
+        names: List[str] = []
+        for name, pattern in self.fields.items():
+            states = pattern.initialStates
+            for localAddress in segments[1:]:
+                states = pattern.advance(states, localAddress)
+                if not states:
+                    break
+            if states and pattern.isFinal(states):
+                names.append(name)
+        return (segments[0], tuple(names)) if names else None
+
+    @staticmethod
+    def timestampOf(element: AddressableLeaf) -> float:
+        status: Optional[AddressableObject] = element.parent
+        while status is not None:
+            captured: Optional[AddressableAttribute] = getattr(status, 'carCapturedTimestamp', None)
+            if isinstance(captured, AddressableAttribute):
+                if captured.enabled and captured.value is not None:
+                    return captured.value.timestamp()
+                break
+            status = status.parent
+        timestamp: Optional[datetime] = element.lastUpdateFromCar or element.lastChange
+        return timestamp.timestamp() if timestamp is not None else 0.0
+
+    def replay(self, records: Iterable[Tuple[str, str, Union[datetime, float], Any]]) -> None:
+        """Processes recorded (vin, field, timestamp, value) tuples in order, e.g. to rebuild results from a dump. A value
+        of None removes the field"""
+        onValue: Callable[[str, str, float, Any], None] = self.onValue
+        for vin, field, timestamp, value in records:
+            if value is None:
+                self.onRemoved(vin, field)
+                continue
+            if isinstance(timestamp, datetime):
+                timestamp = timestamp.timestamp()
+            onValue(vin, field, timestamp, value)
+
+    @abstractmethod
+    def onValue(self, vin: str, field: str, timestamp: float, value: Any) -> None:
+        """Called with the new value of a field"""
+
+    def onRemoved(self, vin: str, field: str) -> None:
+        """Called when the attribute of a field was disabled or lost its value, e.g. because the vehicle was removed"""
+
+    def addRecordObserver(self, observer: Callable[[Any], None], weak: bool = False) -> ObserverHandle:
+        """Registers observer(record) for the records produced by this analysis"""
+        return self.__recordObservers.add(observer, None, weak=weak)
+
+    def emit(self, record: Any) -> None:
+        for observer, _ in self.__recordObservers.entries():
+            try:
+                observer(record)
+            except Exception:  # pylint: disable=broad-except
+                LOG.exception('Record observer of %s failed', type(self).__name__)
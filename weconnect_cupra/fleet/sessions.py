@@ -0,0 +1,162 @@
+from __future__ import annotations
+from typing import Any, Deque, Dict, FrozenSet, Iterable, Optional
+
+from array import array
+from collections import deque
+from datetime import datetime, timezone
+import math
+
+from weconnect_cupra.api.cupra.elements.charging_status import ChargingStatus
+from weconnect_cupra.fleet.observer import FleetObserver
+
+SUPPORT_NUMPY = False
+try:
+    import numpy  # type: ignore
+    SUPPORT_NUMPY = True
+except ImportError:
+    pass
+
+
+class ChargingSession():
+    """One completed charging session of a vehicle"""
+    __slots__ = ('vin', 'start', 'end', 'energy_kWh', 'averagePower_kW', 'peakPower_kW', 'startSOC_pct', 'endSOC_pct')
+
+    def __init__(self, vin: str, start: float, end: float, energy_kWh: float, peakPower_kW: Optional[float],
+                 startSOC_pct: Optional[float], endSOC_pct: Optional[float]) -> None:
+        self.vin: str = vin
+        self.start: datetime = datetime.fromtimestamp(start, tz=timezone.utc)
+        self.end: datetime = datetime.fromtimestamp(end, tz=timezone.utc)
+        self.energy_kWh: float = energy_kWh
+        duration_h: float = (end - start) / 3600
+        self.averagePower_kW: Optional[float] = energy_kWh / duration_h if duration_h > 0 else None
+        self.peakPower_kW: Optional[float] = peakPower_kW
+        self.startSOC_pct: Optional[float] = startSOC_pct
+        self.endSOC_pct: Optional[float] = endSOC_pct
+
+    @property
+    def socDelta_pct(self) -> Optional[float]:
+        if self.startSOC_pct is None or self.endSOC_pct is None:
+            return None
+        return self.endSOC_pct - self.startSOC_pct
+
+    def __str__(self) -> str:
+        return f'{self.vin}: {self.start.isoformat()} - {self.end.isoformat()} {self.energy_kWh:.2f} kWh, SoC {self.startSOC_pct} -> {self.endSOC_pct}'
+
+
+class ChargingSessionDetector(FleetObserver):
+    """Detects charging sessions from the charging state, integrates the charge power over the session and emits a
+    ChargingSession when the vehicle stops charging.
+
+    The reported power is held until the next sample. Power samples of a running session are buffered in arrays of
+    at most maxSamples entries, older samples are integrated early when the buffer is full, so the state per vehicle is
+    bounded. The latest maxSessions sessions are kept in sessions.
+    """
+    FIELDS: Dict[str, str] = {'state': 'domains/charging/chargingStatus/chargingState',
+                              'power': 'domains/charging/chargingStatus/chargePower_kW',
+                              'soc': 'domains/charging/batteryStatus/currentSOC_pct'}
+
+    def __init__(self, maxSamples: int = 4096, maxSessions: int = 1000,
+                 chargingStates: Optional[Iterable[ChargingStatus.ChargingState]] = None) -> None:
+        super().__init__(ChargingSessionDetector.FIELDS)
+        if maxSamples < 2:
+            raise ValueError('maxSamples must be at least 2')
+        self.maxSamples: int = maxSamples
+        self.chargingStates: FrozenSet[ChargingStatus.ChargingState] = frozenset(chargingStates) if chargingStates is not None \
+            else frozenset((ChargingStatus.ChargingState.CHARGING,))
+        # Replayed recordings may contain the raw API values instead of the enum members
+        self.__chargingValues: FrozenSet[Any] = self.chargingStates.union(state.value for state in self.chargingStates)
+        self.sessions: Deque[ChargingSession] = deque(maxlen=maxSessions)
+        self.__vehicles: Dict[str, _VehicleState] = {}
+
+    def onValue(self, vin: str, field: str, timestamp: float, value: Any) -> None:
+        state: Optional[_VehicleState] = self.__vehicles.get(vin)
+        if state is None:
+            state = _VehicleState()
+            self.__vehicles[vin] = state
+        if field == 'state':
+            charging: bool = value in self.__chargingValues
+            if charging and state.start is None:
+                state.begin(timestamp)
+            elif not charging and state.start is not None:
+                self.__finish(vin, state, timestamp)
+        elif field == 'power':
+            state.power = float(value)
+            if state.start is not None:
+                state.sample(timestamp, state.power, self.maxSamples)
+        elif field == 'soc':
+            state.soc = float(value)
+            if state.start is not None and state.startSOC is None:
+                state.startSOC = state.soc
+
+    def __finish(self, vin: str, state: _VehicleState, timestamp: float) -> None:
+        energy_kWh: float = state.energy_kWh + integrateEnergy(state.timestamps, state.powers, timestamp)
+        session: ChargingSession = ChargingSession(vin, state.start, timestamp, energy_kWh, state.peak, state.startSOC,  # type: ignore
+                                                   state.soc)
+        state.reset()
+        self.sessions.append(session)
+        self.emit(session)
+
+    def runningSession(self, vin: str) -> Optional[float]:
+        """Start of the session the vehicle is charging in as seconds since the epoch, None if it is not charging"""
+        state: Optional[_VehicleState] = self.__vehicles.get(vin)
+        return state.start if state is not None else None
+
+
+def integrateEnergy(timestamps: Any, powers: Any, end: float) -> float:
+    """Energy in kWh of a power curve in kW sampled at timestamps in seconds, each sample is held until the next one
+    and the last one until end"""
+    count: int = len(timestamps)
+    if count == 0:
+        return 0.0
+    if SUPPORT_NUMPY:
+        times = numpy.frombuffer(timestamps, dtype=numpy.float64) if isinstance(timestamps, array) else numpy.asarray(timestamps, dtype=numpy.float64)
+        values = numpy.frombuffer(powers, dtype=numpy.float64) if isinstance(powers, array) else numpy.asarray(powers, dtype=numpy.float64)
+        durations = numpy.diff(times, append=max(end, float(times[-1])))
+        return float(numpy.dot(values, durations)) / 3600
+    energy: float = 0.0
+    for index in range(count):
+        nextTime: float = timestamps[index + 1] if index + 1 < count else max(end, timestamps[index])
+        energy += powers[index] * (nextTime - timestamps[index])
+    return energy / 3600
+
+
+class _VehicleState():
+    __slots__ = ('start', 'startSOC', 'soc', 'power', 'peak', 'energy_kWh', 'timestamps', 'powers')
+
+    def __init__(self) -> None:
+        self.soc: Optional[float] = None
+        self.power: Optional[float] = None
+        self.timestamps: array = array('d')
+        self.powers: array = array('d')
+        self.reset()
+
+    def reset(self) -> None:
+        self.start: Optional[float] = None
+        self.startSOC: Optional[float] = None
+        self.peak: Optional[float] = None
+        self.energy_kWh: float = 0.0
+        del self.timestamps[:]
+        del self.powers[:]
+
+    def begin(self, timestamp: float) -> None:
+        self.start = timestamp
+        self.startSOC = self.soc
+        # The power reported before the state changed is the best guess until the next sample
+        if self.power is not None and not math.isnan(self.power):
+            self.timestamps.append(timestamp)
+            self.powers.append(self.power)
+            self.peak = self.power
+
+    def sample(self, timestamp: float, power: float, maxSamples: int) -> None:
+        if self.timestamps and timestamp < self.timestamps[-1]:
+            return
+        if len(self.timestamps) >= maxSamples:
+            # Integrate the older half early to keep the buffer bounded
+            half: int = len(self.timestamps) // 2
+            self.energy_kWh += integrateEnergy(self.timestamps[:half], self.powers[:half], self.timestamps[half])
+            del self.timestamps[:half]
+            del self.powers[:half]
+        self.timestamps.append(timestamp)
+        self.powers.append(power)
+        if self.peak is None or power > self.peak:
+            self.peak = power
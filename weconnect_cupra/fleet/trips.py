@@ -0,0 +1,193 @@
+from __future__ import annotations
+from typing import Any, Deque, Dict, Iterable, Optional, Sequence, Union
+
+from collections import deque
+from datetime import datetime, timezone
+import math
+
+from weconnect_cupra.fleet.geo import EARTH_RADIUS_KM
+from weconnect_cupra.fleet.observer import FleetObserver
+
+SUPPORT_NUMPY = False
+try:
+    import numpy  # type: ignore
+    SUPPORT_NUMPY = True
+except ImportError:
+    pass
+
+
+class Trip():
+    """One trip of a vehicle between two parking positions"""
+    __slots__ = ('vin', 'start', 'end', 'startLatitude', 'startLongitude', 'endLatitude', 'endLongitude', 'startOdometer_km',
+                 'endOdometer_km')
+
+    def __init__(self, vin: str, start: float, end: float, startLatitude: float, startLongitude: float, endLatitude: float,
+                 endLongitude: float, startOdometer_km: float, endOdometer_km: float) -> None:
+        self.vin: str = vin
+        self.start: datetime = datetime.fromtimestamp(start, tz=timezone.utc)
+        self.end: datetime = datetime.fromtimestamp(end, tz=timezone.utc)
+        self.startLatitude: float = startLatitude
+        self.startLongitude: float = startLongitude
+        self.endLatitude: float = endLatitude
+        self.endLongitude: float = endLongitude
+        self.startOdometer_km: float = startOdometer_km
+        self.endOdometer_km: float = endOdometer_km
+
+    @property
+    def distance_km(self) -> float:
+        """Driven distance according to the odometer"""
+        return self.endOdometer_km - self.startOdometer_km
+
+    @property
+    def straightDistance_km(self) -> float:
+        return greatCircleDistance(self.startLatitude, self.startLongitude, self.endLatitude, self.endLongitude)
+
+    def __str__(self) -> str:
+        return f'{self.vin}: {self.start.isoformat()} ({self.startLatitude}, {self.startLongitude}) - {self.end.isoformat()} ' \
+            f'({self.endLatitude}, {self.endLongitude}) {self.distance_km:.0f} km'
+
+
+class TripBuilder(FleetObserver):
+    """Reconstructs trips from the parking position and the odometer.
+
+    A vehicle moved when its parking position is at least minMove_km away from the position it was parked at and the
+    odometer advanced by at least minDistance_km. Both may be reported in any order, a trip is emitted as soon as both
+    are seen. The start of a trip is the last time the vehicle was known to be at the start position, the end is the
+    time the new parking position was reported. Trips ending where they started cannot be told from not moving at all
+    and are merged into the next trip. The state is one small object per vehicle, the latest maxTrips trips are kept in
+    trips.
+    """
+    FIELDS: Dict[str, str] = {'latitude': 'domains/parking/parkingPosition/latitude',
+                              'longitude': 'domains/parking/parkingPosition/longitude',
+                              'odometer': 'domains/measurements/odometerStatus/odometer'}
+
+    def __init__(self, minMove_km: float = 0.1, minDistance_km: float = 1.0, maxTrips: int = 1000) -> None:
+        super().__init__(TripBuilder.FIELDS)
+        self.minMove_km: float = minMove_km
+        self.minDistance_km: float = minDistance_km
+        self.trips: Deque[Trip] = deque(maxlen=maxTrips)
+        self.__vehicles: Dict[str, _VehicleState] = {}
+
+    def onValue(self, vin: str, field: str, timestamp: float, value: Any) -> None:
+        state: Optional[_VehicleState] = self.__vehicles.get(vin)
+        if state is None:
+            state = _VehicleState()
+            self.__vehicles[vin] = state
+        if field == 'latitude':
+            state.latitude = float(value)
+            state.positionTime = timestamp
+        elif field == 'longitude':
+            state.longitude = float(value)
+            state.positionTime = timestamp
+        elif field == 'odometer':
+            state.odometer = float(value)
+        self.__advance(vin, state, timestamp)
+
+    def onRemoved(self, vin: str, field: str) -> None:
+        state: Optional[_VehicleState] = self.__vehicles.get(vin)
+        if state is None:
+            return
+        # The parking position is not reported while driving, the start position is kept until the vehicle parks again
+        if field == 'latitude':
+            state.latitude = None
+        elif field == 'longitude':
+            state.longitude = None
+        elif field == 'odometer':
+            state.odometer = None
+        if state.latitude is None and state.longitude is None and state.odometer is None:
+            del self.__vehicles[vin]
+
+    def __advance(self, vin: str, state: _VehicleState, timestamp: float) -> None:
+        if state.latitude is None or state.longitude is None or state.odometer is None:
+            return
+        if state.startOdometer is None or state.odometer < state.startOdometer:
+            # First complete position or an odometer that went backwards, start over from here
+            state.park(timestamp)
+            return
+        driven: float = state.odometer - state.startOdometer
+        if greatCircleDistance(state.startLatitude, state.startLongitude, state.latitude, state.longitude) < self.minMove_km:  # type: ignore
+            if driven == 0:
+                state.startTime = timestamp
+            return
+        if driven < self.minDistance_km:
+            return
+        trip: Trip = Trip(vin, state.startTime, max(state.positionTime, state.startTime), state.startLatitude, state.startLongitude,  # type: ignore
+                          state.latitude, state.longitude, state.startOdometer, state.odometer)
+        state.park(max(state.positionTime, timestamp))
+        self.trips.append(trip)
+        self.emit(trip)
+
+    def replaySnapshots(self, vins: Sequence[str], timestamps: Sequence[Union[datetime, float]], latitudes: Sequence[float],
+                        longitudes: Sequence[float], odometers: Sequence[float]) -> None:
+        """Processes recorded snapshots with all values of a vehicle per row, ordered by time for every vehicle. Missing
+        values are NaN or None. With numpy, rows that repeat the previous snapshot of the vehicle are skipped without
+        being looked at, unless they are the last ones before a change."""
+        count: int = len(vins)
+        rows: Iterable[int] = range(count)
+        if SUPPORT_NUMPY and count > 2:
+            values = numpy.column_stack((numpy.asarray(latitudes, dtype=numpy.float64), numpy.asarray(longitudes, dtype=numpy.float64),
+                                         numpy.asarray(odometers, dtype=numpy.float64)))
+            # Numbering the vins with a dict is much faster than sorting them with numpy.unique
+            numbers: Dict[str, int] = {vin: number for number, vin in enumerate(dict.fromkeys(vins))}
+            codes = numpy.fromiter(map(numbers.__getitem__, vins), dtype=numpy.intp, count=count)
+            # Compare every row with the previous row of the same vehicle
+            order = numpy.argsort(codes, kind='stable')
+            ordered = values[order]
+            same = numpy.zeros(count, dtype=bool)
+            same[1:] = (codes[order][1:] == codes[order][:-1]) & numpy.all(ordered[1:] == ordered[:-1], axis=1)
+            # Keep changes, the last unchanged row before them and the last row of every vehicle
+            keep = numpy.empty(count, dtype=bool)
+            keep[order] = ~same | ~numpy.append(same[1:], False)
+            rows = numpy.flatnonzero(keep).tolist()
+        for row in rows:
+            vin: str = vins[row]
+            timestamp: Union[datetime, float] = timestamps[row]
+            if isinstance(timestamp, datetime):
+                timestamp = timestamp.timestamp()
+            state: Optional[_VehicleState] = self.__vehicles.get(vin)
+            if state is None:
+                state = _VehicleState()
+                self.__vehicles[vin] = state
+            latitude: Optional[float] = _number(latitudes[row])
+            longitude: Optional[float] = _number(longitudes[row])
+            if latitude != state.latitude or longitude != state.longitude:
+                state.positionTime = float(timestamp)
+            state.latitude = latitude
+            state.longitude = longitude
+            state.odometer = _number(odometers[row])
+            self.__advance(vin, state, float(timestamp))
+
+
+def greatCircleDistance(latitude: float, longitude: float, otherLatitude: float, otherLongitude: float) -> float:
+    """Distance in km between two points"""
+    latitude, otherLatitude = math.radians(latitude), math.radians(otherLatitude)
+    haversine: float = math.sin((otherLatitude - latitude) / 2) ** 2 \
+        + math.cos(latitude) * math.cos(otherLatitude) * math.sin(math.radians(otherLongitude - longitude) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(haversine, 1.0)))
+
+
+def _number(value: Any) -> Optional[float]:
+    if value is None:
+        return None
+    number: float = float(value)
+    return None if math.isnan(number) else number
+
+
+class _VehicleState():
+    __slots__ = ('latitude', 'longitude', 'odometer', 'positionTime', 'startLatitude', 'startLongitude', 'startOdometer', 'startTime')
+
+    def __init__(self) -> None:
+        self.latitude: Optional[float] = None
+        self.longitude: Optional[float] = None
+        self.odometer: Optional[float] = None
+        self.positionTime: float = 0.0
+        self.startLatitude: Optional[float] = None
+        self.startLongitude: Optional[float] = None
+        self.startOdometer: Optional[float] = None
+        self.startTime: float = 0.0
+
+    def park(self, timestamp: float) -> None:
+        self.startLatitude = self.latitude
+        self.startLongitude = self.longitude
+        self.startOdometer = self.odometer
+        self.startTime = timestamp
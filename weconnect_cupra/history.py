@@ -0,0 +1,121 @@
+from __future__ import annotations
+from typing import Any, Iterator, Optional, Tuple
+
+from array import array
+from datetime import datetime, timedelta, timezone
+import math
+
+SUPPORT_NUMPY = False
+try:
+    import numpy  # type: ignore
+    SUPPORT_NUMPY = True
+except ImportError:
+    pass
+
+
+class AttributeHistory():
+    """Fixed capacity ring buffer of (timestamp, value) samples of a numeric attribute.
+
+    Timestamps are stored as int64 microseconds since the epoch, values as float64 with NaN for missing values. Every
+    sample is written twice, at its position and capacity entries later, so the latest samples are always one
+    contiguous slice of the buffers and can be returned as views without copying. Memory is 32 bytes per sample of
+    capacity and never grows.
+    """
+    __slots__ = ('capacity', '__timestamps', '__values', '__next', '__length')
+
+    def __init__(self, capacity: int) -> None:
+        if capacity < 1:
+            raise ValueError('History needs a capacity of at least one sample')
+        self.capacity: int = capacity
+        self.__timestamps: array = array('q', bytes(16 * capacity))
+        self.__values: array = array('d', bytes(16 * capacity))
+        # Position the next sample is written to, between 0 and capacity - 1
+        self.__next: int = 0
+        self.__length: int = 0
+
+    def append(self, timestamp: datetime, value: Optional[Any]) -> Optional[Tuple[int, float]]:
+        """Adds a sample, naive timestamps are taken as UTC. Returns the raw sample that was evicted to make room, None
+        if the history was not full"""
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        microseconds: int = (timestamp - _EPOCH) // _MICROSECOND
+        floatValue: float = math.nan if value is None else float(value)
+        position: int = self.__next
+        evicted: Optional[Tuple[int, float]] = None
+        if self.__length == self.capacity:
+            evicted = (self.__timestamps[position], self.__values[position])
+        self.__timestamps[position] = microseconds
+        self.__timestamps[position + self.capacity] = microseconds
+        self.__values[position] = floatValue
+        self.__values[position + self.capacity] = floatValue
+        self.__next = position + 1 if position + 1 < self.capacity else 0
+        if self.__length < self.capacity:
+            self.__length += 1
+        return evicted
+
+    def dropLast(self, evicted: Optional[Tuple[int, float]] = None) -> None:
+        """Removes the latest sample, used to roll back an update. Pass the sample returned by append to put it back"""
+        if self.__length > 0:
+            self.__next = self.__next - 1 if self.__next > 0 else self.capacity - 1
+            if evicted is None:
+                self.__length -= 1
+            else:
+                # The evicted sample was in the slot of the dropped one and becomes the oldest sample again
+                self.__write(self.__next, *evicted)
+
+    def __write(self, position: int, microseconds: int, value: float) -> None:
+        self.__timestamps[position] = microseconds
+        self.__timestamps[position + self.capacity] = microseconds
+        self.__values[position] = value
+        self.__values[position + self.capacity] = value
+
+    def clear(self) -> None:
+        self.__next = 0
+        self.__length = 0
+
+    def __window(self) -> Tuple[int, int]:
+        # The latest samples end right before the next write position in the second copy
+        end: int = self.__next + self.capacity
+        return end - self.__length, end
+
+    def timestamps(self) -> Any:
+        """Timestamps in microseconds since the epoch, oldest first. A numpy int64 view if numpy is available, else a
+        memoryview. Views share the buffers and see later appends, copy them to keep a state"""
+        start, end = self.__window()
+        view: memoryview = memoryview(self.__timestamps)[start:end]
+        if SUPPORT_NUMPY:
+            return numpy.frombuffer(view, dtype=numpy.int64)
+        return view
+
+    def values(self) -> Any:
+        """Values oldest first, like timestamps"""
+        start, end = self.__window()
+        view: memoryview = memoryview(self.__values)[start:end]
+        if SUPPORT_NUMPY:
+            return numpy.frombuffer(view, dtype=numpy.float64)
+        return view
+
+    def last(self) -> Optional[Tuple[datetime, float]]:
+        if self.__length == 0:
+            return None
+        position: int = self.__next + self.capacity - 1
+        return _toDatetime(self.__timestamps[position]), self.__values[position]
+
+    def __iter__(self) -> Iterator[Tuple[datetime, float]]:
+        start, end = self.__window()
+        for position in range(start, end):
+            yield _toDatetime(self.__timestamps[position]), self.__values[position]
+
+    def __len__(self) -> int:
+        return self.__length
+
+    def __str__(self) -> str:
+        return f'{self.__length}/{self.capacity} samples'
+
+
+_EPOCH: datetime = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND: timedelta = timedelta(microseconds=1)
+
+
+def _toDatetime(microseconds: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=microseconds)
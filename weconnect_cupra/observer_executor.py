@@ -0,0 +1,168 @@
+from __future__ import annotations
+from typing import Callable, Dict, List, Optional, Any, Tuple
+
+from enum import Enum
+import logging
+import queue
+import threading
+import time
+
+LOG: logging.Logger = logging.getLogger("weconnect_cupra")
+
+
+class ObserverExecutor():
+    """Runs observer callbacks on a pool of worker threads instead of inline in the update.
+
+    Every observer is always handled by the same worker, so the callbacks of one observer are executed in the order
+    they were submitted. Each worker has a bounded queue, the policy decides what happens when it is full.
+    """
+
+    def __init__(self, workers: int = 4, queueSize: int = 1000, policy: Optional[ObserverExecutor.Policy] = None,
+                 blockTimeout: Optional[float] = None) -> None:
+        if workers < 1:
+            raise ValueError('ObserverExecutor needs at least one worker')
+        self.policy: ObserverExecutor.Policy = policy if policy is not None else ObserverExecutor.Policy.BLOCK
+        self.blockTimeout: Optional[float] = blockTimeout
+
+        self.__queues: List[queue.Queue] = [queue.Queue(maxsize=queueSize) for _ in range(workers)]
+        self.__lock: threading.Lock = threading.Lock()
+        self.__submitted: int = 0
+        self.__executed: int = 0
+        self.__dropped: int = 0
+        self.__failed: int = 0
+        self.__queueLatencyTotal: float = 0.0
+        self.__queueLatencyMax: float = 0.0
+        self.__callbackDurationTotal: float = 0.0
+        self.__callbackDurationMax: float = 0.0
+        self.__running: bool = True
+
+        self.__threads: List[threading.Thread] = []
+        for number, workerQueue in enumerate(self.__queues):
+            thread = threading.Thread(target=self.__work, args=(workerQueue,), name=f'ObserverExecutor-{number}', daemon=True)
+            thread.start()
+            self.__threads.append(thread)
+
+    def submit(self, observer: Callable[..., Any], **kwargs: Any) -> bool:
+        """Queues observer(**kwargs). Returns False if the call was dropped, also when the executor was shut down"""
+        with self.__lock:
+            self.__submitted += 1
+        if not self.__running:
+            LOG.debug('ObserverExecutor was shut down, dropping notification')
+            self.__drop()
+            return False
+        workerQueue: queue.Queue = self.__queues[hash(observer) % len(self.__queues)]
+        entry: Tuple[Callable[..., Any], Dict[str, Any], float] = (observer, kwargs, time.monotonic())
+
+        if self.policy == ObserverExecutor.Policy.BLOCK:
+            return self.__putBlocking(workerQueue, entry)
+        if self.policy == ObserverExecutor.Policy.DROP_NEWEST:
+            return self.__putOrDropNewest(workerQueue, entry)
+        return self.__putOrDropOldest(workerQueue, entry)
+
+    def __putBlocking(self, workerQueue: queue.Queue, entry: Tuple[Callable[..., Any], Dict[str, Any], float]) -> bool:
+        try:
+            workerQueue.put(entry, timeout=self.blockTimeout)
+            return True
+        except queue.Full:
+            LOG.warning('Observer queue stayed full for %s seconds, dropping notification', self.blockTimeout)
+            self.__drop()
+            return False
+
+    def __putOrDropNewest(self, workerQueue: queue.Queue, entry: Tuple[Callable[..., Any], Dict[str, Any], float]) -> bool:
+        try:
+            workerQueue.put_nowait(entry)
+            return True
+        except queue.Full:
+            self.__drop()
+            return False
+
+    def __putOrDropOldest(self, workerQueue: queue.Queue, entry: Tuple[Callable[..., Any], Dict[str, Any], float]) -> bool:
+        # Make room by discarding the entry that waited longest
+        while True:
+            try:
+                workerQueue.put_nowait(entry)
+                return True
+            except queue.Full:
+                pass
+            try:
+                workerQueue.get_nowait()
+                workerQueue.task_done()
+                self.__drop()
+            except queue.Empty:
+                continue
+
+    def __drop(self) -> None:
+        with self.__lock:
+            self.__dropped += 1
+
+    def __work(self, workerQueue: queue.Queue) -> None:
+        while True:
+            entry = workerQueue.get()
+            if entry is None:
+                workerQueue.task_done()
+                return
+            observer, kwargs, submitted = entry
+            started: float = time.monotonic()
+            failed: bool = False
+            try:
+                observer(**kwargs)
+            except Exception:  # pylint: disable=broad-except
+                failed = True
+                LOG.exception('Observer %s raised an exception', observer)
+            finished: float = time.monotonic()
+            with self.__lock:
+                self.__executed += 1
+                if failed:
+                    self.__failed += 1
+                self.__queueLatencyTotal += started - submitted
+                self.__queueLatencyMax = max(self.__queueLatencyMax, started - submitted)
+                self.__callbackDurationTotal += finished - started
+                self.__callbackDurationMax = max(self.__callbackDurationMax, finished - started)
+            workerQueue.task_done()
+
+    def join(self) -> None:
+        """Blocks until all queued callbacks were executed"""
+        for workerQueue in self.__queues:
+            workerQueue.join()
+
+    def shutdown(self, wait: bool = True) -> None:
+        if not self.__running:
+            return
+        self.__running = False
+        for workerQueue in self.__queues:
+            workerQueue.put(None)
+        if wait:
+            for thread in self.__threads:
+                thread.join()
+
+    @property
+    def queueDepth(self) -> int:
+        return sum(workerQueue.qsize() for workerQueue in self.__queues)
+
+    @property
+    def queueDepths(self) -> List[int]:
+        return [workerQueue.qsize() for workerQueue in self.__queues]
+
+    @property
+    def dropped(self) -> int:
+        return self.__dropped
+
+    def getMetrics(self) -> Dict[str, Any]:
+        with self.__lock:
+            executed: int = self.__executed
+            return {
+                'submitted': self.__submitted,
+                'executed': executed,
+                'dropped': self.__dropped,
+                'failed': self.__failed,
+                'queueDepth': self.queueDepth,
+                'queueLatencyAvg_s': self.__queueLatencyTotal / executed if executed else None,
+                'queueLatencyMax_s': self.__queueLatencyMax if executed else None,
+                'callbackDurationAvg_s': self.__callbackDurationTotal / executed if executed else None,
+                'callbackDurationMax_s': self.__callbackDurationMax if executed else None,
+            }
+
+    class Policy(Enum):
+        BLOCK = 'block'
+        DROP_NEWEST = 'drop newest'
+        DROP_OLDEST = 'drop oldest'
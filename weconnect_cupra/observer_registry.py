@@ -0,0 +1,111 @@
+from __future__ import annotations
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+import inspect
+import logging
+import weakref
+
+LOG: logging.Logger = logging.getLogger("weconnect_cupra")
+
+
+class ObserverHandle():
+    """Returned when an observer is added, removes exactly this registration in constant time"""
+    __slots__ = ('__registry', '__weakref__')
+
+    def __init__(self, registry: ObserverRegistry) -> None:
+        self.__registry: Optional[weakref.ref[ObserverRegistry]] = weakref.ref(registry)
+
+    @property
+    def active(self) -> bool:
+        registry: Optional[ObserverRegistry] = self.__registry() if self.__registry is not None else None
+        return registry is not None and registry.contains(self)
+
+    def remove(self) -> bool:
+        """Removes the observer. Returns False if it was already removed"""
+        registry: Optional[ObserverRegistry] = self.__registry() if self.__registry is not None else None
+        self.__registry = None
+        return registry is not None and registry.discard(self)
+
+
+class ObserverRegistry():
+    """Observers together with the flags they are interested in and further details like the priority.
+
+    Entries are returned as tuples (observer, flags, *details). Adding the same observer with the same flags and
+    details again returns the existing handle. Weak observers are only referenced weakly, bound methods through
+    weakref.WeakMethod, and are removed as soon as their object is garbage collected.
+    """
+    __slots__ = ('__entries', '__keys', '__weakref__')
+
+    def __init__(self) -> None:
+        # Handle -> (reference, weak, flags, details, key)
+        self.__entries: Dict[ObserverHandle, Tuple[Any, bool, Any, Tuple[Any, ...], Tuple[Any, ...]]] = {}
+        self.__keys: Dict[Tuple[Any, ...], ObserverHandle] = {}
+
+    def add(self, observer: Callable[..., Any], flags: Any, *details: Any, weak: bool = False) -> ObserverHandle:
+        reference: Any = observer
+        identity: Any = observer
+        handle: Optional[ObserverHandle] = None
+        if weak:
+            selfReference: weakref.ref[ObserverRegistry] = weakref.ref(self)
+
+            def collected(_: Any) -> None:
+                registry: Optional[ObserverRegistry] = selfReference()
+                if registry is not None and handle is not None:
+                    registry.discard(handle)
+            # Weak references are only hashable if their object is, identities work for all objects while they live
+            if inspect.ismethod(observer):
+                reference = weakref.WeakMethod(observer, collected)
+                identity = (id(observer.__self__), id(observer.__func__))
+            else:
+                reference = weakref.ref(observer, collected)
+                identity = id(observer)
+        key: Tuple[Any, ...] = (identity, weak, flags) + details
+        existing: Optional[ObserverHandle] = self.__keys.get(key)
+        if existing is not None:
+            return existing
+        handle = ObserverHandle(self)
+        self.__entries[handle] = (reference, weak, flags, details, key)
+        self.__keys[key] = handle
+        return handle
+
+    def discard(self, handle: ObserverHandle) -> bool:
+        entry: Optional[Tuple[Any, bool, Any, Tuple[Any, ...], Tuple[Any, ...]]] = self.__entries.pop(handle, None)
+        if entry is None:
+            return False
+        self.__keys.pop(entry[4], None)
+        return True
+
+    def remove(self, observer: Callable[..., Any], flags: Optional[Any] = None) -> int:
+        """Removes all registrations of observer, only those with exactly these flags if flags is given. Returns the
+        number of removed registrations"""
+        handles: List[ObserverHandle] = []
+        for handle, (reference, weak, entryFlags, _, _) in self.__entries.items():
+            if (reference() if weak else reference) == observer and (flags is None or entryFlags == flags):
+                handles.append(handle)
+        for handle in handles:
+            self.discard(handle)
+        return len(handles)
+
+    def contains(self, handle: ObserverHandle) -> bool:
+        return handle in self.__entries
+
+    def clear(self) -> None:
+        self.__entries.clear()
+        self.__keys.clear()
+
+    def entries(self) -> Iterator[Tuple[Any, ...]]:
+        """Yields (observer, flags, *details) for all observers that are still alive"""
+        for reference, weak, flags, details, _ in tuple(self.__entries.values()):
+            if weak:
+                observer: Union[Callable[..., Any], None] = reference()
+                if observer is None:
+                    continue
+                yield (observer, flags) + details
+            else:
+                yield (reference, flags) + details
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def __bool__(self) -> bool:
+        return len(self.__entries) > 0
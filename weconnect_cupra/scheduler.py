@@ -0,0 +1,188 @@
+from __future__ import annotations
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import heapq
+import itertools
+import threading
+import time
+
+from weconnect_cupra.observer_executor import ObserverExecutor
+
+
+class Scheduler():
+    """Runs callbacks after a delay, timed by a single thread instead of one Timer thread per callback.
+
+    Callbacks are scheduled under a key, scheduling a key that is still pending keeps the earlier due time and the
+    pending callback, so many requests in a short time result in a single call. Due callbacks are handed to an
+    ObserverExecutor, a slow callback does not delay the timing of the others and the callbacks of one key never run
+    concurrently. Calls the executor drops are scheduled again after RETRY_DELAY seconds.
+    """
+    RETRY_DELAY: float = 0.5
+
+    def __init__(self, workers: int = 2, queueSize: int = 1000, policy: Optional[ObserverExecutor.Policy] = None) -> None:
+        self.__workers: int = workers
+        self.__queueSize: int = queueSize
+        self.__policy: Optional[ObserverExecutor.Policy] = policy
+        self.__condition: threading.Condition = threading.Condition()
+        # (due, sequence, key), entries are outdated if the sequence does not match the one in __entries anymore
+        self.__heap: List[Tuple[float, int, Hashable]] = []
+        # key -> (due, sequence, callback)
+        self.__entries: Dict[Hashable, Tuple[float, int, Callable[[], Any]]] = {}
+        self.__sequence: itertools.count = itertools.count()
+        self.__thread: Optional[threading.Thread] = None
+        self.__executor: Optional[ObserverExecutor] = None
+        self.__running: bool = True
+        self.__scheduled: int = 0
+        self.__coalesced: int = 0
+        self.__cancelled: int = 0
+        self.__dispatched: int = 0
+        self.__requeued: int = 0
+        self.__latenessTotal: float = 0.0
+        self.__latenessMax: float = 0.0
+
+    def schedule(self, key: Hashable, delay: float, callback: Callable[[], Any]) -> bool:
+        """Calls callback after delay seconds. Returns False if the key was already pending, the call is then merged
+        into the pending one"""
+        due: float = time.monotonic() + max(delay, 0.0)
+        with self.__condition:
+            if not self.__running:
+                raise RuntimeError('Scheduler was shut down')
+            pending: Optional[Tuple[float, int, Callable[[], Any]]] = self.__entries.get(key)
+            if pending is not None:
+                self.__coalesced += 1
+                if pending[0] <= due:
+                    return False
+                callback = pending[2]
+            sequence: int = next(self.__sequence)
+            self.__entries[key] = (due, sequence, callback)
+            heapq.heappush(self.__heap, (due, sequence, key))
+            if pending is None:
+                self.__scheduled += 1
+            if len(self.__heap) > 2 * len(self.__entries) + 16:
+                self.__compact()
+            if self.__thread is None:
+                self.__executor = ObserverExecutor(workers=self.__workers, queueSize=self.__queueSize, policy=self.__policy)
+                self.__thread = threading.Thread(target=self.__run, name='Scheduler', daemon=True)
+                self.__thread.start()
+            elif self.__heap[0][1] == sequence:
+                # The new entry is due before everything else, the timer thread has to wait less
+                self.__condition.notify()
+            return pending is None
+
+    def cancel(self, key: Hashable) -> bool:
+        """Removes the pending call of key, a call that is already running is not interrupted"""
+        with self.__condition:
+            if self.__entries.pop(key, None) is None:
+                return False
+            self.__cancelled += 1
+            return True
+
+    def isPending(self, key: Hashable) -> bool:
+        with self.__condition:
+            return key in self.__entries
+
+    def __compact(self) -> None:
+        self.__heap = [(due, sequence, key) for key, (due, sequence, _) in self.__entries.items()]
+        heapq.heapify(self.__heap)
+
+    def __run(self) -> None:
+        while True:
+            due: Optional[List[Tuple[Hashable, Callable[[], Any]]]] = self.__waitForDue()
+            if due is None:
+                return
+            # Submitting may block if the executor is saturated, this must not hold up schedule
+            for key, callback in due:
+                if not self.__executor.submit(callback):  # type: ignore
+                    self.__requeue(key, callback)
+
+    def __waitForDue(self) -> Optional[List[Tuple[Hashable, Callable[[], Any]]]]:
+        """Waits until calls are due and removes them, None if the scheduler was shut down"""
+        due: List[Tuple[Hashable, Callable[[], Any]]] = []
+        with self.__condition:
+            while self.__running:
+                if not self.__heap:
+                    if due:
+                        break
+                    self.__condition.wait()
+                    continue
+                dueTime, sequence, key = self.__heap[0]
+                entry: Optional[Tuple[float, int, Callable[[], Any]]] = self.__entries.get(key)
+                if entry is None or entry[1] != sequence:
+                    heapq.heappop(self.__heap)
+                    continue
+                now: float = time.monotonic()
+                if dueTime > now:
+                    if due:
+                        break
+                    self.__condition.wait(dueTime - now)
+                    continue
+                heapq.heappop(self.__heap)
+                del self.__entries[key]
+                due.append((key, entry[2]))
+                self.__dispatched += 1
+                self.__latenessTotal += now - dueTime
+                self.__latenessMax = max(self.__latenessMax, now - dueTime)
+            return due if self.__running else None
+
+    def __requeue(self, key: Hashable, callback: Callable[[], Any]) -> None:
+        # The executor dropped the call, try again later unless the key was scheduled again in the meantime
+        with self.__condition:
+            if not self.__running or key in self.__entries:
+                return
+            due: float = time.monotonic() + Scheduler.RETRY_DELAY
+            sequence: int = next(self.__sequence)
+            self.__entries[key] = (due, sequence, callback)
+            heapq.heappush(self.__heap, (due, sequence, key))
+            self.__requeued += 1
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Drops all pending calls and stops the threads"""
+        with self.__condition:
+            if not self.__running:
+                return
+            self.__running = False
+            self.__entries.clear()
+            self.__heap.clear()
+            self.__condition.notify()
+            thread: Optional[threading.Thread] = self.__thread
+        if thread is not None:
+            if wait:
+                thread.join()
+            self.__executor.shutdown(wait=wait)  # type: ignore
+
+    @property
+    def pending(self) -> int:
+        return len(self.__entries)
+
+    @property
+    def running(self) -> bool:
+        return self.__running
+
+    def getMetrics(self) -> Dict[str, Any]:
+        with self.__condition:
+            dispatched: int = self.__dispatched
+            metrics: Dict[str, Any] = {
+                'pending': len(self.__entries),
+                'scheduled': self.__scheduled,
+                'coalesced': self.__coalesced,
+                'cancelled': self.__cancelled,
+                'dispatched': dispatched,
+                'requeued': self.__requeued,
+                'latenessAvg_s': self.__latenessTotal / dispatched if dispatched else None,
+                'latenessMax_s': self.__latenessMax if dispatched else None,
+            }
+        metrics['executor'] = self.__executor.getMetrics() if self.__executor is not None else None
+        return metrics
+
+
+_defaultScheduler: Optional[Scheduler] = None
+_defaultSchedulerLock: threading.Lock = threading.Lock()
+
+
+def getDefaultScheduler() -> Scheduler:
+    """Process wide scheduler shared by all request trackers, a new one is created if it was shut down"""
+    global _defaultScheduler  # pylint: disable=global-statement
+    with _defaultSchedulerLock:
+        if _defaultScheduler is None or not _defaultScheduler.running:
+            _defaultScheduler = Scheduler()
+        return _defaultScheduler
@@ -0,0 +1,384 @@
+"""Binary snapshots of the addressable tree.
+
+A snapshot stores the enabled part of a tree: the kind and local address of every element, the values of attributes and
+their timestamps. Below root, the known children passed to loadSnapshot and other restored elements, elements that do
+not exist when the snapshot is loaded are restored as generic placeholders, the API replaces them with the real elements
+on the next update. Inside elements that already exist only the values of existing attributes are restored. The whole
+file is decoded before the tree is changed, a corrupted snapshot leaves the tree untouched.
+
+Layout (little endian): magic, u16 format version, followed by the root node. A node is u8 kind, str localAddress and
+for attributes a tagged value and three optional datetimes, for objects u32 number of children followed by the children.
+Strings are u32 length followed by UTF-8.
+"""
+from __future__ import annotations
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+import importlib
+import io
+import json
+import logging
+import os
+import struct
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+
+from weconnect_cupra.addressable import AddressableLeaf, AddressableAttribute, AddressableObject, AddressableDict, AddressableList
+from weconnect_cupra.util import ExtendedEncoder
+
+LOG: logging.Logger = logging.getLogger("weconnect_cupra")
+
+MAGIC: bytes = b'WCSNAP'
+FORMAT_VERSION: int = 1
+
+_KIND_OBJECT: int = 0
+_KIND_DICT: int = 1
+_KIND_LIST: int = 2
+_KIND_ATTRIBUTE: int = 3
+
+_TAG_NONE: int = 0
+_TAG_FALSE: int = 1
+_TAG_TRUE: int = 2
+_TAG_INT: int = 3
+_TAG_BIGINT: int = 4
+_TAG_FLOAT: int = 5
+_TAG_STR: int = 6
+_TAG_DATETIME: int = 7
+_TAG_ENUM: int = 8
+_TAG_JSON: int = 9
+_TAG_TIMEDELTA: int = 10
+
+_U8 = struct.Struct('<B')
+_U16 = struct.Struct('<H')
+_U32 = struct.Struct('<I')
+_I64 = struct.Struct('<q')
+_F64 = struct.Struct('<d')
+_DATETIME = struct.Struct('<Bdi')
+
+_DATETIME_NONE: int = 0
+_DATETIME_AWARE: int = 1
+_DATETIME_NAIVE: int = 2
+
+
+class SnapshotError(Exception):
+    pass
+
+
+class SnapshotObject(AddressableObject):
+    """Placeholder for an object restored from a snapshot that was not created by the API yet"""
+
+    def __str__(self) -> str:
+        return '\n'.join(f'{child.getLocalAddress()}: {child}' for child in self.children if child.enabled)
+
+
+class _Node():
+    """Decoded element of a snapshot"""
+    __slots__ = ('kind', 'localAddress', 'value', 'lastChange', 'lastUpdateFromServer', 'lastUpdateFromCar', 'children')
+
+    def __init__(self, kind: int, localAddress: str) -> None:
+        self.kind: int = kind
+        self.localAddress: str = localAddress
+        self.value: Any = None
+        self.lastChange: Optional[datetime] = None
+        self.lastUpdateFromServer: Optional[datetime] = None
+        self.lastUpdateFromCar: Optional[datetime] = None
+        self.children: List[_Node] = []
+
+
+class _Writer():
+    def __init__(self, stream: BinaryIO) -> None:
+        self.stream: BinaryIO = stream
+
+    def writeStr(self, string: str) -> None:
+        encoded: bytes = string.encode('utf-8')
+        self.stream.write(_U32.pack(len(encoded)))
+        self.stream.write(encoded)
+
+    def writeDatetime(self, value: Optional[datetime]) -> None:
+        if value is None:
+            self.stream.write(_DATETIME.pack(_DATETIME_NONE, 0.0, 0))
+        elif value.tzinfo is None:
+            self.stream.write(_DATETIME.pack(_DATETIME_NAIVE, value.replace(tzinfo=timezone.utc).timestamp(), 0))
+        else:
+            offset: Optional[timedelta] = value.utcoffset()
+            self.stream.write(_DATETIME.pack(_DATETIME_AWARE, value.timestamp(), int(offset.total_seconds()) if offset is not None else 0))
+
+    def writeValue(self, value: Any) -> None:  # noqa: C901
+        if value is None:
+            self.stream.write(_U8.pack(_TAG_NONE))
+        elif isinstance(value, bool):
+            self.stream.write(_U8.pack(_TAG_TRUE if value else _TAG_FALSE))
+        elif isinstance(value, Enum):
+            self.stream.write(_U8.pack(_TAG_ENUM))
+            self.writeStr(type(value).__module__)
+            self.writeStr(type(value).__qualname__)
+            self.writeValue(value.value)
+        elif isinstance(value, int):
+            if -2**63 <= value < 2**63:
+                self.stream.write(_U8.pack(_TAG_INT))
+                self.stream.write(_I64.pack(value))
+            else:
+                self.stream.write(_U8.pack(_TAG_BIGINT))
+                self.writeStr(str(value))
+        elif isinstance(value, float):
+            self.stream.write(_U8.pack(_TAG_FLOAT))
+            self.stream.write(_F64.pack(value))
+        elif isinstance(value, str):
+            self.stream.write(_U8.pack(_TAG_STR))
+            self.writeStr(value)
+        elif isinstance(value, datetime):
+            self.stream.write(_U8.pack(_TAG_DATETIME))
+            self.writeDatetime(value)
+        elif isinstance(value, timedelta):
+            self.stream.write(_U8.pack(_TAG_TIMEDELTA))
+            self.stream.write(_F64.pack(value.total_seconds()))
+        elif isinstance(value, (dict, list, tuple)):
+            self.stream.write(_U8.pack(_TAG_JSON))
+            self.writeStr(json.dumps(value, cls=ExtendedEncoder))
+        else:
+            raise TypeError(f'Values of type {type(value)} cannot be stored in a snapshot')
+
+    def writeNode(self, element: AddressableLeaf) -> bool:
+        if isinstance(element, AddressableAttribute):
+            value = element.value
+            # Encode first, attributes with values that cannot be stored are left out
+            try:
+                valueWriter: _Writer = _Writer(io.BytesIO())
+                valueWriter.writeValue(value)
+            except TypeError:
+                LOG.debug('%s: Not stored in snapshot, value of type %s is not supported', element.getGlobalAddress(), type(value))
+                return False
+            self.stream.write(_U8.pack(_KIND_ATTRIBUTE))
+            self.writeStr(element.getLocalAddress())
+            self.stream.write(valueWriter.stream.getvalue())  # type: ignore
+            self.writeDatetime(element.lastChange)
+            self.writeDatetime(element.lastUpdateFromServer)
+            self.writeDatetime(element.lastUpdateFromCar)
+            return True
+        if isinstance(element, AddressableObject):
+            if isinstance(element, AddressableList):
+                kind: int = _KIND_LIST
+            elif isinstance(element, AddressableDict):
+                kind = _KIND_DICT
+            else:
+                kind = _KIND_OBJECT
+            self.stream.write(_U8.pack(kind))
+            self.writeStr(element.getLocalAddress())
+            # The number of children is only known after writing them
+            children: _Writer = _Writer(io.BytesIO())
+            count: int = 0
+            for child in element.children:
+                if child.enabled and children.writeNode(child):
+                    count += 1
+            self.stream.write(_U32.pack(count))
+            self.stream.write(children.stream.getvalue())  # type: ignore
+            return True
+        return False
+
+
+class _Reader():
+    def __init__(self, data: bytes) -> None:
+        self.data: memoryview = memoryview(data)
+        self.offset: int = 0
+
+    def unpack(self, structure: struct.Struct) -> Tuple[Any, ...]:
+        try:
+            values = structure.unpack_from(self.data, self.offset)
+        except struct.error as error:
+            raise SnapshotError('Snapshot is truncated') from error
+        self.offset += structure.size
+        return values
+
+    def readStr(self) -> str:
+        length: int = self.unpack(_U32)[0]
+        if self.offset + length > len(self.data):
+            raise SnapshotError('Snapshot is truncated')
+        string: str = str(self.data[self.offset:self.offset + length], 'utf-8')
+        self.offset += length
+        return string
+
+    def readDatetime(self) -> Optional[datetime]:
+        kind, timestamp, offset = self.unpack(_DATETIME)
+        if kind == _DATETIME_NONE:
+            return None
+        if kind == _DATETIME_NAIVE:
+            return datetime.fromtimestamp(timestamp, tz=timezone.utc).replace(tzinfo=None)
+        return datetime.fromtimestamp(timestamp, tz=timezone(timedelta(seconds=offset)))
+
+    def readValue(self) -> Any:  # noqa: C901
+        tag: int = self.unpack(_U8)[0]
+        if tag == _TAG_NONE:
+            return None
+        if tag == _TAG_FALSE:
+            return False
+        if tag == _TAG_TRUE:
+            return True
+        if tag == _TAG_INT:
+            return self.unpack(_I64)[0]
+        if tag == _TAG_BIGINT:
+            return int(self.readStr())
+        if tag == _TAG_FLOAT:
+            return self.unpack(_F64)[0]
+        if tag == _TAG_STR:
+            return self.readStr()
+        if tag == _TAG_DATETIME:
+            return self.readDatetime()
+        if tag == _TAG_TIMEDELTA:
+            return timedelta(seconds=self.unpack(_F64)[0])
+        if tag == _TAG_JSON:
+            return json.loads(self.readStr())
+        if tag == _TAG_ENUM:
+            module: str = self.readStr()
+            qualname: str = self.readStr()
+            value: Any = self.readValue()
+            enumType: Optional[type] = _resolveEnum(module, qualname)
+            if enumType is None:
+                return value
+            try:
+                return enumType(value)
+            except ValueError:
+                return value
+        raise SnapshotError(f'Unknown value tag {tag} in snapshot')
+
+    def readNode(self) -> _Node:
+        node: _Node = _Node(self.unpack(_U8)[0], self.readStr())
+        if node.kind == _KIND_ATTRIBUTE:
+            node.value = self.readValue()
+            node.lastChange = self.readDatetime()
+            node.lastUpdateFromServer = self.readDatetime()
+            node.lastUpdateFromCar = self.readDatetime()
+        elif node.kind in (_KIND_OBJECT, _KIND_DICT, _KIND_LIST):
+            count: int = self.unpack(_U32)[0]
+            node.children = [self.readNode() for _ in range(count)]
+        else:
+            raise SnapshotError(f'Unknown node kind {node.kind} in snapshot')
+        return node
+
+
+def _resolveEnum(module: str, qualname: str) -> Optional[type]:
+    # Only enums of this package are restored, a snapshot must not be able to import arbitrary modules
+    if module != 'weconnect_cupra' and not module.startswith('weconnect_cupra.'):
+        LOG.debug('Enum %s.%s from snapshot is not part of weconnect_cupra, restoring its value only', module, qualname)
+        return None
+    try:
+        resolved: Any = importlib.import_module(module)
+        for name in qualname.split('.'):
+            resolved = getattr(resolved, name)
+    except (ImportError, AttributeError):
+        LOG.debug('Enum %s.%s from snapshot is not known anymore', module, qualname)
+        return None
+    if isinstance(resolved, type) and issubclass(resolved, Enum):
+        return resolved
+    return None
+
+
+def _decode(data: bytes) -> Tuple[int, Optional[_Node]]:
+    """Decodes a whole snapshot into its format version and root node, the node is None for other format versions"""
+    if data[:len(MAGIC)] != MAGIC:
+        raise SnapshotError('File is not a snapshot')
+    reader: _Reader = _Reader(data)
+    reader.offset = len(MAGIC)
+    formatVersion: int = reader.unpack(_U16)[0]
+    if formatVersion != FORMAT_VERSION:
+        return formatVersion, None
+    try:
+        node: _Node = reader.readNode()
+    except (struct.error, ValueError, OverflowError, OSError, RecursionError) as error:
+        # Invalid UTF-8 or JSON, numbers and dates out of range or nesting too deep
+        raise SnapshotError(f'{type(error).__name__}: {error}') from error
+    if node.kind == _KIND_ATTRIBUTE:
+        raise SnapshotError('Snapshot root is not an object')
+    if reader.offset != len(data):
+        raise SnapshotError('Snapshot has trailing data')
+    return formatVersion, node
+
+
+def _restoreChildren(nodes: List[_Node], element: AddressableObject, existing: Dict[str, AddressableLeaf], createMissing: bool) -> None:
+    existing.update({child.getLocalAddress(): child for child in element.children})
+    for node in nodes:
+        _restoreNode(node, element, existing.get(node.localAddress), createMissing)
+
+
+def _restoreNode(node: _Node, parent: AddressableObject, current: Optional[AddressableLeaf], createMissing: bool) -> None:
+    if current is None and not createMissing:
+        # The parent was created by the API and knows its children, a placeholder would break its next update
+        return
+
+    if node.kind == _KIND_ATTRIBUTE:
+        if isinstance(current, AddressableAttribute):
+            if current.valueGetter is not None or (node.value is not None and not isinstance(node.value, current.valueType)):
+                return
+            attribute: AddressableAttribute = current
+        elif current is None:
+            attribute = AddressableAttribute(localAddress=node.localAddress, parent=parent, value=None,
+                                             valueType=type(node.value) if node.value is not None else object)
+        else:
+            return
+        attribute.setValueWithCarTime(node.value, lastUpdateFromCar=node.lastUpdateFromCar)
+        attribute.enabled = True
+        attribute.lastChange = node.lastChange
+        attribute.lastUpdateFromServer = node.lastUpdateFromServer
+        _addToContainer(parent, node.localAddress, attribute)
+        return
+
+    if isinstance(current, AddressableObject):
+        element: AddressableObject = current
+        # Generic containers and placeholders pass on whether children can be created, objects of the API never get any
+        createChildren: bool = createMissing and (isinstance(current, SnapshotObject) or type(current) in (AddressableDict, AddressableList))
+    elif current is None:
+        if node.kind == _KIND_LIST:
+            element = AddressableList(localAddress=node.localAddress, parent=parent)
+        elif node.kind == _KIND_DICT:
+            element = AddressableDict(localAddress=node.localAddress, parent=parent)
+        else:
+            element = SnapshotObject(localAddress=node.localAddress, parent=parent)
+        createChildren = True
+    else:
+        # An attribute in the tree has the address of an object in the snapshot, skip the whole subtree
+        return
+    _restoreChildren(node.children, element, {}, createChildren)
+    element.enabled = True
+    _addToContainer(parent, node.localAddress, element)
+
+
+def _addToContainer(parent: AddressableObject, localAddress: str, element: AddressableLeaf) -> None:
+    # Dicts and lists also hold their children as items, list items are compared by identity as dicts compare equal by content
+    if isinstance(parent, AddressableDict) and localAddress not in parent:
+        parent[localAddress] = element
+    elif isinstance(parent, AddressableList) and all(item is not element for item in parent):
+        parent.append(element)
+
+
+def saveSnapshot(root: AddressableObject, filename: str) -> None:
+    buffer: io.BytesIO = io.BytesIO()
+    buffer.write(MAGIC)
+    buffer.write(_U16.pack(FORMAT_VERSION))
+    _Writer(buffer).writeNode(root)
+    temporaryFilename: str = f'{filename}.tmp'
+    with open(temporaryFilename, 'wb') as file:
+        file.write(buffer.getvalue())
+    os.replace(temporaryFilename, filename)
+    LOG.info('Writing snapshot %s', filename)
+
+
+def loadSnapshot(root: AddressableObject, filename: str, knownChildren: Optional[Dict[str, AddressableLeaf]] = None) -> bool:
+    """Restores the tree below root from a snapshot file. Returns False if the file does not exist or cannot be used.
+    Children of root that were created but are not enabled yet are only found if they are passed in knownChildren, the
+    known children and root are the only elements created by the API that get placeholders restored into them"""
+    try:
+        with open(filename, 'rb') as file:
+            data: bytes = file.read()
+    except FileNotFoundError:
+        return False
+    try:
+        formatVersion, node = _decode(data)
+    except SnapshotError as error:
+        LOG.error('Snapshot %s seems corrupted (%s) will delete it. '
+                  'If this problem persists please check if a problem with your disk exists.', filename, error)
+        os.remove(filename)
+        return False
+    if node is None:
+        LOG.warning('Snapshot %s has format version %d, only version %d is supported. Ignoring it', filename, formatVersion, FORMAT_VERSION)
+        return False
+    _restoreChildren(node.children, root, dict(knownChildren) if knownChildren is not None else {}, createMissing=True)
+    LOG.info('Reading snapshot %s', filename)
+    return True
@@ -26,10 +26,12 @@ except ImportError:
     pass
 
 
+FRACTIONS_PATTERN = re.compile(r'^(?P<start>\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.)(?P<fractions>\d+)(?P<end>\+\d{2}:\d{2})$')
+
+
 def robustTimeParse(timeString: str) -> datetime:
     timeString = timeString.replace('Z', '+00:00')
-    match = re.search(
-        r'^(?P<start>\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.)(?P<fractions>\d+)(?P<end>\+\d{2}:\d{2})$', timeString)
+    match = FRACTIONS_PATTERN.search(timeString) if '.' in timeString else None
     if match:
         timeString = match.group('start') + match.group('fractions').ljust(6, "0") + match.group('end')
     return datetime.fromisoformat(timeString).replace(microsecond=0) if timeString else None
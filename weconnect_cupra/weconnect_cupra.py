@@ -10,6 +10,10 @@ from weconnect_cupra.auth.session_manager import SessionManager, Service, Sessio
 from weconnect_cupra.addressable import AddressableLeaf, AddressableObject, AddressableDict
 from weconnect_cupra.fetch import Fetcher
 from weconnect_cupra.errors import ErrorBus
+from weconnect_cupra.observer_executor import ObserverExecutor
+from weconnect_cupra.event_stream import EventStream
+from weconnect_cupra.fleet.columnar import FleetColumns
+from weconnect_cupra import snapshot
 # VW specific
 from weconnect_cupra.api.vw.domain import Domain
 from weconnect_cupra.api.vw.api import VwApi
@@ -40,7 +44,9 @@ class WeConnect(AddressableObject):  # pylint: disable=too-many-instance-attribu
         numRetries: int = 6,
         timeout: bool = False,
         selective: Optional[list[Domain]] = None,
-        service = Service.WE_CONNECT
+        service = Service.WE_CONNECT,
+        observerExecutor: Optional[ObserverExecutor] = None,
+        lazyStatus: bool = False
     ) -> None:
         """Initialize WeConnect interface. If loginOnInit is true the user will be tried to login.
            If loginOnInit is true also an initial fetch of data is performed.
@@ -61,8 +67,11 @@ class WeConnect(AddressableObject):  # pylint: disable=too-many-instance-attribu
             numRetries (int, optional): Number of retries when http requests are failing. Defaults to 3.
             timeout (bool, optional, optional): Timeout in seconds used for http connections to the VW servers
             selective (list[Domain], optional): Domains to request data for
+            observerExecutor (ObserverExecutor, optional): Executor that runs observer callbacks off the update thread. Defaults to None.
+            lazyStatus (bool, optional): Keep only the payload of statuses without observers and build them on first access. Defaults to False.
         """
         super().__init__(localAddress='', parent=None)
+        self.setObserverExecutor(observerExecutor)
 
         LOG.info(f'Weconnect-Cupra-python version {VERSION}')
 
@@ -84,14 +93,14 @@ class WeConnect(AddressableObject):  # pylint: disable=too-many-instance-attribu
         self.__session.retries = numRetries
 
         self.__errorBus: ErrorBus = ErrorBus()
-        self.__fetcher: Fetcher = Fetcher(session=self.__session, maxAge=maxAge, maxAgePictures=maxAgePictures, errorBus=ErrorBus())
+        self.__fetcher: Fetcher = Fetcher(session=self.__session, maxAge=maxAge, maxAgePictures=maxAgePictures, errorBus=self.__errorBus)
 
         if loginOnInit:
             self.__session.login()
 
         # Construct the actual service adapter
         if service == Service.MY_CUPRA:
-            self.__api = CupraApi(weconnect_cupra=self, fetcher=self.__fetcher)
+            self.__api = CupraApi(weconnect_cupra=self, fetcher=self.__fetcher, lazyStatus=lazyStatus)
         # else:
         #     self.__api = VwApi(weconnect_cupra=self, fetcher=self.__fetcher)
         self.__fetcher.base_url = self.__api.base_url
@@ -112,6 +121,10 @@ class WeConnect(AddressableObject):  # pylint: disable=too-many-instance-attribu
     def cache(self) -> Dict[str, Any]:
         return self.__fetcher.cache
 
+    @property
+    def errorBus(self) -> ErrorBus:
+        return self.__errorBus
+
     # Used for charging station support
     # Public api used by weconnect_cupra-mqtt
     @property
@@ -150,6 +163,30 @@ class WeConnect(AddressableObject):  # pylint: disable=too-many-instance-attribu
         if self.__manager is not None and self.tokenfile is not None:
             self.__manager.saveTokenstore(self.tokenfile)
 
+    def saveSnapshot(self, filename: str) -> None:
+        """Stores the current state of all vehicles and stations in a binary snapshot file"""
+        snapshot.saveSnapshot(self, filename)
+
+    def loadSnapshot(self, filename: str) -> bool:
+        """Restores the state stored with saveSnapshot. Vehicles that were not fetched yet are restored as placeholders
+        and replaced by the next update. Returns False if there is no usable snapshot"""
+        restored: bool = snapshot.loadSnapshot(self, filename, knownChildren={'vehicles': self.__api.vehicles,
+                                                                              'chargingStations': self.__api.stations})
+        if restored:
+            self.updateComplete()
+        return restored
+
+    def events(self, pattern: str = '**', flags: AddressableLeaf.ObserverEvent = AddressableLeaf.ObserverEvent.ALL, maxSize: int = 1000,
+               overflow: Optional[EventStream.Overflow] = None, blockTimeout: Optional[float] = None) -> EventStream:
+        """Returns a stream of the changes to all elements matching the address pattern (e.g. 'vehicles/*/domains/charging/**'),
+        to be consumed with for or async for. Close the stream when it is not needed anymore"""
+        return EventStream(self, pattern=pattern, flags=flags, maxSize=maxSize, overflow=overflow, blockTimeout=blockTimeout)
+
+    def exportColumns(self, pattern: str = '**') -> FleetColumns:
+        """Columnar snapshot of all vehicles with one column per attribute whose address relative to the vehicle matches
+        the pattern (e.g. 'domains/charging/**'), see FleetColumns.toNumpy, toArrow and toParquet"""
+        return self.__api.exportColumns(pattern=pattern)
+
     # Public api used by weconnect_cupra-mqtt
     def enableTracker(self) -> None:
         self.__enableTracker = True